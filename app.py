@@ -1,120 +1,215 @@
-from datetime import date, datetime
-import logging
-import time
-from flask import Flask, request, g
-from flask_login import LoginManager, current_user
-from werkzeug.security import generate_password_hash
-
-from config.site_config import SiteConfig
-from models.db import db  # ✅ import unique et cohérent
-from models.user import User, APIKey, RequestLog
-
-
-def create_app():
-    app = Flask(__name__)
-    app.config['SECRET_KEY'] = 'un_secret_key'
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///users.db'
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-    db.init_app(app)
-
-    # -------------------
-    # Context global (site info)
-    # -------------------
-    @app.context_processor
-    def inject_site_settings():
-        return {"site": SiteConfig}
-
-    # -------------------
-    # Gestion login
-    # -------------------
-    login_manager = LoginManager()
-    login_manager.login_view = "main.login"
-    login_manager.init_app(app)
-
-    @login_manager.user_loader
-    def load_user(user_id):
-        return User.query.get(int(user_id))
-
-    # -------------------
-    # Enregistrement des Blueprints
-    # -------------------
-    from routes.api.auth import auth_bp
-    from routes.api.convert_routes import convert_bp
-    from routes.api.compress_bp import compress_bp
-    from routes.main_pages import main
-    from routes.admin.dashboard import admin
-
-    app.register_blueprint(auth_bp, url_prefix='/api/auth')
-    app.register_blueprint(convert_bp)
-    app.register_blueprint(compress_bp)
-    app.register_blueprint(main)
-    app.register_blueprint(admin)
-
-    # -------------------
-    # Log automatique des requêtes
-    # -------------------
-    @app.before_request
-    def start_timer():
-        g.start_time = time.time()
-
-    @app.after_request
-    def log_request(response):
-        if current_user.is_authenticated and request.path.startswith("/api/"):
-            if request.path in [r.rule for r in app.url_map.iter_rules()]:
-                log = RequestLog(
-                    user_id=current_user.id,
-                    endpoint=request.path,
-                    method=request.method,
-                    status_code=response.status_code,
-                    ip_address=request.remote_addr,
-                    user_agent=request.user_agent.string,
-                    date=date.today(),
-                    time=datetime.utcnow(),
-                    response_time_ms=(time.time() - g.start_time) * 1000
-                )
-                db.session.add(log)
-                db.session.commit()
-        return response
-
-    return app
-
-
-app = create_app()
-with app.app_context():
-        db.create_all()
-
-        # Création admin si absent
-        if not User.query.filter_by(email="admin@example.com").first():
-            admin = User(
-                email="admin@example.com",
-                password_hash=generate_password_hash("admin123"),
-                is_admin=True
-            )
-            db.session.add(admin)
-            db.session.commit()
-            print("✅ Admin ajouté", flush=True)
-# -------------------------------------------------
-# Lancement direct (et création de la base si besoin)
-# -------------------------------------------------
-# -------------------
-# Lancement app
-# -------------------
-if __name__ == "__main__":
-    app = create_app()
-    with app.app_context():
-        db.create_all()
-
-        # Création admin si absent
-        if not User.query.filter_by(email="admin@example.com").first():
-            admin = User(
-                email="admin@example.com",
-                password_hash=generate_password_hash("admin123"),
-                is_admin=True
-            )
-            db.session.add(admin)
-            db.session.commit()
-            print("✅ Admin ajouté", flush=True)
-
-    app.run(debug=True)
-
+from datetime import date, datetime
+import os
+import time
+from flask import Flask, flash, g, jsonify, redirect, request
+from flask_login import LoginManager, current_user, login_url
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateIndex
+from werkzeug.middleware.proxy_fix import ProxyFix
+from werkzeug.security import generate_password_hash
+
+from config import get_config
+from config.base_config import BaseConfig
+from config.site_config import SiteConfig
+from models.db import db, init_db_engine  # ✅ import unique et cohérent
+from models.user import User, APIKey, RequestLog, RequestStatDaily
+from models.job import ConversionJob
+from services.admission import admission
+from services.cleaner import cleaner
+from services.file_utils import UploadRequest
+from services.log_writer import log_writer
+from services.metrics_sampler import metrics_sampler
+from services.principals import principals
+from services.quota import quota
+from services.quota_rollover import quota_rollover
+from services.render_pool import render_pool
+from services.request_stats import rebuild_rollups
+from services.stage_metrics import stage_metrics
+
+
+def create_app():
+    app = Flask(__name__)
+    app.request_class = UploadRequest  # uploads écrits directement à leur place
+    # FLASK_ENV=production → ProductionConfig, sinon DevelopmentConfig (config/__init__.py)
+    app.config.from_object(get_config())
+
+    # Derrière un proxy : IP du client (admission par IP, journaux) lue dans X-Forwarded-For,
+    # en ne faisant confiance qu'aux PROXY_FIX_X_FOR derniers proxies (en-tête falsifiable sinon)
+    proxy_hops = app.config.get("PROXY_FIX_X_FOR", BaseConfig.PROXY_FIX_X_FOR)
+    if proxy_hops:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxy_hops)
+
+    # SQLite : WAL + pragmas à chaque connexion ; DATABASE_URL serveur : pool réglable
+    init_db_engine(app)
+
+    # -------------------
+    # Context global (site info)
+    # -------------------
+    @app.context_processor
+    def inject_site_settings():
+        return {"site": SiteConfig}
+
+    # -------------------
+    # Gestion login
+    # -------------------
+    login_manager = LoginManager()
+    login_manager.login_view = "main.login"
+    login_manager.init_app(app)
+
+    # Utilisateurs en cache mémoire (services/principals.py) : aucune requête SQL par page
+    @login_manager.user_loader
+    def load_user(user_id):
+        return principals.user(int(user_id))
+
+    # Clients API : en-tête X-API-Key, sans session par cookie
+    @login_manager.request_loader
+    def load_user_from_request(req):
+        return principals.load_from_request(req)
+
+    # API : 401 JSON (clé absente, inconnue ou révoquée) au lieu de la redirection vers /login
+    @login_manager.unauthorized_handler
+    def unauthorized():
+        if request.path.startswith("/convertify/api/"):
+            return jsonify({"error": "Authentification requise (en-tête X-API-Key)"}), 401
+        flash(login_manager.login_message, login_manager.login_message_category)
+        return redirect(login_url(login_manager.login_view, request.url))
+
+    # -------------------
+    # Enregistrement des Blueprints
+    # -------------------
+    from routes.api.auth import auth_bp
+    from routes.api.convert_routes import convert_bp
+    from routes.api.compress_bp import compress_bp
+    from routes.api.downloads import download_bp
+    from routes.main_pages import main
+    from routes.admin.dashboard import admin
+
+    app.register_blueprint(auth_bp, url_prefix='/api/auth')
+    app.register_blueprint(convert_bp)
+    app.register_blueprint(compress_bp)
+    app.register_blueprint(download_bp)
+    app.register_blueprint(main)
+    app.register_blueprint(admin)
+
+    # -------------------
+    # Log automatique des requêtes
+    # -------------------
+    @app.before_request
+    def start_timer():
+        g.start_time = time.time()
+
+    # Règles connues, calculées une seule fois au démarrage
+    known_rules = frozenset(r.rule for r in app.url_map.iter_rules())
+    log_writer.init_app(app)
+    quota.init_app(app)
+    quota_rollover.init_app(app)
+    metrics_sampler.init_app(app)
+    cleaner.init_app(app)
+    admission.init_app(app)
+    principals.init_app(app)
+    render_pool.init_app(app)
+    stage_metrics.init_app(app)
+
+    @app.after_request
+    def log_request(response):
+        if current_user.is_authenticated and request.path.startswith("/api/"):
+            if request.path in known_rules:
+                # écrit en différé par lots (services/log_writer.py)
+                log_writer.push({
+                    "user_id": current_user.id,
+                    "endpoint": request.path,
+                    "method": request.method,
+                    "status_code": response.status_code,
+                    "ip_address": request.remote_addr,
+                    "user_agent": request.user_agent.string[:255],
+                    "date": date.today(),
+                    "time": datetime.utcnow(),
+                    "response_time_ms": (time.time() - g.start_time) * 1000
+                })
+        return response
+
+    # -------------------
+    # Commandes CLI
+    # -------------------
+    @app.cli.command("init-db")
+    def init_db_command():
+        """Crée les tables, les index et l'admin par défaut."""
+        init_db(app)
+
+    return app
+
+
+def ensure_indexes():
+    """Index ajoutés après coup : créés aussi sur les tables existantes (create_all ne le fait pas)."""
+    # IF NOT EXISTS : la réflexion (checkfirst) ne voit pas les index sur expression (lower(email))
+    with db.engine.begin() as conn:
+        for model in (User, APIKey, RequestLog):
+            for index in model.__table__.indexes:
+                conn.execute(CreateIndex(index, if_not_exists=True))
+
+
+def ensure_columns():
+    """Colonnes ajoutées après coup (nullables) : ajoutées aux tables existantes (create_all ne le fait pas)."""
+    with db.engine.begin() as conn:
+        inspector = inspect(conn)
+        for model in (ConversionJob,):
+            table = model.__table__
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    conn.execute(text(
+                        f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(conn.dialect)}"
+                    ))
+
+
+def ensure_request_stats():
+    """Premier calcul des agrégats journaliers (base existante)."""
+    if RequestStatDaily.query.first() is None and RequestLog.query.first() is not None:
+        with db.engine.begin() as conn:
+            rebuild_rollups(conn)
+        print("✅ Agrégats des requêtes reconstruits", flush=True)
+
+
+def seed_admin():
+    """Création admin si absent."""
+    if not User.query.filter_by(email="admin@example.com").first():
+        admin = User(
+            email="admin@example.com",
+            password_hash=generate_password_hash("admin123"),
+            is_admin=True,
+            last_login_at=datetime.utcnow()
+        )
+        db.session.add(admin)
+        db.session.commit()
+        print("✅ Admin ajouté", flush=True)
+
+
+def init_db(app):
+    """Schéma + agrégats + admin : `flask --app app init-db` (une fois par déploiement)."""
+    with app.app_context():
+        db.create_all()
+        ensure_columns()
+        ensure_indexes()
+        ensure_request_stats()
+        seed_admin()
+
+
+def init_db_on_startup():
+    value = os.environ.get("INIT_DB_ON_STARTUP")
+    if value is None:
+        return BaseConfig.INIT_DB_ON_STARTUP
+    return value.lower() in ("1", "true", "yes")
+
+
+app = create_app()
+# Schéma créé à l'import (défaut) ; INIT_DB_ON_STARTUP=0 si `flask --app app init-db` est lancé au déploiement
+if init_db_on_startup():
+    init_db(app)
+
+
+# -------------------
+# Lancement app (développement : base créée si besoin)
+# -------------------
+if __name__ == "__main__":
+    init_db(app)
+    app.run(debug=True)
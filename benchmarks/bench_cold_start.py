@@ -0,0 +1,97 @@
+"""
+Benchmark démarrage à froid : temps d'import de app.py et mémoire du premier appel
+dans un worker forké (comme gunicorn), selon le mode de démarrage :
+
+    lazy    convertisseurs importés au premier usage (défaut)
+    eager   toutes les bibliothèques de conversion importées au démarrage (ancien comportement)
+    preload import + warm_up() dans le maître puis fork (gunicorn.conf.py, PRELOAD_WARMUP=1)
+
+Chaque mesure tourne dans un processus neuf. RSS = mémoire résidente du worker,
+USS = mémoire propre au worker (non partagée avec le maître). Linux/macOS (fork).
+
+    python benchmarks/bench_cold_start.py [--repeat 3]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = ("lazy", "eager", "preload")
+
+CHILD = r"""
+import gc, json, os, sys, tempfile, time
+import psutil
+
+mode = sys.argv[1]
+start = time.perf_counter()
+import app as app_module
+import_seconds = time.perf_counter() - start
+
+from services import formats
+preload_seconds = 0.0
+if mode == "eager":
+    start = time.perf_counter()
+    for edge in formats.edges():
+        edge.load()
+    import_seconds += time.perf_counter() - start
+elif mode == "preload":
+    from services.warmup import warm_up
+    preload_seconds = warm_up()["total"]
+    gc.collect()
+    gc.freeze()
+
+master_rss = psutil.Process().memory_info().rss
+read, write = os.pipe()
+pid = os.fork()
+if pid == 0:
+    os.close(read)
+    process = psutil.Process()
+    client = app_module.app.test_client()
+    with tempfile.TemporaryDirectory() as folder:
+        source = os.path.join(folder, "doc.md")
+        with open(source, "w", encoding="utf-8") as f:
+            f.write("# Titre\n\n" + "Une ligne de texte accentué.\n" * 200)
+        start = time.perf_counter()
+        client.get("/").close()
+        pdf = formats.convert(source, "pdf", output_path=os.path.join(folder, "doc.pdf"))
+        formats.convert(pdf, "txt", output_path=os.path.join(folder, "doc.txt"))
+        first_seconds = time.perf_counter() - start
+    memory = process.memory_full_info()
+    os.write(write, json.dumps({"first": first_seconds, "rss": memory.rss, "uss": memory.uss}).encode())
+    os._exit(0)
+
+os.close(write)
+os.waitpid(pid, 0)
+worker = json.loads(os.read(read, 4096))
+print(json.dumps({"import": import_seconds, "preload": preload_seconds, "master_rss": master_rss, **worker}))
+"""
+
+
+def measure(mode):
+    env = dict(os.environ, PYTHONPATH=ROOT, INIT_DB_ON_STARTUP="0")
+    output = subprocess.run([sys.executable, "-c", CHILD, mode], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    args = parser.parse_args()
+
+    mb = 1024 * 1024
+    print(f"{'mode':<8} {'import':>8} {'préchargt':>10} {'1er appel':>10} "
+          f"{'RSS maître':>11} {'RSS worker':>11} {'USS worker':>11}")
+    for mode in args.modes:
+        runs = [measure(mode) for _ in range(args.repeat)]
+        median = {key: statistics.median(r[key] for r in runs) for key in runs[0]}
+        print(f"{mode:<8} {median['import']:>7.2f}s {median['preload']:>9.2f}s {median['first']:>9.2f}s "
+              f"{median['master_rss'] / mb:>9.1f}MB {median['rss'] / mb:>9.1f}MB {median['uss'] / mb:>9.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Benchmark écriture en base : insertions RequestLog depuis plusieurs processus
+(comme des workers gunicorn), chacun avec plusieurs threads, selon le moteur :
+
+    sqlite-default  SQLite sans pragmas (journal rollback, synchronous=FULL) : ancien moteur
+    sqlite-wal      SQLite avec les pragmas de BaseConfig (WAL, synchronous=NORMAL, busy_timeout, mmap)
+    postgres        URL passée par --postgres-url, pool de BaseConfig (DB_POOL_*)
+
+Deux profils d'écriture : une transaction par ligne (--batch 1, journal synchrone par requête)
+ou par lots (--batch 200, comme services/log_writer.py). Les « database is locked »
+sont comptés comme erreurs, sans nouvel essai.
+
+Les lignes vont dans une table dédiée (colonnes et index de request_logs, sans clé étrangère,
+nom unique bench_request_logs_<id>) supprimée en fin de mesure : request_logs n'est jamais touchée.
+
+    python benchmarks/bench_db_writes.py [--processes 4] [--threads 2] [--seconds 5]
+                                         [--batch 1] [--postgres-url postgresql+psycopg://…]
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import Column, Index, MetaData, Table, create_engine, func, select  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+
+from models.db import apply_sqlite_pragmas, engine_options, is_sqlite  # noqa: E402
+from models.user import RequestLog  # noqa: E402
+
+
+def bench_table(name):
+    """Copie de request_logs sous `name` (MetaData propre, sans clé étrangère, index renommés)."""
+    source = RequestLog.__table__
+    table = Table(name, MetaData(), *(
+        Column(c.name, c.type, primary_key=c.primary_key, nullable=c.nullable) for c in source.columns
+    ))
+    for index in source.indexes:
+        Index(f"{name}_{index.name}", *(table.c[c.name] for c in index.columns))
+    return table
+
+
+def mode_config(mode, url):
+    config = {"SQLALCHEMY_DATABASE_URI": url}
+    if mode == "sqlite-default":
+        config.update(SQLITE_JOURNAL_MODE=None, SQLITE_SYNCHRONOUS=None,
+                      SQLITE_BUSY_TIMEOUT_MS=None, SQLITE_MMAP_SIZE=None)
+    return config
+
+
+def make_engine(config):
+    engine = create_engine(config["SQLALCHEMY_DATABASE_URI"], **engine_options(config))
+    if is_sqlite(config):
+        apply_sqlite_pragmas(engine, config)
+    return engine
+
+
+def row(worker, n):
+    return {
+        "user_id": None, "endpoint": f"/convertify/api/bench/{n % 16}", "method": "POST",
+        "status_code": 200, "ip_address": "127.0.0.1", "user_agent": f"bench-{worker}",
+        "date": date.today(), "time": datetime.utcnow(), "response_time_ms": 12.5,
+    }
+
+
+def worker(config, table_name, threads, seconds, batch, results):
+    """Processus : `threads` threads insèrent pendant `seconds` secondes."""
+    table = bench_table(table_name)
+    engine = make_engine(config)
+    deadline = time.perf_counter() + seconds
+    latencies, errors, rows = [], [0], [0]
+    lock = threading.Lock()
+
+    def run(name):
+        n = 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                with engine.begin() as conn:
+                    conn.execute(table.insert(), [row(name, n + i) for i in range(batch)])
+            except OperationalError:
+                with lock:
+                    errors[0] += 1
+                continue
+            elapsed = time.perf_counter() - start
+            n += batch
+            with lock:
+                latencies.append(elapsed)
+                rows[0] += batch
+
+    pool = [threading.Thread(target=run, args=(f"{os.getpid()}-{i}",)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    engine.dispose()
+    results.put({"rows": rows[0], "errors": errors[0], "latencies": latencies})
+
+
+def measure(mode, url, args):
+    config = mode_config(mode, url)
+    table = bench_table(f"bench_request_logs_{uuid.uuid4().hex[:8]}")
+    engine = make_engine(config)
+    table.create(engine)
+    try:
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(
+                target=worker, args=(config, table.name, args.threads, args.seconds, args.batch, results)
+            )
+            for _ in range(args.processes)
+        ]
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+        outcomes = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+        wall = time.perf_counter() - start
+
+        with engine.connect() as conn:
+            stored = conn.execute(select(func.count()).select_from(table)).scalar()
+    finally:
+        # seule la table créée ci-dessus est supprimée
+        table.drop(engine, checkfirst=True)
+        engine.dispose()
+
+    latencies = sorted(l for outcome in outcomes for l in outcome["latencies"]) or [0.0]
+    return {
+        "rows": stored,
+        "rows_per_s": stored / wall,
+        "errors": sum(outcome["errors"] for outcome in outcomes),
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--batch", type=int, default=1)
+    parser.add_argument("--postgres-url")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        modes = [
+            ("sqlite-default", f"sqlite:///{os.path.join(folder, 'default.db')}"),
+            ("sqlite-wal", f"sqlite:///{os.path.join(folder, 'wal.db')}"),
+        ]
+        if args.postgres_url:
+            modes.append(("postgres", args.postgres_url))
+
+        print(f"{args.processes} processus × {args.threads} threads, {args.seconds:g} s, lots de {args.batch}")
+        print(f"{'mode':<15} {'lignes':>8} {'lignes/s':>10} {'erreurs':>8} {'p50':>9} {'p95':>9}")
+        for mode, url in modes:
+            r = measure(mode, url, args)
+            print(f"{mode:<15} {r['rows']:>8} {r['rows_per_s']:>10.0f} {r['errors']:>8} "
+                  f"{r['p50_ms']:>7.2f}ms {r['p95_ms']:>7.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
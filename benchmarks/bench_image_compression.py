@@ -0,0 +1,124 @@
+"""
+Benchmark compression d'images : ancien compress_image (RGB → JPEG qualité=rate)
+contre optimize_image (format selon le contenu, draft/reduce, taille cible).
+
+Le corpus est généré de façon déterministe (même graine → mêmes fichiers) :
+photo, photo JPEG haute résolution, logo aplats, capture d'écran, icône transparente.
+Un dossier d'images réelles peut être utilisé à la place avec --corpus.
+
+    python benchmarks/bench_image_compression.py [--corpus DOSSIER] [--rate 70]
+                                                 [--target-size 100000] [--max-dimension 1600]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw, ImageFilter  # noqa: E402
+
+from services.image_optimizer import optimize_image  # noqa: E402
+
+SEED = 1234
+
+
+def build_corpus(folder):
+    rng = random.Random(SEED)
+
+    def photo(size):
+        base = Image.radial_gradient("L").resize(size).convert("RGB")
+        tint = Image.new("RGB", size, (rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+        noise = Image.effect_noise(size, 25).convert("RGB")
+        return Image.blend(Image.blend(base, tint, 0.4), noise, 0.15).filter(ImageFilter.GaussianBlur(1))
+
+    photo((1920, 1280)).save(os.path.join(folder, "photo.png"))
+    photo((4000, 3000)).save(os.path.join(folder, "photo_large.jpg"), quality=95)
+
+    logo = Image.new("RGB", (1200, 800), "white")
+    draw = ImageDraw.Draw(logo)
+    for _ in range(40):
+        x, y = rng.randrange(1100), rng.randrange(700)
+        color = rng.choice([(220, 30, 30), (30, 90, 200), (20, 20, 20), (250, 200, 0)])
+        draw.rectangle([x, y, x + rng.randrange(20, 200), y + rng.randrange(20, 120)], fill=color)
+    logo.save(os.path.join(folder, "logo.png"))
+
+    screen = Image.new("RGB", (1440, 900), (245, 245, 245))
+    draw = ImageDraw.Draw(screen)
+    for line in range(60):
+        draw.text((20, 10 + line * 14), "ligne %03d " % line + "lorem ipsum " * rng.randrange(3, 12), fill=(30, 30, 30))
+    screen.save(os.path.join(folder, "screenshot.bmp"))
+
+    icon = photo((512, 512)).convert("RGBA")
+    mask = Image.new("L", icon.size, 0)
+    ImageDraw.Draw(mask).ellipse([32, 32, 480, 480], fill=255)
+    icon.putalpha(mask)
+    icon.save(os.path.join(folder, "icon.png"))
+
+
+def legacy_compress(input_path, output_base, quality):
+    output_path = output_base + ".jpg"
+    with Image.open(input_path) as img:
+        if img.mode in ("RGBA", "P"):
+            img = img.convert("RGB")
+        img.save(output_path, "JPEG", optimize=True, quality=quality)
+    return output_path
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", help="dossier d'images (par défaut : corpus généré)")
+    parser.add_argument("--rate", type=int, default=70)
+    parser.add_argument("--target-size", type=int, default=None)
+    parser.add_argument("--max-dimension", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = args.corpus
+        if not corpus:
+            corpus = os.path.join(tmp, "corpus")
+            os.makedirs(corpus)
+            build_corpus(corpus)
+        out = os.path.join(tmp, "out")
+        os.makedirs(out)
+
+        print(f"{'fichier':<18} {'taille':>10} | {'ancien':>9} {'ratio':>6} {'ms':>7} | "
+              f"{'nouveau':>9} {'ratio':>6} {'ms':>7} format")
+        totals = {"bytes": 0, "legacy": [0, 0.0], "new": [0, 0.0]}
+        for name in sorted(os.listdir(corpus)):
+            path = os.path.join(corpus, name)
+            size = os.path.getsize(path)
+            base = os.path.join(out, os.path.splitext(name)[0])
+
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                legacy_path = legacy_compress(path, base + "-legacy", args.rate)
+            legacy_time = (time.perf_counter() - start) / args.repeat
+            legacy_size = os.path.getsize(legacy_path)
+
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                stats = optimize_image(path, base + "-new", args.rate,
+                                       target_size=args.target_size, max_dimension=args.max_dimension)
+            new_time = (time.perf_counter() - start) / args.repeat
+
+            totals["bytes"] += size
+            totals["legacy"][0] += legacy_size
+            totals["legacy"][1] += legacy_time
+            totals["new"][0] += stats["compressed_size"]
+            totals["new"][1] += new_time
+            print(f"{name:<18} {size:>10} | {legacy_size:>9} {legacy_size / size:>6.3f} {legacy_time * 1000:>7.1f} | "
+                  f"{stats['compressed_size']:>9} {stats['ratio']:>6.3f} {new_time * 1000:>7.1f} "
+                  f"{stats['format']} q{stats['quality']} {stats['width']}x{stats['height']}")
+
+        mb = totals["bytes"] / 1e6
+        for label in ("legacy", "new"):
+            out_size, elapsed = totals[label]
+            print(f"{label:<7} ratio global {out_size / totals['bytes']:.3f}  débit {mb / elapsed:.1f} Mo/s")
+
+
+if __name__ == "__main__":
+    main()
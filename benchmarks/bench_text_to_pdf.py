@@ -0,0 +1,64 @@
+"""
+Benchmark texte → PDF : ancien rendu FPDF (multi_cell ligne par ligne)
+contre TextPdfWriter (découpage en bloc, pages écrites au fil de l'eau).
+
+    python benchmarks/bench_text_to_pdf.py [--lines 1000 10000 100000] [--legacy-max 10000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fpdf import FPDF  # noqa: E402
+from pypdf import PdfReader  # noqa: E402
+
+from services.text_pdf import TextPdfWriter  # noqa: E402
+
+SAMPLE = "Ligne {n} : le renard brun rapide saute par-dessus le chien paresseux, encore et encore."
+
+
+def legacy_text_to_pdf(lines, output_path, font_size=12):
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.set_font("Arial", size=font_size)
+    for line in lines:
+        pdf.multi_cell(0, 10, line)
+    pdf.output(output_path)
+
+
+def streaming_text_to_pdf(lines, output_path, font_size=12):
+    with TextPdfWriter(output_path, font_size=font_size) as pdf:
+        pdf.write_lines(lines)
+
+
+def run(name, render, count, folder):
+    lines = [SAMPLE.format(n=n) for n in range(count)]
+    output_path = os.path.join(folder, f"{name}-{count}.pdf")
+    start = time.perf_counter()
+    render(lines, output_path)
+    elapsed = time.perf_counter() - start
+    pages = len(PdfReader(output_path).pages)
+    print(f"{name:<10} {count:>8} lignes  {pages:>6} pages  {elapsed:>8.2f} s  "
+          f"{pages / elapsed:>9.1f} pages/s  {count / elapsed:>10.0f} lignes/s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--legacy-max", type=int, default=100000,
+                        help="n'exécute pas l'ancien rendu au-delà de ce nombre de lignes")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        for count in args.lines:
+            if count <= args.legacy_max:
+                run("fpdf", legacy_text_to_pdf, count, folder)
+            run("streaming", streaming_text_to_pdf, count, folder)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,93 @@
-class BaseConfig:
-    SECRET_KEY = "change-me"
-    MAX_CONTENT_LENGTH = 200 * 1024 * 1024  # 200 MB max
-    UPLOAD_FOLDER = "static/uploads"
-    CONVERTED_FOLDER = "static/converted"
-    ALLOWED_EXTENSIONS = ["pdf", "docx", "jpg", "png", "txt", "md", "html"]
-
-    ENABLE_SCHEDULER = True
-    CLEAN_INTERVAL_MINUTES = 30  # nettoyage toutes les 30 min
-    FILE_EXPIRATION_MINUTES = 60  # supprimer fichiers vieux de 1h
+import os
+
+
+class BaseConfig:
+    SECRET_KEY = os.environ.get("SECRET_KEY", "un_secret_key")
+    MAX_CONTENT_LENGTH = 200 * 1024 * 1024  # 200 MB max
+    UPLOAD_FOLDER = "static/uploads"
+    CONVERTED_FOLDER = "static/converted"
+    ALLOWED_EXTENSIONS = ["pdf", "docx", "jpg", "png", "txt", "md", "html"]
+
+    # Base de données : DATABASE_URL (ex. postgresql+psycopg://user:mdp@hôte/convertify), sinon SQLite
+    SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URL", "sqlite:///users.db")
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # SQLite : pragmas exécutés à chaque connexion (None = valeur par défaut de SQLite)
+    SQLITE_JOURNAL_MODE = "WAL"  # lecteurs et écrivain ne se bloquent plus entre workers
+    SQLITE_SYNCHRONOUS = "NORMAL"  # fsync aux checkpoints seulement (sûr en WAL)
+    SQLITE_BUSY_TIMEOUT_MS = 5000  # attente du verrou d'écriture avant « database is locked »
+    SQLITE_MMAP_SIZE = 256 * 1024 * 1024
+    # Bases serveur (PostgreSQL) : pool de connexions par processus
+    DB_POOL_SIZE = 5
+    DB_MAX_OVERFLOW = 10
+    DB_POOL_TIMEOUT = 30  # secondes d'attente d'une connexion libre
+    DB_POOL_RECYCLE = 1800  # secondes ; sous le délai d'inactivité du serveur / pgbouncer
+    DB_POOL_PRE_PING = True  # connexion coupée détectée avant usage
+
+    ENABLE_SCHEDULER = True
+    CLEAN_INTERVAL_MINUTES = 30  # nettoyage toutes les 30 min
+    FILE_EXPIRATION_MINUTES = 60  # supprimer fichiers vieux de 1h
+    CLEANER_MAX_BYTES = 2 * 1024 * 1024 * 1024  # plafond uploads + résultats (hors cache), 2 GB
+    CLEANER_RESCAN_HOURS = 6  # parcours complet pour les fichiers non inscrits
+    CLEANER_INDEX_PATH = "instance/cleaner.db"  # index des échéances (hors static/)
+
+    # Conversions asynchrones (file de jobs)
+    ASYNC_THRESHOLD_BYTES = 5 * 1024 * 1024  # au-delà → job asynchrone
+    JOB_MAX_WORKERS = 2  # processus de conversion
+    JOB_QUEUE_MAX = 20  # jobs en attente max par worker web
+    BATCH_MAX_FILES = 50  # fichiers max par requête /convert/batch
+    RENDER_POOL_MAX_WORKERS = 4  # processus partagés pour le rendu par lots (PDF → images…)
+    ARCHIVE_MAX_WORKERS = 4  # threads de compression d'archive (gz/bz2/xz/zst) par processus web
+
+    # Contrôle d'admission (par processus web ; gunicorn.conf.py : workers à threads)
+    # Plafonds par utilisateur appliqués aussi aux jobs asynchrones et aux lots (file de jobs)
+    ADMISSION_MAX_TOTAL = 8  # conversions simultanées
+    ADMISSION_MAX_PER_USER = 2
+    ADMISSION_MAX_PER_KEY = 2
+    ADMISSION_MAX_PER_IP = 4  # IP du client : derrière un proxy, régler PROXY_FIX_X_FOR
+    ADMISSION_QUEUE_MAX = 32  # demandes en attente ; au-delà → 429 + Retry-After
+    ADMISSION_MAX_WAIT = 30  # secondes d'attente max dans la file
+    ADMISSION_BASE_LIMIT = 100  # daily_limit de poids 1 (poids = daily_limit / base)
+    # Proxies de confiance devant l'application (Render, nginx…) : request.remote_addr lu dans
+    # X-Forwarded-For (ProxyFix). 0 = accès direct ; sinon tous les visiteurs partagent l'IP du proxy.
+    PROXY_FIX_X_FOR = int(os.environ.get("PROXY_FIX_X_FOR", 0))
+
+    # Utilisateurs et clés API en mémoire (authentification sans requête SQL)
+    PRINCIPAL_CACHE_SIZE = 10000
+    PRINCIPAL_CACHE_TTL = 30  # secondes ; borne le retard des autres processus après une action admin
+
+    # Listes admin paginées par curseur (/admin/api/<liste>)
+    ADMIN_PAGE_SIZE = 50
+    ADMIN_PAGE_MAX = 500
+    ADMIN_EXPORT_CHUNK = 1000  # lignes lues par lot (yield_per) pendant un export CSV/NDJSON
+
+    # Cache des résultats de conversion (adressé par contenu)
+    CACHE_MAX_BYTES = 500 * 1024 * 1024  # 500 MB
+    CACHE_MAX_AGE_SECONDS = 24 * 3600  # 1 jour
+
+    # Journal des requêtes (écriture différée par lots)
+    LOG_QUEUE_MAX = 10000  # au-delà, les entrées sont abandonnées
+    LOG_BATCH_SIZE = 200
+    LOG_FLUSH_INTERVAL = 2.0  # secondes
+
+    # Quotas API (jetons en mémoire devant la base, optionnel)
+    QUOTA_BUCKET_ENABLED = False
+    QUOTA_BUCKET_SIZE = 10  # jetons réservés d'un coup par utilisateur
+    QUOTA_SYNC_INTERVAL = 30  # secondes avant de rendre les jetons inutilisés
+
+    # Téléchargements : résultats conservés par id de contenu (sha256)
+    DOWNLOAD_TTL_SECONDS = 3600
+    # None (fichier servi par le worker, os.sendfile sous gunicorn), "x-sendfile" ou "x-accel-redirect"
+    DOWNLOAD_OFFLOAD = None
+    DOWNLOAD_ACCEL_PREFIX = "/_downloads/"  # location nginx "internal" → static/converted/downloads/
+
+    # Endpoint /metrics (Prometheus) : None = ouvert
+    METRICS_TOKEN = None
+    # Histogrammes d'étapes partagés entre workers (un fichier par processus, vidé au démarrage de gunicorn)
+    STAGE_METRICS_DIR = os.environ.get("STAGE_METRICS_DIR", "instance/stage_metrics")
+
+    # Police TTF Unicode pour texte → PDF (None = recherche d'une police système)
+    PDF_FONT_PATH = None
+
+    # Démarrage : création du schéma + admin à chaque import de app.py (run.py, gunicorn app:app).
+    # INIT_DB_ON_STARTUP=0 : démarrage plus rapide, schéma créé une fois par `flask --app app init-db`
+    INIT_DB_ON_STARTUP = True
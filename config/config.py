@@ -1,8 +1,9 @@
-import os
-
-class Config:
-    SECRET_KEY = os.environ.get("SECRET_KEY", "dev_secret_key")
-    DEBUG = False
-    DATABASE = "db.sqlite3"
-    API_QUOTA = 100
-    METRICS_REFRESH_INTERVAL = 30  # en secondes
+import os
+
+class Config:
+    SECRET_KEY = os.environ.get("SECRET_KEY", "dev_secret_key")
+    DEBUG = False
+    DATABASE = "db.sqlite3"
+    API_QUOTA = 100
+    METRICS_REFRESH_INTERVAL = 30  # en secondes
+    METRICS_HISTORY_SIZE = 120  # échantillons gardés en mémoire
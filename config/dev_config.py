@@ -1,5 +1,5 @@
-from .base_config import BaseConfig
-
-class DevelopmentConfig(BaseConfig):
-    DEBUG = True
-    ENV = "development"
+from .base_config import BaseConfig
+
+class DevelopmentConfig(BaseConfig):
+    DEBUG = True
+    ENV = "development"
@@ -1,5 +1,5 @@
-from .base_config import BaseConfig
-
-class ProductionConfig(BaseConfig):
-    DEBUG = False
-    ENV = "production"
+from .base_config import BaseConfig
+
+class ProductionConfig(BaseConfig):
+    DEBUG = False
+    ENV = "production"
@@ -1,20 +1,20 @@
-# site_config.py
-class SiteConfig:
-    SITE_NAME = "Convertify"
-    SITE_DESCRIPTION = "Convertisseur et compresseur de fichiers en ligne"
-    SITE_URL = "https://convertify.example.com"
-    FOUNDER = "Mohamed Idir"
-    SUPPORT_EMAIL = "support@convertify.example.com"
-    MAIL = "admin@example.com"
-    INDICATIF = "+33"
-    PHONE_NUMBER = "7 77 77 77 77"
-    ADRESS = "XXXXXXXXXX"
-
-    # Réseaux sociaux
-    FACEBOOK = "##"
-    INSTAGRAM = "##"
-    TWITTER = "##"
-
-
-    LINKEDIN = "##"
+# site_config.py
+class SiteConfig:
+    SITE_NAME = "Convertify"
+    SITE_DESCRIPTION = "Convertisseur et compresseur de fichiers en ligne"
+    SITE_URL = "https://convertify.example.com"
+    FOUNDER = "Mohamed Idir"
+    SUPPORT_EMAIL = "support@convertify.example.com"
+    MAIL = "admin@example.com"
+    INDICATIF = "+33"
+    PHONE_NUMBER = "7 77 77 77 77"
+    ADRESS = "XXXXXXXXXX"
+
+    # Réseaux sociaux
+    FACEBOOK = "##"
+    INSTAGRAM = "##"
+    TWITTER = "##"
+
+
+    LINKEDIN = "##"
     GITHUB = "##"
\ No newline at end of file
@@ -0,0 +1,47 @@
+import gc
+import os
+
+# Chargé automatiquement par gunicorn (répertoire courant).
+# Configuration de production par défaut (config.get_config) : DEBUG désactivé.
+os.environ.setdefault("FLASK_ENV", "production")
+
+# Workers à threads : plusieurs requêtes en vol par processus, ce que le contrôle
+# d'admission (par processus, services/admission.py) suppose. Peu de processus,
+# beaucoup de threads : les plafonds par utilisateur sont multipliés par `workers`.
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 8))
+
+# PRELOAD_WARMUP=1 : l'application et les convertisseurs sont importés et exercés
+# une fois dans le maître, puis partagés par les workers (copie sur écriture).
+preload_app = os.environ.get("PRELOAD_WARMUP", "0") == "1"
+
+
+def on_starting(server):
+    """Maître au démarrage : histogrammes d'étapes des processus précédents effacés."""
+    import glob
+
+    from config.base_config import BaseConfig
+
+    # fichiers seulement : avec preload_app, l'application (et le dossier) existe déjà
+    for path in glob.glob(os.path.join(BaseConfig.STAGE_METRICS_DIR, "*.json")):
+        os.remove(path)
+
+
+def when_ready(server):
+    """Maître prêt, workers pas encore forkés."""
+    if not preload_app:
+        return
+
+    from app import app
+    from models.db import db
+    from services.warmup import warm_up
+
+    timings = warm_up()
+    # connexions ouvertes dans le maître (INIT_DB_ON_STARTUP) : jamais partagées après le fork
+    with app.app_context():
+        db.engine.dispose()
+    # objets déjà chargés exclus du GC : ses passages ne réécrivent pas les pages partagées
+    gc.collect()
+    gc.freeze()
+    print(f"🔥 Convertisseurs préchargés en {timings['total']:.2f} s", flush=True)
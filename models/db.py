@@ -1,3 +1,59 @@
-from flask_sqlalchemy import SQLAlchemy
-
-db = SQLAlchemy()
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+from config.base_config import BaseConfig
+
+db = SQLAlchemy()
+
+
+def _config(config, name):
+    return config.get(name, getattr(BaseConfig, name))
+
+
+def is_sqlite(config):
+    return make_url(_config(config, "SQLALCHEMY_DATABASE_URI")).get_backend_name() == "sqlite"
+
+
+def engine_options(config):
+    """Options du moteur : SQLite garde le pool par défaut, une base serveur reçoit un pool réglable."""
+    if is_sqlite(config):
+        return {}
+    return {
+        "pool_size": _config(config, "DB_POOL_SIZE"),
+        "max_overflow": _config(config, "DB_MAX_OVERFLOW"),
+        "pool_timeout": _config(config, "DB_POOL_TIMEOUT"),
+        "pool_recycle": _config(config, "DB_POOL_RECYCLE"),
+        "pool_pre_ping": _config(config, "DB_POOL_PRE_PING"),
+    }
+
+
+def sqlite_pragmas(config):
+    pragmas = [
+        ("journal_mode", _config(config, "SQLITE_JOURNAL_MODE")),
+        ("synchronous", _config(config, "SQLITE_SYNCHRONOUS")),
+        ("busy_timeout", _config(config, "SQLITE_BUSY_TIMEOUT_MS")),
+        ("mmap_size", _config(config, "SQLITE_MMAP_SIZE")),
+    ]
+    return [f"PRAGMA {name}={value}" for name, value in pragmas if value is not None]
+
+
+def apply_sqlite_pragmas(engine, config):
+    """Pragmas exécutés à l'ouverture de chaque connexion du pool."""
+    pragmas = sqlite_pragmas(config)
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+
+def init_db_engine(app):
+    """db.init_app avec les options du moteur tirées de la configuration."""
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", engine_options(app.config))
+    db.init_app(app)
+    if is_sqlite(app.config):
+        with app.app_context():
+            apply_sqlite_pragmas(db.engine, app.config)
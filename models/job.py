@@ -0,0 +1,40 @@
+from datetime import datetime
+from .db import db
+
+
+# ----------------------------------------------------
+# ⏳ Modèle Job de conversion asynchrone
+# ----------------------------------------------------
+class ConversionJob(db.Model):
+    __tablename__ = "conversion_jobs"
+
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, index=True)
+    key_id = db.Column(db.Integer, nullable=True)  # clé API débitée, rendue si le job échoue
+
+    # pending → done / failed
+    status = db.Column(db.String(20), default="pending", nullable=False)
+    source_name = db.Column(db.String(255), nullable=True)
+    target_format = db.Column(db.String(10), nullable=False)
+    options = db.Column(db.Text, nullable=True)  # JSON (dpi, pages…)
+    input_path = db.Column(db.String(512), nullable=False)
+    input_hash = db.Column(db.String(64), nullable=True)
+    output_path = db.Column(db.String(512), nullable=True)
+    error = db.Column(db.Text, nullable=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<ConversionJob {self.id} [{self.status}] - user {self.user_id}>"
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "status": self.status,
+            "source_name": self.source_name,
+            "target_format": self.target_format,
+            "error": self.error,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None
+        }
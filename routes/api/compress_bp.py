@@ -1,56 +1,128 @@
-from flask import Blueprint, request, send_file, jsonify
-from flask_login import login_required
-from services.compressor import FileCompressor
-from services.file_utils import save_file
-
-compress_bp = Blueprint("compress", __name__, url_prefix="/convertify/api")
-
-
-
-
-# appliquer automatiquement à toutes les routes du blueprint
-@compress_bp.before_request
-def check_user_active():
-    from flask_login import current_user
-
-    # si non connecté → laisse l'autre décorateur gérer
-    if not current_user.is_authenticated:
-        return
-
-    # si désactivé → bloque tout
-    if not current_user.is_active:
-        return {"error": "Compte désactivé"}, 403
-
-
-
-
-
-
-
-
-
-@compress_bp.route("/compress", methods=["POST"])
-def compress_file():
-    try:
-        if "file" not in request.files:
-            return jsonify({"error": "Aucun fichier envoyé"}), 400
-
-        file = request.files["file"]
-        rate = request.form.get("rate", 70)
-
-        try:
-            rate = int(rate)
-        except:
-            rate = 70
-
-        input_path = save_file(file)
-        output_path = FileCompressor.compress_file(input_path, rate)
-
-        return send_file(
-            output_path,
-            as_attachment=True,
-            download_name=output_path.split("/")[-1]
-        )
-
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+import os
+from flask import Blueprint, request, jsonify
+from flask_login import login_required, current_user
+from werkzeug.exceptions import HTTPException
+from werkzeug.utils import secure_filename
+from services.admission import admission_controlled
+from services.archive import ARCHIVE_MODES
+from services.downloads import download_store
+from services.file_utils import save_file
+from services.metrics_sampler import metrics_sampler
+from services.quota import quota, NoActiveKey, QuotaExceeded
+from services.stage_metrics import stage_metrics
+from routes.api.downloads import download_url
+
+compress_bp = Blueprint("compress", __name__, url_prefix="/convertify/api")
+
+
+
+
+# appliquer automatiquement à toutes les routes du blueprint
+@compress_bp.before_request
+def check_user_active():
+    from flask_login import current_user
+
+    # si non connecté → laisse l'autre décorateur gérer
+    if not current_user.is_authenticated:
+        return
+
+    # si désactivé → bloque tout
+    if not current_user.is_active:
+        return {"error": "Compte désactivé"}, 403
+
+
+
+
+
+
+
+
+
+def download_name_for(source_name, input_path, output_path):
+    """Nom proposé au téléchargement : nom d'origine + suffixe du résultat (-compressed.csv.gz…)."""
+    stem = os.path.splitext(secure_filename(source_name or ""))[0] or "fichier"
+    prefix = os.path.splitext(os.path.basename(input_path))[0]
+    return stem + os.path.basename(output_path)[len(prefix):]
+
+
+@compress_bp.route("/compress", methods=["POST"])
+@admission_controlled()
+def compress_file():
+    try:
+        if "file" not in request.files:
+            return jsonify({"error": "Aucun fichier envoyé"}), 400
+
+        file = request.files["file"]
+        rate = request.form.get("rate", 70)
+
+        try:
+            rate = int(rate)
+        except:
+            rate = 70
+
+        # Options images : taille cible (octets), côté max (px), format (auto/jpeg/webp/png)
+        try:
+            target_size = int(request.form.get("target_size") or 0) or None
+            max_dimension = int(request.form.get("max_dimension") or 0) or None
+        except ValueError:
+            return jsonify({"error": "target_size et max_dimension doivent être des entiers"}), 400
+        image_format = (request.form.get("format") or "auto").lower()
+        if image_format not in ("auto", "jpeg", "webp", "png"):
+            return jsonify({"error": "Format image invalide (auto, jpeg, webp, png)"}), 400
+
+        # Autres fichiers : codec d'archive (zip par défaut, "auto" choisit selon le contenu)
+        archive_mode = (request.form.get("codec") or "zip").lower()
+        if archive_mode not in ARCHIVE_MODES:
+            return jsonify({"error": f"Codec invalide ({', '.join(ARCHIVE_MODES)})"}), 400
+
+        # Quota quotidien des clés API (même débit atomique que /convert) ;
+        # la compression reste ouverte aux visiteurs et comptes sans clé
+        key_id = None
+        if current_user.is_authenticated:
+            try:
+                key_id = quota.consume(current_user.id)
+            except NoActiveKey:
+                key_id = None
+
+        input_ext = os.path.splitext(file.filename or "")[1]
+        try:
+            # import différé : Pillow et pypdf ne sont chargés qu'à la première compression
+            from services.compressor import FileCompressor
+
+            input_path = save_file(file)
+            with metrics_sampler.track_conversion(), stage_metrics.timed("compress", input_ext, "compressed"):
+                output_path = FileCompressor.compress_file(input_path, rate, target_size=target_size,
+                                                           max_dimension=max_dimension, image_format=image_format,
+                                                           archive_mode=archive_mode, source_name=file.filename)
+            # gain obtenu (le PDF d'origine est renvoyé tel quel s'il n'y a aucun gain)
+            original_size, compressed_size = os.path.getsize(input_path), os.path.getsize(output_path)
+        except Exception:
+            if key_id is not None:
+                quota.refund(current_user.id, key_id)
+            raise
+
+        # résultat conservé DOWNLOAD_TTL_SECONDS sous son id de contenu (Range, ETag)
+        name = download_name_for(file.filename, input_path, output_path)
+        content_id = download_store.publish(output_path)
+        response = download_store.send(content_id, name)
+        if response is None:
+            # résultat supprimé entre la publication et l'envoi (nettoyage) : non livré, non décompté
+            if key_id is not None:
+                quota.refund(current_user.id, key_id)
+            return jsonify({"error": "Résultat expiré avant l'envoi, relancez la compression"}), 410
+        response.headers["X-Download-URL"] = download_url(content_id, name)
+        response.headers["X-Original-Size"] = str(original_size)
+        response.headers["X-Compressed-Size"] = str(compressed_size)
+        response.headers["X-Compression-Ratio"] = f"{compressed_size / original_size:.4f}" if original_size else "1.0000"
+        return response
+
+    except QuotaExceeded as e:
+        return jsonify({"error": str(e)}), 429
+    except ValueError as e:
+        # CompressionFailed (services/compressor.py) : fichier illisible, quota déjà rendu
+        return jsonify({"error": str(e)}), 422
+    except HTTPException as e:
+        # upload refusé pendant la lecture (trop gros, type interdit)
+        return jsonify({"error": e.description}), e.code
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
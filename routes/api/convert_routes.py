@@ -1,98 +1,322 @@
-from flask import Blueprint, request, send_file, jsonify
-from flask_login import login_required, current_user
-from services.converter import FileConverter
-from models.user import APIKey, RequestLog, db
-import os
-import time
-
-convert_bp = Blueprint("convert", __name__, url_prefix="/convertify/api")
-
-# Formats autorisés
-ALLOWED_FORMATS = ["pdf", "png", "txt", "jpg", "docx"]
-
-# -------------------------
-# Vérification compte actif
-# -------------------------
-@convert_bp.before_request
-def check_user_active():
-    if not current_user.is_authenticated:
-        return
-    if not current_user.is_active:
-        return jsonify({"error": "Compte désactivé"}), 403
-
-# -------------------------
-# Endpoint de conversion
-# -------------------------
-@convert_bp.route("/convert", methods=["POST"])
-@login_required
-def convert_file():
-
-    try:
-        # Vérification présence fichier
-        if "file" not in request.files:
-            return jsonify({"error": "Aucun fichier envoyé"}), 400
-
-        file = request.files["file"]
-        if file.filename == "":
-            return jsonify({"error": "Fichier invalide"}), 400
-
-        # Vérification format cible
-        target_format = request.form.get("format", "").lower().strip()
-        if target_format not in ALLOWED_FORMATS:
-            return jsonify({"error": "Format cible invalide ou non supporté"}), 400
-
-        # Vérifier quota quotidien
-        api_keys = APIKey.query.filter_by(user_id=current_user.id, revoked=False).all()
-        if not api_keys:
-            return jsonify({"error": "Aucune clé API active trouvée"}), 403
-
-        total_today_usage = sum(k.today_usage for k in api_keys)
-        total_daily_limit = sum(k.daily_limit for k in api_keys)
-
-        if total_today_usage >= total_daily_limit:
-            return jsonify({"error": "Quota journalier dépassé"}), 429
-
-        # Conversion
-        start_time = time.time()
-        converter = FileConverter()
-        output_path = converter.convert_file(file, target_format)
-        duration_ms = (time.time() - start_time) * 1000
-
-        # Mettre à jour utilisation today_usage
-        for k in api_keys:
-            k.today_usage += 1
-        db.session.commit()
-
-        # Log de la requête
-        log = RequestLog(
-            user_id=current_user.id,
-            endpoint=request.path,
-            method=request.method,
-            status_code=200,
-            ip_address=request.remote_addr,
-            user_agent=request.user_agent.string,
-            response_time_ms=duration_ms
-        )
-        db.session.add(log)
-        db.session.commit()
-
-        # Envoi fichier
-        response = send_file(
-            output_path,
-            as_attachment=True,
-            download_name=os.path.basename(output_path)
-        )
-
-        # Supprimer fichier temporaire après envoi
-        @response.call_on_close
-        def cleanup_temp():
-            try:
-                if os.path.exists(output_path):
-                    os.remove(output_path)
-            except Exception as e:
-                print(f"Erreur suppression fichier temporaire : {e}")
-
-        return response
-
-    except Exception as e:
-        return jsonify({"error": f"Erreur interne : {str(e)}"}), 500
+from flask import Blueprint, Response, request, jsonify, current_app, url_for
+from flask_login import login_required, current_user
+from werkzeug.exceptions import HTTPException
+from werkzeug.utils import secure_filename
+from config.base_config import BaseConfig
+from services.converter import FileConverter, InvalidPageRange, parse_page_spec
+from services.admission import admission_controlled
+from services.batch import stream_batch_zip
+from services.downloads import download_store
+from services import formats
+from services.file_utils import save_file_with_hash
+from services.job_queue import submit_job
+from services.log_writer import log_writer
+from services.metrics_sampler import metrics_sampler
+from services.quota import quota, NoActiveKey, QuotaExceeded
+from services.result_cache import get_result_cache
+from services.stage_metrics import stage_metrics
+from models.job import ConversionJob
+from routes.api.downloads import download_url
+from datetime import date, datetime
+import os
+import time
+
+convert_bp = Blueprint("convert", __name__, url_prefix="/convertify/api")
+
+# Formats autorisés : toute cible atteignable dans le registre de conversion
+ALLOWED_FORMATS = sorted(formats.targets())
+
+# -------------------------
+# Vérification compte actif
+# -------------------------
+@convert_bp.before_request
+def check_user_active():
+    if not current_user.is_authenticated:
+        return
+    if not current_user.is_active:
+        return jsonify({"error": "Compte désactivé"}), 403
+
+# -------------------------
+# Endpoint de conversion
+# -------------------------
+@convert_bp.route("/convert", methods=["POST"])
+@login_required
+@admission_controlled()
+def convert_file():
+
+    try:
+        # Vérification présence fichier (le premier accès lit tout l'upload)
+        upload_start = time.perf_counter()
+        if "file" not in request.files:
+            return jsonify({"error": "Aucun fichier envoyé"}), 400
+        upload_seconds = time.perf_counter() - upload_start
+
+        file = request.files["file"]
+        if file.filename == "":
+            return jsonify({"error": "Fichier invalide"}), 400
+
+        # Vérification format cible
+        target_format = request.form.get("format", "").lower().strip()
+        if target_format not in ALLOWED_FORMATS:
+            return jsonify({"error": "Format cible invalide ou non supporté"}), 400
+
+        input_ext = os.path.splitext(file.filename)[1]
+        if not formats.can_convert(input_ext, target_format):
+            return jsonify({"error": f"Conversion {input_ext or '?'} → {target_format} non supportée"}), 400
+        stage_metrics.observe("upload", upload_seconds, input_ext, target_format)
+
+        # Options de rastérisation PDF (dpi, plage de pages)
+        try:
+            options = parse_options(request.form)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        # Quota quotidien : vérification + débit en un seul UPDATE atomique
+        key_id = quota.consume(current_user.id)
+
+        start_time = time.time()
+        try:
+            input_path, digest = save_file_with_hash(file)
+
+            # Résultat déjà calculé pour ce contenu → servi directement
+            cache = get_result_cache()
+            with stage_metrics.timed("cache_lookup", input_ext, target_format):
+                output_path = cache.get(digest, target_format, options)
+            if output_path:
+                os.remove(input_path)
+            else:
+                # Gros fichier (ou ?async=1) → job asynchrone, réponse immédiate
+                threshold = current_app.config.get("ASYNC_THRESHOLD_BYTES", BaseConfig.ASYNC_THRESHOLD_BYTES)
+                if request.args.get("async") == "1" or os.path.getsize(input_path) > threshold:
+                    return submit_conversion_job(key_id, input_path, digest, target_format, options, file.filename)
+
+                # Conversion
+                converter = FileConverter()
+                with metrics_sampler.track_conversion():
+                    output_path = converter.convert_path(input_path, target_format, options)
+                output_path = cache.put(digest, target_format, output_path, options)
+        except Exception:
+            # conversion non livrée → l'appel n'est pas décompté
+            quota.refund(current_user.id, key_id)
+            raise
+        duration_ms = (time.time() - start_time) * 1000
+
+        # Log de la requête (écriture différée)
+        log_writer.push({
+            "user_id": current_user.id,
+            "endpoint": request.path,
+            "method": request.method,
+            "status_code": 200,
+            "ip_address": request.remote_addr,
+            "user_agent": request.user_agent.string[:255],
+            "date": date.today(),
+            "time": datetime.utcnow(),
+            "response_time_ms": duration_ms
+        })
+
+        # Résultat publié sous son id de contenu et conservé DOWNLOAD_TTL_SECONDS
+        # (le corps est streamé par le serveur WSGI ; reprise possible via X-Download-URL)
+        with stage_metrics.timed("send", input_ext, target_format):
+            name = download_name_for(file.filename, output_path)
+            content_id = download_store.publish(output_path, keep_source=output_path.startswith(cache.folder))
+            response = download_store.send(content_id, name)
+        if response is None:
+            # résultat supprimé entre la publication et l'envoi (nettoyage) : non livré, non décompté
+            quota.refund(current_user.id, key_id)
+            return jsonify({"error": "Résultat expiré avant l'envoi, relancez la conversion"}), 410
+        response.headers["X-Download-URL"] = download_url(content_id, name)
+
+        return response
+
+    except NoActiveKey as e:
+        return jsonify({"error": str(e)}), 403
+    except QuotaExceeded as e:
+        return jsonify({"error": str(e)}), 429
+    except InvalidPageRange as e:
+        # plage hors du document (ex. début au-delà de la dernière page)
+        return jsonify({"error": str(e)}), 400
+    except HTTPException as e:
+        # upload refusé pendant la lecture (trop gros, type interdit)
+        return jsonify({"error": e.description}), e.code
+    except Exception as e:
+        return jsonify({"error": f"Erreur interne : {str(e)}"}), 500
+
+
+def parse_options(form):
+    """Options de conversion du formulaire ; ValueError (message affichable) si invalides."""
+    options = {}
+    if form.get("dpi"):
+        try:
+            options["dpi"] = int(form["dpi"])
+        except ValueError:
+            raise ValueError("DPI invalide (36 à 600)") from None
+        if not 36 <= options["dpi"] <= 600:
+            raise ValueError("DPI invalide (36 à 600)")
+    if form.get("pages"):
+        # syntaxe vérifiée ici ; la plage est confrontée au nombre de pages à la conversion
+        parse_page_spec(form["pages"])
+        options["pages"] = form["pages"].strip()
+    return options
+
+
+def download_name_for(source_name, output_path):
+    """Nom proposé au téléchargement : nom d'origine + extension de sortie."""
+    stem = os.path.splitext(secure_filename(source_name or ""))[0] or "fichier"
+    return f"{stem}-converted{os.path.splitext(output_path)[1]}"
+
+
+def submit_conversion_job(key_id, input_path, digest, target_format, options, source_name):
+    """Envoie la conversion au pool de processus et renvoie 202 + id du job."""
+    config = current_app.config
+    job = submit_job(
+        current_app._get_current_object(),
+        current_user.id,
+        input_path,
+        target_format,
+        input_hash=digest,
+        options=options,
+        source_name=source_name,
+        key_id=key_id,
+        max_workers=config.get("JOB_MAX_WORKERS", BaseConfig.JOB_MAX_WORKERS),
+        queue_max=config.get("JOB_QUEUE_MAX", BaseConfig.JOB_QUEUE_MAX),
+        max_per_user=config.get("ADMISSION_MAX_PER_USER", BaseConfig.ADMISSION_MAX_PER_USER)
+    )
+    if job is None:
+        os.remove(input_path)
+        quota.refund(current_user.id, key_id)
+        return jsonify({"error": "File de conversion pleine ou trop de conversions en cours, réessayez plus tard"}), 503
+
+    return jsonify({
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": url_for("convert.job_status", job_id=job.id)
+    }), 202
+
+
+# -------------------------
+# Conversion par lot → ZIP en streaming
+# -------------------------
+@convert_bp.route("/convert/batch", methods=["POST"])
+@login_required
+@admission_controlled(hold_while_streaming=True)
+def convert_batch():
+    try:
+        files = [f for f in request.files.getlist("files") if f.filename]
+        if not files:
+            return jsonify({"error": "Aucun fichier envoyé"}), 400
+
+        max_files = current_app.config.get("BATCH_MAX_FILES", BaseConfig.BATCH_MAX_FILES)
+        if len(files) > max_files:
+            return jsonify({"error": f"Trop de fichiers (max {max_files})"}), 400
+
+        target_format = request.form.get("format", "").lower().strip()
+        if target_format not in ALLOWED_FORMATS:
+            return jsonify({"error": "Format cible invalide ou non supporté"}), 400
+
+        unsupported = [f.filename for f in files
+                       if not formats.can_convert(os.path.splitext(f.filename)[1], target_format)]
+        if unsupported:
+            return jsonify({"error": f"Conversion vers {target_format} non supportée", "files": unsupported}), 400
+
+        try:
+            options = parse_options(request.form)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        # Quota : tout le lot débité en un seul UPDATE atomique
+        try:
+            key_id = quota.consume(current_user.id, len(files))
+        except QuotaExceeded:
+            return jsonify({"error": "Quota journalier insuffisant pour ce lot"}), 429
+
+        items = []
+        try:
+            for f in files:
+                input_path, digest = save_file_with_hash(f)
+                items.append((f.filename, input_path, digest))
+        except Exception:
+            # lot non livré → rien n'est décompté
+            for _, input_path, _ in items:
+                os.remove(input_path)
+            quota.refund(current_user.id, key_id, len(files))
+            raise
+
+        # fichiers absents de l'archive (échec, file pleine, déconnexion) : quota rendu en fin de flux
+        app, user_id = current_app._get_current_object(), current_user.id
+
+        def refund_undelivered(count):
+            with app.app_context():
+                quota.refund(user_id, key_id, count)
+
+        log_writer.push({
+            "user_id": current_user.id,
+            "endpoint": request.path,
+            "method": request.method,
+            "status_code": 200,
+            "ip_address": request.remote_addr,
+            "user_agent": request.user_agent.string[:255],
+            "date": date.today(),
+            "time": datetime.utcnow(),
+            # réponse streamée : durée inconnue ici (clé requise pour l'insertion par lot)
+            "response_time_ms": None
+        })
+
+        stream = stream_batch_zip(
+            items,
+            target_format,
+            options,
+            download_name_for,
+            max_workers=current_app.config.get("JOB_MAX_WORKERS", BaseConfig.JOB_MAX_WORKERS),
+            queue_max=current_app.config.get("JOB_QUEUE_MAX", BaseConfig.JOB_QUEUE_MAX),
+            owner=user_id,
+            max_per_user=current_app.config.get("ADMISSION_MAX_PER_USER", BaseConfig.ADMISSION_MAX_PER_USER),
+            on_undelivered=refund_undelivered
+        )
+        return Response(
+            stream,
+            mimetype="application/zip",
+            headers={"Content-Disposition": "attachment; filename=convertify-batch.zip"}
+        )
+
+    except NoActiveKey as e:
+        return jsonify({"error": str(e)}), 403
+    except HTTPException as e:
+        return jsonify({"error": e.description}), e.code
+    except Exception as e:
+        return jsonify({"error": f"Erreur interne : {str(e)}"}), 500
+
+
+# -------------------------
+# Suivi d'un job asynchrone
+# -------------------------
+@convert_bp.route("/jobs/<job_id>", methods=["GET"])
+@login_required
+def job_status(job_id):
+    job = ConversionJob.query.filter_by(id=job_id, user_id=current_user.id).first()
+    if job is None:
+        return jsonify({"error": "Job introuvable"}), 404
+
+    data = job.to_dict()
+    if job.status == "done":
+        data["download_url"] = url_for("convert.job_result", job_id=job.id)
+    return jsonify(data)
+
+
+@convert_bp.route("/jobs/<job_id>/result", methods=["GET"])
+@login_required
+def job_result(job_id):
+    job = ConversionJob.query.filter_by(id=job_id, user_id=current_user.id).first()
+    if job is None:
+        return jsonify({"error": "Job introuvable"}), 404
+    if job.status != "done":
+        return jsonify({"error": "Job non terminé", "status": job.status}), 409
+    if not job.output_path or not os.path.isfile(job.output_path):
+        return jsonify({"error": "Résultat expiré ou introuvable"}), 410
+
+    name = download_name_for(job.source_name, job.output_path)
+    content_id = download_store.publish(job.output_path, keep_source=True)
+    response = download_store.send(content_id, name)
+    if response is None:
+        return jsonify({"error": "Résultat expiré ou introuvable"}), 410
+    response.headers["X-Download-URL"] = download_url(content_id, name)
+    return response
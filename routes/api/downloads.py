@@ -0,0 +1,42 @@
+from flask import Blueprint, current_app, jsonify, url_for
+from flask_login import current_user
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from werkzeug.utils import secure_filename
+from config.base_config import BaseConfig
+from services.downloads import download_store
+
+download_bp = Blueprint("downloads", __name__, url_prefix="/convertify/api")
+
+
+def _serializer():
+    return URLSafeTimedSerializer(current_app.secret_key, salt="convertify-download")
+
+
+def download_url(content_id, name):
+    """
+    URL d'un résultat publié (reprise par Range, revalidation par ETag).
+    Jeton signé (id de contenu + propriétaire), valable DOWNLOAD_TTL_SECONDS :
+    un résultat d'utilisateur connecté n'est servi qu'à lui.
+    """
+    owner_id = current_user.id if current_user.is_authenticated else None
+    token = _serializer().dumps([content_id, owner_id])
+    return url_for("downloads.download", token=token, name=name)
+
+
+# -------------------------
+# Téléchargement par jeton signé (GET et HEAD)
+# -------------------------
+@download_bp.route("/downloads/<token>/<name>", methods=["GET"])
+def download(token, name):
+    max_age = current_app.config.get("DOWNLOAD_TTL_SECONDS", BaseConfig.DOWNLOAD_TTL_SECONDS)
+    try:
+        content_id, owner_id = _serializer().loads(token, max_age=max_age)
+    except (BadSignature, ValueError):
+        return jsonify({"error": "Lien de téléchargement invalide ou expiré"}), 404
+    if owner_id is not None and (not current_user.is_authenticated or current_user.id != owner_id):
+        return jsonify({"error": "Résultat expiré ou introuvable"}), 404
+
+    response = download_store.send(content_id, secure_filename(name) or "fichier")
+    if response is None:
+        return jsonify({"error": "Résultat expiré ou introuvable"}), 404
+    return response
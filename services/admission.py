@@ -0,0 +1,208 @@
+import math
+import threading
+import time
+from functools import wraps
+
+from flask import jsonify, make_response, request
+from flask_login import current_user
+
+from config.base_config import BaseConfig
+from .principals import principals
+
+# Lissage de la durée moyenne d'une conversion (estimation du Retry-After)
+DURATION_SMOOTHING = 0.2
+# Au-delà, les étiquettes des clients inactifs sont oubliées
+MAX_TRACKED_PRINCIPALS = 10000
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("keys", "tag", "event", "granted")
+
+    def __init__(self, keys, tag):
+        self.keys = keys
+        self.tag = tag
+        self.event = threading.Event()
+        self.granted = False
+
+
+class AdmissionController:
+    """
+    Contrôle d'admission des conversions (par processus web, comme la file de jobs).
+    Plafonds simultanés par utilisateur, clé API, IP et au total ; le surplus attend
+    dans une file bornée (ADMISSION_QUEUE_MAX, ADMISSION_MAX_WAIT secondes).
+    Ordonnancement équitable pondéré : chaque client reçoit une étiquette virtuelle
+    avancée de 1/poids par demande (poids = daily_limit / ADMISSION_BASE_LIMIT) ;
+    la plus petite étiquette admissible passe en premier.
+    """
+
+    def __init__(self):
+        self.max_total = BaseConfig.ADMISSION_MAX_TOTAL
+        self.limits = {
+            "user": BaseConfig.ADMISSION_MAX_PER_USER,
+            "key": BaseConfig.ADMISSION_MAX_PER_KEY,
+            "ip": BaseConfig.ADMISSION_MAX_PER_IP,
+        }
+        self.queue_max = BaseConfig.ADMISSION_QUEUE_MAX
+        self.max_wait = BaseConfig.ADMISSION_MAX_WAIT
+        self.base_limit = BaseConfig.ADMISSION_BASE_LIMIT
+        self.rejected = 0
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._total = 0
+        self._waiting = []
+        self._tags = {}
+        self._clock = 0.0
+        self._avg_seconds = 5.0
+
+    def init_app(self, app):
+        config = app.config
+        self.max_total = config.get("ADMISSION_MAX_TOTAL", self.max_total)
+        self.limits = {
+            "user": config.get("ADMISSION_MAX_PER_USER", self.limits["user"]),
+            "key": config.get("ADMISSION_MAX_PER_KEY", self.limits["key"]),
+            "ip": config.get("ADMISSION_MAX_PER_IP", self.limits["ip"]),
+        }
+        self.queue_max = config.get("ADMISSION_QUEUE_MAX", self.queue_max)
+        self.max_wait = config.get("ADMISSION_MAX_WAIT", self.max_wait)
+        self.base_limit = config.get("ADMISSION_BASE_LIMIT", self.base_limit)
+
+    # -----------------------------
+    #   Identité de la requête
+    # -----------------------------
+    def identify(self):
+        """
+        (compteurs concernés, client pour l'équité, poids) de la requête courante.
+        IP : request.remote_addr, celle du client derrière un proxy si PROXY_FIX_X_FOR est réglé (app.py).
+        """
+        keys = [("ip", request.remote_addr or "?")]
+        principal, weight = keys[0], 1.0
+        if current_user.is_authenticated:
+            keys.append(("user", current_user.id))
+            principal = ("user", current_user.id)
+            # clé de l'en-tête X-API-Key, sinon première clé active (en cache, sans SQL)
+            key = principals.request_key() or principals.primary_key(current_user.id)
+            if key is not None:
+                keys.append(("key", key.id))
+                principal = ("key", key.id)
+                weight = max(1.0, (key.daily_limit or 0) / self.base_limit)
+        return tuple(keys), principal, weight
+
+    # -----------------------------
+    #   Admission
+    # -----------------------------
+    def acquire(self, keys, principal, weight=1.0):
+        """Bloque jusqu'à obtenir une place ; lève AdmissionRejected (file pleine, attente trop longue)."""
+        with self._lock:
+            tag = max(self._clock, self._tags.get(principal, 0.0)) + 1.0 / weight
+            self._tags[principal] = tag
+            # les demandes en attente sont toutes bloquées par leurs propres plafonds
+            # (sinon _dispatch les aurait admises) : une place libre peut être prise
+            if self._fits(keys):
+                self._grant(keys)
+                return keys, time.monotonic()
+            if len(self._waiting) >= self.queue_max:
+                self.rejected += 1
+                raise AdmissionRejected("Trop de conversions en cours, réessayez plus tard", self._retry_after())
+            waiter = _Waiter(keys, tag)
+            self._waiting.append(waiter)
+
+        if not waiter.event.wait(self.max_wait):
+            with self._lock:
+                if not waiter.granted:
+                    self._waiting.remove(waiter)
+                    self.rejected += 1
+                    raise AdmissionRejected("File de conversion saturée, réessayez plus tard", self._retry_after())
+        return keys, time.monotonic()
+
+    def release(self, ticket):
+        keys, start = ticket
+        with self._lock:
+            for key in keys:
+                count = self._in_flight[key] - 1
+                if count:
+                    self._in_flight[key] = count
+                else:
+                    del self._in_flight[key]
+            self._total -= 1
+            elapsed = time.monotonic() - start
+            self._avg_seconds += DURATION_SMOOTHING * (elapsed - self._avg_seconds)
+            self._dispatch()
+
+    def _fits(self, keys):
+        return self._total < self.max_total and all(
+            self._in_flight.get(key, 0) < self.limits[key[0]] for key in keys
+        )
+
+    def _grant(self, keys):
+        for key in keys:
+            self._in_flight[key] = self._in_flight.get(key, 0) + 1
+        self._total += 1
+
+    def _dispatch(self):
+        """Sous verrou : admet les demandes en attente, plus petite étiquette d'abord."""
+        while self._waiting:
+            eligible = [w for w in self._waiting if self._fits(w.keys)]
+            if not eligible:
+                break
+            waiter = min(eligible, key=lambda w: w.tag)
+            self._waiting.remove(waiter)
+            self._clock = max(self._clock, waiter.tag)
+            self._grant(waiter.keys)
+            waiter.granted = True
+            waiter.event.set()
+
+        if len(self._tags) > MAX_TRACKED_PRINCIPALS:
+            # étiquette déjà dépassée par l'horloge : équivalente à une absence d'historique
+            self._tags = {p: t for p, t in self._tags.items() if t > self._clock}
+
+    def _retry_after(self):
+        return max(1, math.ceil(self._avg_seconds * (len(self._waiting) + 1) / max(1, self.max_total)))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "in_flight": self._total,
+                "waiting": len(self._waiting),
+                "rejected": self.rejected,
+                "avg_seconds": round(self._avg_seconds, 3)
+            }
+
+
+admission = AdmissionController()
+
+
+def admission_controlled(hold_while_streaming=False):
+    """
+    Décorateur de route (sous @login_required) : la vue s'exécute avec une place réservée.
+    hold_while_streaming : place gardée jusqu'à la fin d'une réponse streamée (lots ZIP).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            keys, principal, weight = admission.identify()
+            try:
+                ticket = admission.acquire(keys, principal, weight)
+            except AdmissionRejected as e:
+                response = jsonify({"error": str(e)})
+                response.status_code = 429
+                response.headers["Retry-After"] = str(e.retry_after)
+                return response
+
+            try:
+                response = make_response(view(*args, **kwargs))
+            except BaseException:
+                admission.release(ticket)
+                raise
+            if hold_while_streaming and response.is_streamed:
+                response.call_on_close(lambda: admission.release(ticket))
+            else:
+                admission.release(ticket)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,259 @@
+import bz2
+import gzip
+import lzma
+import os
+import time
+import zipfile
+import zlib
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app, has_app_context
+from werkzeug.utils import secure_filename
+
+from config.base_config import BaseConfig
+
+try:  # zstd optionnel : stdlib (Python 3.14+) ou paquet zstandard
+    from compression import zstd as _zstd
+except ImportError:
+    try:
+        import zstandard as _zstd
+    except ImportError:
+        _zstd = None
+
+# Découpage des gros fichiers : chaque bloc devient un membre/flux indépendant
+CHUNK_SIZE = 4 * 1024 * 1024
+# Échantillon analysé par le mode "auto"
+SAMPLE_BYTES = 1024 * 1024
+# Mode auto : choix mémorisés (types de contenu × rate) et leur durée de validité (secondes)
+AUTO_CHOICES_SIZE = 256
+AUTO_CHOICE_TTL = 3600
+# En dessous de ce gain sur l'échantillon, le contenu est considéré comme déjà compressé
+STORE_THRESHOLD = 0.03
+
+# Taille du dictionnaire LZMA2 de chaque preset (0–9) ; l'encodeur en occupe ~10× en mémoire
+LZMA_DICT_SIZES = tuple(size * 1024 * 1024 for size in (0.25, 1, 2, 4, 4, 8, 8, 16, 32, 64))
+
+# Signatures de formats déjà compressés (archives, médias)
+COMPRESSED_MAGIC = (
+    b"PK\x03\x04", b"\x1f\x8b", b"BZh", b"\xfd7zXZ\x00", b"(\xb5/\xfd", b"7z\xbc\xaf\x27\x1c",
+    b"Rar!", b"\xff\xd8\xff", b"\x89PNG", b"GIF8", b"RIFF", b"OggS", b"fLaC", b"ID3", b"\xff\xfb",
+)
+
+
+class Codec:
+    """Un format de sortie : extension, plage de niveaux, compression d'un bloc autonome."""
+
+    def __init__(self, name, extension, levels, compress):
+        self.name = name
+        self.extension = extension
+        self.levels = levels
+        self._compress = compress
+
+    def level_for(self, rate):
+        """rate 0–100 → niveau du codec."""
+        low, high = self.levels
+        return low + round((high - low) * max(0, min(100, rate)) / 100)
+
+    def compress(self, data, level):
+        return self._compress(data, level)
+
+
+def _lzma_compress(data, level):
+    """
+    Dictionnaire borné à la taille du bloc : plus grand, il n'apporte rien et l'encodeur
+    occupe ~10× sa taille (674 MB au preset 9 au lieu de ~50 MB pour un bloc de 4 MB).
+    """
+    dict_size = max(4096, min(int(LZMA_DICT_SIZES[level]), len(data)))
+    filters = [{"id": lzma.FILTER_LZMA2, "preset": level, "dict_size": dict_size}]
+    return lzma.compress(data, lzma.FORMAT_XZ, filters=filters)
+
+
+# Les membres/flux concaténés restent des fichiers valides pour gzip, bzip2, xz et zstd :
+# chaque bloc peut donc être compressé indépendamment (en parallèle).
+CODECS = {
+    "deflate": Codec("deflate", "gz", (1, 9), lambda data, level: gzip.compress(data, level, mtime=0)),
+    "bz2": Codec("bz2", "bz2", (1, 9), lambda data, level: bz2.compress(data, level)),
+    "lzma": Codec("lzma", "xz", (0, 9), _lzma_compress),
+}
+if _zstd is not None:
+    CODECS["zstd"] = Codec("zstd", "zst", (1, 19), lambda data, level: _zstd.compress(data, level=level))
+
+# "zip" : ancien format (une entrée ZIP_DEFLATED), "store" : ZIP sans compression
+ARCHIVE_MODES = ("zip", "store", "auto") + tuple(CODECS)
+
+
+def looks_compressed(sample):
+    return sample.startswith(COMPRESSED_MAGIC)
+
+
+def incompressible(sample):
+    """Contenu déjà compressé (signature) ou aléatoire/chiffré (sonde deflate niveau 1)."""
+    if not sample or looks_compressed(sample):
+        return True
+    return 1 - len(zlib.compress(sample, 1)) / len(sample) < STORE_THRESHOLD
+
+
+def choose_codec(sample, rate=70):
+    """
+    Mode auto : contenu déjà compressé → "store" ; sinon chaque codec compresse
+    l'échantillon et on garde le meilleur compromis gain / temps CPU.
+    rate pondère le temps : 100 → meilleur taux seul, 0 → gain par seconde CPU.
+    """
+    if incompressible(sample):
+        return "store", {}
+
+    weight = 1 - max(0, min(100, rate)) / 100
+    scores = {}
+    for name, codec in CODECS.items():
+        start = time.process_time()
+        size = len(codec.compress(sample, codec.level_for(rate)))
+        elapsed = max(time.process_time() - start, 1e-4)
+        saved = 1 - size / len(sample)
+        scores[name] = (saved, elapsed, saved / elapsed ** weight)
+
+    best = max(scores, key=lambda name: scores[name][2])
+    if scores[best][0] < STORE_THRESHOLD:
+        return "store", scores
+    return best, scores
+
+
+class CodecChoices:
+    """
+    Mode auto : codec retenu par type de contenu (extension) et rate, gardé `ttl` secondes.
+    L'essai de tous les codecs n'a lieu qu'une fois par type ; la sonde rapide (store) reste par fichier.
+    """
+
+    def __init__(self, size=AUTO_CHOICES_SIZE, ttl=AUTO_CHOICE_TTL):
+        self.size = size
+        self.ttl = ttl
+        self._choices = OrderedDict()
+        self._lock = threading.Lock()
+
+    def choose(self, sample, content_type, rate=70):
+        if incompressible(sample):
+            return "store"
+        key = (content_type, rate)
+        now = time.monotonic()
+        with self._lock:
+            cached = self._choices.get(key)
+            if cached is not None and cached[1] > now:
+                self._choices.move_to_end(key)
+                return cached[0]
+
+        mode, _ = choose_codec(sample, rate)
+        with self._lock:
+            self._choices[key] = (mode, now + self.ttl)
+            self._choices.move_to_end(key)
+            while len(self._choices) > self.size:
+                self._choices.popitem(last=False)
+        return mode
+
+
+codec_choices = CodecChoices()
+
+
+def _read_chunks(src, size):
+    while True:
+        chunk = src.read(size)
+        if not chunk:
+            return
+        yield chunk
+
+
+# Threads de compression partagés par toutes les requêtes du processus (ARCHIVE_MAX_WORKERS)
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def max_workers():
+    if has_app_context():
+        return current_app.config.get("ARCHIVE_MAX_WORKERS", BaseConfig.ARCHIVE_MAX_WORKERS)
+    return BaseConfig.ARCHIVE_MAX_WORKERS
+
+
+def _executor():
+    global _pool, _pool_pid
+    with _pool_lock:
+        # après un fork, les threads du parent n'existent plus
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ThreadPoolExecutor(max_workers=max_workers(), thread_name_prefix="archive")
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def compress_stream(src, dst, codec, level, workers=None, chunk_size=CHUNK_SIZE):
+    """
+    Compresse src → dst par blocs en parallèle (les codecs libèrent le GIL : threads).
+    Compresseurs simultanés bornés par ARCHIVE_MAX_WORKERS pour tout le processus ;
+    au plus 2 blocs par worker en vol par requête ; écriture dans l'ordre.
+    """
+    workers = min(workers or os.cpu_count() or 1, max_workers())
+    chunks = _read_chunks(src, chunk_size)
+    if workers <= 1:
+        for chunk in chunks:
+            dst.write(codec.compress(chunk, level))
+        return
+
+    pool = _executor()
+    window = deque()
+    try:
+        for chunk in chunks:
+            window.append(pool.submit(codec.compress, chunk, level))
+            if len(window) >= workers * 2:
+                dst.write(window.popleft().result())
+        while window:
+            dst.write(window.popleft().result())
+    finally:
+        for future in window:
+            future.cancel()
+
+
+def compress_archive(input_path, output_base, rate=70, mode="zip", workers=None, source_name=None):
+    """
+    Compresse un fichier quelconque vers output_base + extension du codec retenu.
+    mode : zip (défaut historique), store, deflate, bz2, lzma, zstd ou auto.
+    source_name : nom d'origine, conservé dans l'archive (entrée ZIP, en-tête gzip) et dont
+    l'extension précède celle du codec (rapport.csv → ….csv.gz).
+    Retourne {"output_path", "codec", "level", "original_size", "compressed_size", "ratio"}.
+    """
+    if mode not in ARCHIVE_MODES:
+        raise ValueError(f"Mode d'archive inconnu : {mode}")
+    name = secure_filename(os.path.basename(source_name or "")) or os.path.basename(input_path)
+
+    if mode == "auto":
+        with open(input_path, "rb") as f:
+            mode = codec_choices.choose(f.read(SAMPLE_BYTES), os.path.splitext(input_path)[1].lower(), rate)
+
+    level = None
+    if mode in ("zip", "store"):
+        output_path = f"{output_base}.zip"
+        if mode == "zip":
+            level = max(1, min(9, int(rate / 10)))
+        compression = zipfile.ZIP_DEFLATED if mode == "zip" else zipfile.ZIP_STORED
+        with zipfile.ZipFile(output_path, "w", compression=compression, compresslevel=level) as zf:
+            zf.write(input_path, arcname=name)
+    else:
+        codec = CODECS[mode]
+        level = codec.level_for(rate)
+        output_path = f"{output_base}{os.path.splitext(name)[1].lower()}.{codec.extension}"
+        with open(input_path, "rb") as src, open(output_path, "wb") as dst:
+            if codec.name == "deflate":
+                # premier membre vide portant le nom d'origine (gunzip -N) ; les blocs suivent
+                with gzip.GzipFile(filename=name, mode="wb", fileobj=dst, mtime=0):
+                    pass
+            compress_stream(src, dst, codec, level, workers)
+
+    original_size = os.path.getsize(input_path)
+    compressed_size = os.path.getsize(output_path)
+    return {
+        "output_path": output_path,
+        "codec": mode,
+        "level": level,
+        "original_size": original_size,
+        "compressed_size": compressed_size,
+        "ratio": round(compressed_size / original_size, 4) if original_size else 1.0
+    }
+
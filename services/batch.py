@@ -0,0 +1,136 @@
+import os
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, as_completed, wait
+
+from services.job_queue import acquire_slot, get_executor, release_slot, run_conversion
+from services.result_cache import get_result_cache
+from services.stage_metrics import stage_metrics
+
+# Formats déjà compressés : stockés tels quels dans le ZIP
+STORED_EXT = [".zip", ".png", ".jpg", ".jpeg", ".gif", ".webp", ".docx", ".pdf"]
+
+
+class _ZipStreamBuffer:
+    """Sortie non « seekable » pour zipfile : les octets écrits sont vidés à chaque yield."""
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _unique_name(name, used):
+    stem, ext = os.path.splitext(name)
+    candidate, i = name, 1
+    while candidate in used:
+        i += 1
+        candidate = f"{stem}-{i}{ext}"
+    used.add(candidate)
+    return candidate
+
+
+def stream_batch_zip(items, target_format, options, name_for, max_workers=2, queue_max=20,
+                     owner=None, max_per_user=None, on_undelivered=None, slot_timeout=60,
+                     chunk_size=64 * 1024):
+    """
+    Convertit les fichiers en parallèle et génère l'archive ZIP au fil des résultats.
+    items : liste de (nom source, chemin d'entrée, sha256).
+    name_for(source, output_path) : nom de l'entrée dans l'archive.
+    Chaque conversion occupe une place de la file du worker (queue_max et max_per_user
+    pour `owner`, comme les jobs) ;
+    on_undelivered(n) : appelé en fin de flux avec le nombre de fichiers absents de l'archive
+    (échec, file pleine, client déconnecté) pour rendre le quota.
+    """
+    cache = get_result_cache()
+    buffer = _ZipStreamBuffer()
+    used, errors = set(), []
+    pending = {}
+    delivered = 0
+
+    try:
+        with zipfile.ZipFile(buffer, "w") as zf:
+
+            def add_entry(source, output_path):
+                ext = os.path.splitext(output_path)[1].lower()
+                compress = zipfile.ZIP_STORED if ext in STORED_EXT else zipfile.ZIP_DEFLATED
+                info = zipfile.ZipInfo(_unique_name(name_for(source, output_path), used))
+                info.compress_type = compress
+                with open(output_path, "rb") as src, zf.open(info, "w") as dst:
+                    for chunk in iter(lambda: src.read(chunk_size), b""):
+                        dst.write(chunk)
+
+            def collect(futures):
+                # chaque fichier part dans l'archive dès que sa conversion est prête
+                nonlocal delivered
+                for future in futures:
+                    source, input_path, digest = pending.pop(future)
+                    try:
+                        output_path, observations = future.result()
+                        stage_metrics.merge(observations)
+                        output_path = cache.put(digest, target_format, output_path, options)
+                        add_entry(source, output_path)
+                        delivered += 1
+                    except Exception as e:
+                        errors.append(f"{source} : {e}")
+                    yield buffer.drain()
+
+            executor = get_executor(max_workers)
+            for source, input_path, digest in items:
+                # résultat déjà en cache : envoyé immédiatement
+                cached_path = cache.get(digest, target_format, options)
+                if cached_path:
+                    os.remove(input_path)
+                    try:
+                        add_entry(source, cached_path)
+                        delivered += 1
+                    except OSError as e:
+                        # entrée évincée du cache entre get() et la lecture : fichier non livré (quota rendu)
+                        errors.append(f"{source} : {e.strerror or e}")
+                    yield buffer.drain()
+                    continue
+
+                # file pleine : on attend d'abord la fin de nos propres conversions
+                acquired = acquire_slot(queue_max, owner, max_per_user)
+                while not acquired and pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    yield from collect(done)
+                    acquired = acquire_slot(queue_max, owner, max_per_user, timeout=1)
+                if not acquired and not acquire_slot(queue_max, owner, max_per_user, timeout=slot_timeout):
+                    os.remove(input_path)
+                    errors.append(f"{source} : file de conversion pleine, réessayez plus tard")
+                    continue
+
+                try:
+                    future = executor.submit(run_conversion, input_path, target_format, options)
+                except Exception as e:
+                    release_slot(owner)
+                    errors.append(f"{source} : {e}")
+                    continue
+                future.add_done_callback(lambda f: release_slot(owner))
+                pending[future] = (source, input_path, digest)
+
+            yield from collect(as_completed(list(pending)))
+
+            if errors:
+                zf.writestr("errors.txt", "\n".join(errors) + "\n")
+
+        yield buffer.drain()
+    finally:
+        undelivered = len(items) - delivered
+        if undelivered and on_undelivered is not None:
+            on_undelivered(undelivered)
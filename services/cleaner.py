@@ -0,0 +1,338 @@
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+try:  # verrou inter-processus (POSIX) ; ailleurs chaque processus nettoie
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from config.base_config import BaseConfig
+
+# Dossiers surveillés (chemins relatifs au répertoire de lancement, comme file_utils)
+WATCHED_FOLDERS = (BaseConfig.UPLOAD_FOLDER, BaseConfig.CONVERTED_FOLDER)
+# Géré par ResultCache (index et éviction LRU propres)
+EXCLUDED_FOLDERS = (os.path.join(BaseConfig.CONVERTED_FOLDER, "cache"),)
+# Rétention propre aux téléchargements publiés (services/downloads.py)
+DOWNLOAD_FOLDER = os.path.join(BaseConfig.CONVERTED_FOLDER, "downloads")
+# Dossiers jamais supprimés même vides
+PERSISTENT_FOLDERS = {os.path.normpath(folder) for folder in WATCHED_FOLDERS + (DOWNLOAD_FOLDER,)}
+
+# Un fichier plus jeune n'est jamais évincé par le plafond (conversion en cours)
+EVICTION_GRACE_SECONDS = 300
+BATCH_SIZE = 500
+
+
+def _config(name):
+    try:
+        from flask import current_app
+        return current_app.config.get(name, getattr(BaseConfig, name))
+    except RuntimeError:
+        return getattr(BaseConfig, name)
+
+
+class FileCleaner:
+    """
+    Nettoyage incrémental de static/uploads et static/converted.
+    Chaque artefact est inscrit avec son échéance dans un index SQLite partagé
+    par les workers : un passage ne lit que les entrées expirées (index sur expires_at),
+    puis applique le plafond CLEANER_MAX_BYTES (les plus anciens d'abord).
+    Un rescan (os.scandir récursif) rattrape les fichiers créés hors des points suivis.
+    Le scheduler tourne dans chaque worker, mais un seul (verrou fichier) nettoie.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.scheduler = None
+        self._pid = None
+        self._leader_fd = None
+        self._lock = threading.Lock()
+        self._ready = False
+
+    # -----------------------------
+    #   Index SQLite
+    # -----------------------------
+    @property
+    def index_path(self):
+        return _config("CLEANER_INDEX_PATH")
+
+    @contextmanager
+    def _db(self):
+        conn = self._connect()
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _connect(self):
+        if not self._ready:
+            with self._lock:
+                if not self._ready:
+                    os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+                    conn = sqlite3.connect(self.index_path, timeout=10)
+                    with conn:
+                        conn.execute(
+                            "CREATE TABLE IF NOT EXISTS artefacts ("
+                            " path TEXT PRIMARY KEY, expires_at REAL NOT NULL,"
+                            " created_at REAL NOT NULL, size INTEGER)"
+                        )
+                        conn.execute("CREATE INDEX IF NOT EXISTS ix_artefacts_expires ON artefacts (expires_at)")
+                        conn.execute("CREATE INDEX IF NOT EXISTS ix_artefacts_created ON artefacts (created_at)")
+                        conn.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value REAL NOT NULL)")
+                        conn.execute(
+                            "INSERT OR IGNORE INTO stats VALUES ('last_run', 0), ('last_duration', 0),"
+                            " ('last_files', 0), ('last_bytes', 0), ('total_files', 0), ('total_bytes', 0),"
+                            " ('last_rescan', 0)"
+                        )
+                    conn.close()
+                    self._ready = True
+        return sqlite3.connect(self.index_path, timeout=10)
+
+    # -----------------------------
+    #   Inscription (côté requêtes / workers)
+    # -----------------------------
+    def track(self, path, ttl=None):
+        """Inscrit (ou prolonge) un fichier ou dossier à supprimer dans `ttl` secondes."""
+        if ttl is None:
+            ttl = _config("FILE_EXPIRATION_MINUTES") * 60
+        now = time.time()
+        try:
+            with self._db() as conn:
+                conn.execute(
+                    "INSERT INTO artefacts VALUES (?, ?, ?, NULL)"
+                    " ON CONFLICT(path) DO UPDATE SET expires_at = excluded.expires_at,"
+                    " created_at = excluded.created_at, size = NULL",
+                    (os.path.normpath(path), now + ttl, now)
+                )
+        except sqlite3.Error as e:
+            # le rescan périodique rattrapera le fichier
+            print(f"[⚠] Cleaner : inscription impossible ({path}) : {e}", flush=True)
+
+    # -----------------------------
+    #   Passage de nettoyage
+    # -----------------------------
+    def run(self):
+        """Supprime les artefacts expirés puis applique le plafond. Retourne (fichiers, octets)."""
+        if not self._is_leader():
+            return None
+        start = time.perf_counter()
+        now = time.time()
+        files = freed = 0
+
+        with self._db() as conn:
+            while True:
+                expired = conn.execute(
+                    "SELECT path FROM artefacts WHERE expires_at <= ? ORDER BY expires_at LIMIT ?",
+                    (now, BATCH_SIZE)
+                ).fetchall()
+                if not expired:
+                    break
+                for (path,) in expired:
+                    size = self._remove(path)
+                    if size is not None:
+                        files += 1
+                        freed += size
+                conn.executemany("DELETE FROM artefacts WHERE path = ?", expired)
+                conn.commit()  # verrou d'écriture relâché entre les lots (inscriptions des workers)
+
+            evicted, evicted_bytes = self._enforce_cap(conn, now)
+            files += evicted
+            freed += evicted_bytes
+
+            duration = time.perf_counter() - start
+            conn.executemany("UPDATE stats SET value = ? WHERE name = ?", [
+                (now, "last_run"), (duration, "last_duration"), (files, "last_files"), (freed, "last_bytes")
+            ])
+            conn.execute("UPDATE stats SET value = value + ? WHERE name = 'total_files'", (files,))
+            conn.execute("UPDATE stats SET value = value + ? WHERE name = 'total_bytes'", (freed,))
+
+        if files:
+            print(f"🧹 Cleaner : {files} fichier(s), {freed} octets libérés en {duration:.2f} s", flush=True)
+        return files, freed
+
+    def _enforce_cap(self, conn, now):
+        """Plafond en octets : éviction des plus anciens (hors fichiers très récents)."""
+        # tailles inconnues (inscrits avant écriture) : seules les nouvelles entrées sont lues
+        unsized = conn.execute(
+            "SELECT path FROM artefacts WHERE size IS NULL AND created_at < ?",
+            (now - EVICTION_GRACE_SECONDS,)
+        ).fetchall()
+        for (path,) in unsized:
+            size = self._disk_size(path)
+            if size is None:
+                conn.execute("DELETE FROM artefacts WHERE path = ?", (path,))
+            else:
+                conn.execute("UPDATE artefacts SET size = ? WHERE path = ?", (size, path))
+
+        cap = _config("CLEANER_MAX_BYTES")
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM artefacts").fetchone()[0]
+        if not cap or total <= cap:
+            return 0, 0
+
+        files = freed = 0
+        victims = []
+        for path, size in conn.execute(
+            "SELECT path, size FROM artefacts WHERE size IS NOT NULL AND created_at < ? ORDER BY created_at",
+            (now - EVICTION_GRACE_SECONDS,)
+        ):
+            if total <= cap:
+                break
+            victims.append((path,))
+            total -= size
+            removed = self._remove(path)
+            if removed is not None:
+                files += 1
+                freed += removed
+        conn.executemany("DELETE FROM artefacts WHERE path = ?", victims)
+        return files, freed
+
+    @staticmethod
+    def _disk_size(path):
+        try:
+            if os.path.isdir(path):
+                return sum(FileCleaner._disk_size(entry.path) or 0 for entry in os.scandir(path))
+            return os.stat(path).st_size
+        except OSError:
+            return None
+
+    def _remove(self, path):
+        """Supprime un fichier ou dossier ; retourne les octets libérés (None si absent)."""
+        size = self._disk_size(path)
+        if size is None:
+            return None
+        try:
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+        except OSError:
+            return None
+        # dossier intermédiaire vidé (pages PDF…) : supprimé aussi
+        parent = os.path.normpath(os.path.dirname(path))
+        if parent not in PERSISTENT_FOLDERS:
+            try:
+                os.rmdir(parent)
+            except OSError:
+                pass
+        return size
+
+    # -----------------------------
+    #   Rescan (fichiers non inscrits)
+    # -----------------------------
+    def rescan(self):
+        """Parcours récursif (os.scandir) : inscrit les fichiers inconnus selon leur date."""
+        if not self._is_leader():
+            return None
+        expiration = _config("FILE_EXPIRATION_MINUTES") * 60
+        download_ttl = _config("DOWNLOAD_TTL_SECONDS")
+        excluded = {os.path.normpath(folder) for folder in EXCLUDED_FOLDERS}
+        rows = []
+
+        def walk(folder, ttl):
+            try:
+                entries = list(os.scandir(folder))
+            except OSError:
+                return
+            for entry in entries:
+                path = os.path.normpath(entry.path)
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if path not in excluded:
+                            walk(path, download_ttl if path == os.path.normpath(DOWNLOAD_FOLDER) else ttl)
+                    elif entry.is_file(follow_symlinks=False) and not entry.name.startswith("."):
+                        stat = entry.stat()
+                        rows.append((path, stat.st_mtime + ttl, stat.st_mtime, stat.st_size))
+                except OSError:
+                    pass
+
+        for folder in WATCHED_FOLDERS:
+            walk(folder, expiration)
+
+        with self._db() as conn:
+            conn.executemany("INSERT OR IGNORE INTO artefacts VALUES (?, ?, ?, ?)", rows)
+            conn.execute("UPDATE stats SET value = ? WHERE name = 'last_rescan'", (time.time(),))
+        return len(rows)
+
+    # -----------------------------
+    #   Scheduler (un seul processus nettoie)
+    # -----------------------------
+    def init_app(self, app):
+        self.app = app
+        if not app.config.get("ENABLE_SCHEDULER", BaseConfig.ENABLE_SCHEDULER):
+            return
+
+        @app.before_request
+        def start_cleaner():
+            self.ensure_started()
+
+    def ensure_started(self):
+        # après un fork (gunicorn), le scheduler du parent n'existe plus
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            from apscheduler.schedulers.background import BackgroundScheduler
+
+            self._pid = os.getpid()
+            self._leader_fd = None
+            self.scheduler = BackgroundScheduler(daemon=True)
+            self.scheduler.add_job(
+                self.run, "interval", id="cleaner",
+                minutes=_config("CLEAN_INTERVAL_MINUTES"), max_instances=1, coalesce=True
+            )
+            self.scheduler.add_job(
+                self.rescan, "interval", id="cleaner_rescan",
+                hours=_config("CLEANER_RESCAN_HOURS"), next_run_time=datetime.now(),
+                max_instances=1, coalesce=True
+            )
+            self.scheduler.start()
+
+    def _is_leader(self):
+        """Verrou exclusif gardé à vie : si le processus meurt, un autre reprend."""
+        if fcntl is None or self._leader_fd is not None:
+            return True
+        path = self.index_path + ".lock"
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._leader_fd = fd
+        return True
+
+    # -----------------------------
+    #   État (page admin)
+    # -----------------------------
+    def status(self):
+        with self._db() as conn:
+            stats = dict(conn.execute("SELECT name, value FROM stats").fetchall())
+            entries, size, next_expiry = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), MIN(expires_at) FROM artefacts"
+            ).fetchone()
+        job = self.scheduler.get_job("cleaner") if self.scheduler else None
+        return {
+            "last_run": datetime.fromtimestamp(stats["last_run"]) if stats.get("last_run") else None,
+            "last_duration": stats.get("last_duration", 0),
+            "last_files": int(stats.get("last_files", 0)),
+            "last_bytes": int(stats.get("last_bytes", 0)),
+            "total_files": int(stats.get("total_files", 0)),
+            "total_bytes": int(stats.get("total_bytes", 0)),
+            "last_rescan": datetime.fromtimestamp(stats["last_rescan"]) if stats.get("last_rescan") else None,
+            "tracked": entries,
+            "tracked_bytes": size,
+            "next_expiry": datetime.fromtimestamp(next_expiry) if next_expiry else None,
+            "max_bytes": _config("CLEANER_MAX_BYTES"),
+            "next_run": job.next_run_time if job else None,
+            "active": job is not None
+        }
+
+
+cleaner = FileCleaner()
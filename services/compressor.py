@@ -1,75 +1,256 @@
-import os
-import zipfile
-from PIL import Image
-from PyPDF2 import PdfReader, PdfWriter
-from werkzeug.utils import secure_filename
-from .file_utils import OUTPUT_FOLDER
-
-
-class FileCompressor:
-    IMAGE_EXT = [".png", ".jpg", ".jpeg", ".gif", ".bmp", ".tiff"]
-    TEXT_EXT = [".txt", ".md", ".csv", ".json", ".docx"]
-
-    @staticmethod
-    def compress_pdf(input_path, output_path):
-        """Compression PDF simple (réécriture, pas Ghostscript)."""
-        try:
-            reader = PdfReader(input_path)
-            writer = PdfWriter()
-            for page in reader.pages:
-                writer.add_page(page)
-
-            with open(output_path, "wb") as f:
-                writer.write(f)
-
-            return True
-        except Exception as e:
-            print("Erreur PDF :", e)
-            return False
-
-    @staticmethod
-    def compress_image(input_path, output_path, quality=70):
-        try:
-            with Image.open(input_path) as img:
-                if img.mode in ("RGBA", "P"):
-                    img = img.convert("RGB")
-                img.save(output_path, "JPEG", optimize=True, quality=quality)
-            return True
-        except Exception as e:
-            print("Erreur image :", e)
-            return False
-
-    @staticmethod
-    def compress_zip(input_path, output_path, rate=70):
-        level = max(1, min(9, int(rate / 10)))
-        try:
-            with zipfile.ZipFile(output_path, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=level) as z:
-                z.write(input_path, arcname=os.path.basename(input_path))
-            return True
-        except Exception as e:
-            print("Erreur ZIP :", e)
-            return False
-
-    @staticmethod
-    def compress_file(input_path, rate=70):
-        """Détecte le type + compresse."""
-        filename = secure_filename(os.path.basename(input_path))
-        name, ext = os.path.splitext(filename)
-        ext = ext.lower()
-
-        os.makedirs(OUTPUT_FOLDER, exist_ok=True)
-
-        # --- Sélection du type de compression ---
-        if ext == ".pdf":
-            output_path = os.path.join(OUTPUT_FOLDER, f"{name}-compressed.pdf")
-            FileCompressor.compress_pdf(input_path, output_path)
-
-        elif ext in FileCompressor.IMAGE_EXT:
-            output_path = os.path.join(OUTPUT_FOLDER, f"{name}-compressed.jpg")
-            FileCompressor.compress_image(input_path, output_path, quality=rate)
-
-        elif ext in FileCompressor.TEXT_EXT or ext not in FileCompressor.IMAGE_EXT:
-            output_path = os.path.join(OUTPUT_FOLDER, f"{name}-compressed.zip")
-            FileCompressor.compress_zip(input_path, output_path, rate)
-
-        return output_path
+import io
+import os
+import shutil
+from PIL import Image
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import ArrayObject, NameObject, NumberObject, StreamObject
+from werkzeug.utils import secure_filename
+from .archive import compress_archive
+from .file_utils import OUTPUT_FOLDER
+from .image_optimizer import optimize_image
+from .render_pool import render_pool
+
+# Images PDF : en dessous de cette taille, le ré-encodage ne rapporte rien
+PDF_IMAGE_MIN_BYTES = 8 * 1024
+# Espaces de couleur que l'on sait ré-encoder en JPEG sans perte de fidélité
+PDF_IMAGE_COLORSPACES = {"/DeviceRGB": 3, "/DeviceGray": 1}
+PDF_IMAGE_SKIP_FILTERS = {"/JBIG2Decode", "/JPXDecode", "/CCITTFaxDecode"}
+
+
+def pdf_image_settings(rate):
+    """rate 0–100 → (qualité JPEG, DPI cible des images)."""
+    rate = max(0, min(100, int(rate)))
+    return max(20, min(95, rate)), int(72 + 1.5 * rate)
+
+
+def _image_components(xobj):
+    """Nombre de composantes si l'image peut être ré-encodée en JPEG, sinon None."""
+    if xobj.get("/ImageMask") or isinstance(xobj.get("/Mask"), ArrayObject):
+        return None  # masque par couleur clé : incompatible avec un JPEG (perte)
+    filters = xobj.get("/Filter", [])
+    filters = [filters] if isinstance(filters, str) else list(filters)
+    if PDF_IMAGE_SKIP_FILTERS.intersection(filters):
+        return None
+    if xobj.get("/BitsPerComponent", 8) != 8 or "/Decode" in xobj:
+        return None
+
+    colorspace = xobj.get("/ColorSpace")
+    if hasattr(colorspace, "get_object"):
+        colorspace = colorspace.get_object()
+    if isinstance(colorspace, list) and len(colorspace) == 2 and colorspace[0] == "/ICCBased":
+        components = colorspace[1].get_object().get("/N")
+        return components if components in (1, 3) else None
+    return PDF_IMAGE_COLORSPACES.get(colorspace)
+
+
+def _decode_image(xobj, components, max_size):
+    """Image PIL depuis le flux (JPEG : décodage DCT directement à taille réduite)."""
+    filters = xobj.get("/Filter", [])
+    filters = [filters] if isinstance(filters, str) else list(filters)
+    width, height = xobj["/Width"], xobj["/Height"]
+    mode = "L" if components == 1 else "RGB"
+
+    if filters and filters[-1] == "/DCTDecode":
+        img = Image.open(io.BytesIO(xobj.get_data()))
+        img.draft(mode, max_size)
+        return img
+    return Image.frombytes(mode, (width, height), xobj.get_data())
+
+
+def recompress_pdf_images(input_path, tasks, quality):
+    """
+    Exécuté dans un processus du pool : décode, réduit et ré-encode en JPEG
+    les images demandées [(page, nom, composantes, taille max, taille d'origine)].
+    Retourne {(page, nom): (jpeg, largeur, hauteur, composantes)} pour les images allégées.
+    """
+    reader = PdfReader(input_path)
+    results = {}
+    for page_index, name, components, max_size, original_size in tasks:
+        try:
+            xobjects = reader.pages[page_index]["/Resources"]["/XObject"]
+            img = _decode_image(xobjects[name].get_object(), components, max_size)
+            if img.mode not in ("RGB", "L"):
+                img = img.convert("RGB")
+        except Exception:
+            continue  # flux non décodable : image conservée
+
+        scale = min(1.0, max_size[0] / img.width, max_size[1] / img.height)
+        if scale < 1.0:
+            size = (max(1, int(img.width * scale)), max(1, int(img.height * scale)))
+            img = img.resize(size, Image.LANCZOS, reducing_gap=3.0)
+
+        buffer = io.BytesIO()
+        img.save(buffer, "JPEG", quality=quality, optimize=True)
+        data = buffer.getvalue()
+        if len(data) < original_size:
+            results[(page_index, name)] = (data, img.width, img.height, 1 if img.mode == "L" else 3)
+    return results
+
+
+def _replace_image(xobj, data, width, height, components):
+    """Remplace le flux de l'image sur place (le masque /SMask éventuel est conservé)."""
+    StreamObject.set_data(xobj, data)  # données déjà encodées : pas de ré-encodage Flate
+    if hasattr(xobj, "decoded_self"):
+        xobj.decoded_self = None
+    xobj.pop("/DecodeParms", None)
+    xobj[NameObject("/Filter")] = NameObject("/DCTDecode")
+    xobj[NameObject("/Width")] = NumberObject(width)
+    xobj[NameObject("/Height")] = NumberObject(height)
+    xobj[NameObject("/BitsPerComponent")] = NumberObject(8)
+    xobj[NameObject("/ColorSpace")] = NameObject("/DeviceGray" if components == 1 else "/DeviceRGB")
+
+
+def optimize_pdf(input_path, output_path, rate=70, max_workers=None):
+    """
+    Compression PDF réelle :
+    - images réduites à la résolution cible et ré-encodées en JPEG (en parallèle, par lots de pages)
+    - flux de contenu recompressés
+    - objets identiques (polices, images répétées…) dédoublonnés
+    Si le résultat n'est pas plus petit, l'original est renvoyé tel quel.
+    Retourne {"original_size", "compressed_size", "ratio", "optimized"}.
+    """
+    quality, dpi = pdf_image_settings(rate)
+    writer = PdfWriter(clone_from=input_path)
+
+    # Inventaire des images (une seule fois par objet, même si partagé entre pages)
+    seen, tasks = set(), []
+    for page_index, page in enumerate(writer.pages):
+        resources = page.get("/Resources")
+        xobjects = resources.get_object().get("/XObject") if resources else None
+        if not xobjects:
+            continue
+        # une image ne peut pas être affichée plus grande que la page
+        max_size = (int(float(page.mediabox.width) / 72 * dpi), int(float(page.mediabox.height) / 72 * dpi))
+        for name, ref in xobjects.get_object().items():
+            if not hasattr(ref, "idnum") or ref.idnum in seen:
+                continue
+            xobj = ref.get_object()
+            if xobj.get("/Subtype") != "/Image":
+                continue
+            seen.add(ref.idnum)
+            size = len(xobj._data or b"")  # taille encodée (pypdf retire /Length à la lecture)
+            components = _image_components(xobj)
+            if size >= PDF_IMAGE_MIN_BYTES and components:
+                tasks.append((page_index, name, components, max_size, size))
+
+    # Images : lots répartis sur un pool de processus
+    results = {}
+    workers = min(render_pool.workers(max_workers), len(tasks))
+    if workers <= 1:
+        if tasks:
+            results = recompress_pdf_images(input_path, tasks, quality)
+    else:
+        chunk = max(1, len(tasks) // (workers * 4))
+        batches = [tasks[i:i + chunk] for i in range(0, len(tasks), chunk)]
+        # pool partagé et borné (services/render_pool.py)
+        for partial in render_pool.executor().map(recompress_pdf_images, [input_path] * len(batches), batches,
+                                                  [quality] * len(batches)):
+            results.update(partial)
+
+    for (page_index, name), (data, width, height, components) in results.items():
+        xobj = writer.pages[page_index]["/Resources"].get_object()["/XObject"].get_object()[name].get_object()
+        _replace_image(xobj, data, width, height, components)
+
+    for page in writer.pages:
+        page.compress_content_streams(level=9)
+    writer.compress_identical_objects(remove_identicals=True, remove_orphans=True)
+
+    with open(output_path, "wb") as f:
+        writer.write(f)
+
+    original_size = os.path.getsize(input_path)
+    compressed_size = os.path.getsize(output_path)
+    optimized = compressed_size < original_size
+    if not optimized:
+        # aucun gain : on rend l'original plutôt qu'un fichier plus gros
+        shutil.copyfile(input_path, output_path)
+        compressed_size = original_size
+
+    return {
+        "original_size": original_size,
+        "compressed_size": compressed_size,
+        "ratio": round(compressed_size / original_size, 4) if original_size else 1.0,
+        "optimized": optimized,
+        "images_recompressed": len(results)
+    }
+
+
+class CompressionFailed(ValueError):
+    """Le compresseur n'a produit aucun fichier (document illisible, format non géré…)."""
+
+
+class FileCompressor:
+    IMAGE_EXT = [".png", ".jpg", ".jpeg", ".gif", ".bmp", ".tiff", ".webp"]
+    TEXT_EXT = [".txt", ".md", ".csv", ".json", ".docx"]
+
+    @staticmethod
+    def compress_pdf(input_path, output_path, rate=70):
+        """Compression PDF : images réduites, flux recompressés, objets dédoublonnés."""
+        try:
+            return optimize_pdf(input_path, output_path, rate)
+        except Exception as e:
+            print("Erreur PDF :", e)
+            return False
+
+    @staticmethod
+    def compress_image(input_path, output_path, quality=70, target_size=None, max_dimension=None,
+                       image_format="auto"):
+        """
+        Format choisi selon le contenu (JPEG / WebP / PNG palette) ; l'extension
+        de output_path est remplacée par celle du format retenu.
+        """
+        try:
+            return optimize_image(input_path, os.path.splitext(output_path)[0], quality,
+                                  target_size=target_size, max_dimension=max_dimension, image_format=image_format)
+        except Exception as e:
+            print("Erreur image :", e)
+            return False
+
+    @staticmethod
+    def compress_zip(input_path, output_path, rate=70, mode="zip", source_name=None):
+        """
+        Archive : zip (historique), store, deflate/bz2/lzma/zstd (par blocs parallèles) ou auto.
+        L'extension de output_path est remplacée par celle du codec retenu.
+        """
+        try:
+            return compress_archive(input_path, os.path.splitext(output_path)[0], rate, mode,
+                                    source_name=source_name)
+        except Exception as e:
+            print("Erreur ZIP :", e)
+            return False
+
+    @staticmethod
+    def compress_file(input_path, rate=70, target_size=None, max_dimension=None, image_format="auto",
+                      archive_mode="zip", source_name=None):
+        """
+        Détecte le type + compresse. target_size/max_dimension/image_format concernent
+        les images, archive_mode et source_name (nom gardé dans l'archive) les autres fichiers.
+        """
+        filename = secure_filename(os.path.basename(input_path))
+        name, ext = os.path.splitext(filename)
+        ext = ext.lower()
+
+        os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+
+        # --- Sélection du type de compression ---
+        if ext == ".pdf":
+            output_path = os.path.join(OUTPUT_FOLDER, f"{name}-compressed.pdf")
+            stats = FileCompressor.compress_pdf(input_path, output_path, rate)
+
+        elif ext in FileCompressor.IMAGE_EXT:
+            output_path = os.path.join(OUTPUT_FOLDER, f"{name}-compressed.jpg")
+            stats = FileCompressor.compress_image(input_path, output_path, quality=rate, target_size=target_size,
+                                                  max_dimension=max_dimension, image_format=image_format)
+            if stats:
+                output_path = stats["output_path"]
+
+        elif ext in FileCompressor.TEXT_EXT or ext not in FileCompressor.IMAGE_EXT:
+            output_path = os.path.join(OUTPUT_FOLDER, f"{name}-compressed.zip")
+            stats = FileCompressor.compress_zip(input_path, output_path, rate, archive_mode, source_name)
+            if stats:
+                output_path = stats["output_path"]
+
+        # compresseur en échec (détail déjà journalisé) : aucun chemin interne dans le message
+        if not stats:
+            raise CompressionFailed(f"Échec de la compression du fichier {ext or 'sans extension'}")
+        return output_path
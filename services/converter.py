@@ -1,89 +1,228 @@
-import os
-from PIL import Image
-from PyPDF2 import PdfReader
-import markdown
-import html2text
-from .file_utils import save_file, generate_output_path
-
-
-class FileConverter:
-
-    def convert_file(self, file, target_format):
-        input_path = save_file(file)
-        target_format = target_format.lower()
-
-        # Détermine le bon chemin de sortie
-        output_path = generate_output_path(input_path, f".{target_format}")
-
-        # --- PDF → Images ---
-        if target_format in ["png", "jpg"]:
-            return self.pdf_to_images(input_path, target_format)
-
-        # --- Image → JPEG/PNG ---
-        if target_format in ["png", "jpg", "jpeg"]:
-            return self.convert_image(input_path, output_path, target_format)
-
-        # --- DOCX/TXT/MD/HTML → TXT ---
-        if target_format == "txt":
-            return self.convert_to_text(input_path, output_path)
-
-        # --- fallback: copie brute ---
-        with open(input_path, "rb") as src, open(output_path, "wb") as dst:
-            dst.write(src.read())
-
-        return output_path
-
-    # -----------------------------
-    #   CONVERSIONS IMAGES
-    # -----------------------------
-    def convert_image(self, input_path, output_path, fmt):
-        with Image.open(input_path) as img:
-            if img.mode in ("RGBA", "P"):
-                img = img.convert("RGB")
-            img.save(output_path, fmt.upper())
-        return output_path
-
-    # -----------------------------
-    #   PDF → Images
-    # -----------------------------
-    def pdf_to_images(self, input_path, fmt):
-        reader = PdfReader(input_path)
-        base = os.path.splitext(os.path.basename(input_path))[0]
-        folder = f"static/converted/{base}_pages"
-        os.makedirs(folder, exist_ok=True)
-
-        paths = []
-        for i, page in enumerate(reader.pages):
-            text = page.extract_text() or ""
-            out = os.path.join(folder, f"page_{i+1}.{fmt}")
-            img = Image.new("RGB", (800, 1200), "white")
-            return out  # simplifié (placeholder)
-
-        return paths
-
-    # -----------------------------
-    #   TEXT
-    # -----------------------------
-    def convert_to_text(self, input_path, output_path):
-        ext = os.path.splitext(input_path)[1].lower()
-
-        try:
-            if ext == ".md":
-                with open(output_path, "w", encoding="utf-8") as f:
-                    f.write(markdown.markdown(open(input_path).read()))
-
-            elif ext == ".html":
-                txt = html2text.html2text(open(input_path).read())
-                open(output_path, "w", encoding="utf-8").write(txt)
-
-            else:
-                with open(input_path, "r", encoding="utf-8", errors="ignore") as src:
-                    with open(output_path, "w", encoding="utf-8") as dst:
-                        dst.write(src.read())
-
-        except Exception:
-            # fallback
-            with open(output_path, "wb") as dst, open(input_path, "rb") as src:
-                dst.write(src.read())
-
-        return output_path
+import os
+import shutil
+import zipfile
+from concurrent.futures import as_completed
+from . import formats
+from .file_utils import save_file, OUTPUT_FOLDER
+from .render_pool import render_pool
+from .stage_metrics import stage_metrics
+
+# Pillow et pypdfium2 sont importés dans les fonctions : chargés au premier usage
+# (les workers web démarrent sans les bibliothèques de conversion).
+
+# Formats d'image produits par la rastérisation PDF
+RASTER_FORMATS = {"png": "PNG", "jpg": "JPEG", "jpeg": "JPEG", "tiff": "TIFF"}
+# Formats de sortie sans canal alpha
+OPAQUE_FORMATS = ("JPEG", "BMP")
+
+
+class InvalidPageRange(ValueError):
+    """Plage de pages mal formée ou ne sélectionnant aucune page."""
+
+
+def parse_page_spec(spec):
+    """
+    "1-3,7,10-" → intervalles (début, fin) 1-based, fin None = jusqu'à la dernière page.
+    Vérifie la syntaxe seule (le nombre de pages n'est pas encore connu).
+    """
+    intervals = []
+    for part in str(spec).split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            if "-" in part:
+                start, end = part.split("-", 1)
+                start = int(start) if start.strip() else 1
+                end = int(end) if end.strip() else None
+            else:
+                start = end = int(part)
+        except ValueError:
+            raise InvalidPageRange(f"Plage de pages invalide : {part}") from None
+        if start < 1 or (end is not None and end < start):
+            raise InvalidPageRange(f"Plage de pages invalide : {part}")
+        intervals.append((start, end))
+    return intervals
+
+
+def parse_page_range(spec, total):
+    """
+    "1-3,7,10-" → indices 0-based triés, bornés à [0, total).
+    Spec vide → toutes les pages.
+    """
+    if not spec:
+        return list(range(total))
+
+    pages = set()
+    for start, end in parse_page_spec(spec):
+        pages.update(range(start - 1, min(end or total, total)))
+    return sorted(pages)
+
+
+def render_pdf_pages(input_path, page_indexes, folder, fmt, dpi):
+    """
+    Rastérise un lot de pages et écrit chaque page sur disque dès qu'elle est prête.
+    Exécuté dans un processus du pool : ouvre le document une seule fois par lot.
+    """
+    try:
+        import pypdfium2 as pdfium
+    except ImportError:
+        raise ValueError("Rastérisation PDF indisponible : installez pypdfium2")
+
+    pil_format = RASTER_FORMATS[fmt]
+    pdf = pdfium.PdfDocument(input_path)
+    paths = []
+    try:
+        for index in page_indexes:
+            page = pdf[index]
+            bitmap = page.render(scale=dpi / 72)
+            img = bitmap.to_pil()
+            if pil_format == "JPEG" and img.mode != "RGB":
+                img = img.convert("RGB")
+            out = os.path.join(folder, f"page_{index + 1:04d}.{fmt}")
+            if pil_format == "TIFF":
+                img.save(out, pil_format, compression="tiff_deflate")
+            else:
+                img.save(out, pil_format)
+            paths.append((index, out))
+            page.close()
+    finally:
+        pdf.close()
+    return paths
+
+
+# -----------------------------
+#   Arêtes du registre (services/formats.py)
+# -----------------------------
+def image_to_image(input_path, output_path, options=None):
+    from PIL import Image
+
+    with Image.open(input_path) as img:
+        fmt = Image.registered_extensions().get(os.path.splitext(output_path)[1].lower())
+        if fmt in OPAQUE_FORMATS and img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        img.save(output_path, fmt)
+    return output_path
+
+
+def image_to_pdf(input_path, output_path, options=None):
+    from PIL import Image
+
+    try:
+        with Image.open(input_path) as img:
+            img.convert("RGB").save(output_path, "PDF")
+    except Exception as e:
+        raise ValueError(f"Erreur conversion image → PDF : {e}")
+    return output_path
+
+
+def pdf_to_images(input_path, output_path, options=None):
+    """png/jpg → archive ZIP des pages (chemin .zip), tiff → TIFF multi-pages."""
+    options = options or {}
+    fmt = os.path.splitext(output_path)[1].lower().lstrip(".")
+    return FileConverter().pdf_to_images(
+        input_path,
+        fmt,
+        dpi=int(options.get("dpi", 150)),
+        pages=options.get("pages"),
+        output_path=output_path
+    )
+
+
+def pdf_page_count(input_path):
+    import pypdfium2 as pdfium
+
+    pdf = pdfium.PdfDocument(input_path)
+    try:
+        return len(pdf)
+    finally:
+        pdf.close()
+
+
+class FileConverter:
+
+    def convert_file(self, file, target_format):
+        input_path = save_file(file)
+        return self.convert_path(input_path, target_format)
+
+    def convert_path(self, input_path, target_format, options=None):
+        """Convertit un fichier déjà enregistré sur disque (utilisé par les workers)."""
+        ext = os.path.splitext(input_path)[1].lower()
+        with stage_metrics.timed("convert", ext, target_format):
+            return formats.convert(input_path, target_format.lower(), options or {})
+
+    @staticmethod
+    def can_convert(input_ext, target_format):
+        return formats.can_convert(input_ext, target_format)
+
+    # -----------------------------
+    #   CONVERSIONS IMAGES
+    # -----------------------------
+    def convert_image(self, input_path, output_path, fmt):
+        return image_to_image(input_path, output_path)
+
+    # -----------------------------
+    #   PDF → Images
+    # -----------------------------
+    def pdf_to_images(self, input_path, fmt, dpi=150, pages=None, max_workers=None, output_path=None):
+        """
+        Rastérise les pages en parallèle (pool de processus).
+        png/jpg → archive ZIP des pages, tiff → un seul TIFF multi-pages.
+        output_path : chemin de sortie visé (l'extension devient .zip pour png/jpg).
+        """
+        total = pdf_page_count(input_path)
+        indexes = parse_page_range(pages, total)
+        if not indexes:
+            raise InvalidPageRange(f"Aucune page sélectionnée par « {pages} » (document de {total} page(s))")
+
+        base = os.path.splitext(os.path.basename(input_path))[0]
+        folder = os.path.join(OUTPUT_FOLDER, f"{base}_pages")
+        os.makedirs(folder, exist_ok=True)
+
+        workers = min(render_pool.workers(max_workers), len(indexes))
+        # lots contigus : ~4 lots par worker pour équilibrer la charge
+        chunk = max(1, len(indexes) // (workers * 4))
+        batches = [indexes[i:i + chunk] for i in range(0, len(indexes), chunk)]
+
+        try:
+            if fmt == "tiff":
+                from PIL import Image, TiffImagePlugin
+
+                output_path = output_path or os.path.join(OUTPUT_FOLDER, f"{base}-converted.tiff")
+                rendered = sorted(self._render_batches(input_path, batches, folder, fmt, dpi, workers))
+                # écriture frame par frame : une seule page en mémoire
+                with TiffImagePlugin.AppendingTiffWriter(output_path) as tiff:
+                    for _, path in rendered:
+                        with Image.open(path) as img:
+                            img.save(tiff, "TIFF", compression="tiff_deflate")
+                            tiff.newFrame()
+                return output_path
+
+            output_path = os.path.splitext(output_path)[0] + ".zip" if output_path \
+                else os.path.join(OUTPUT_FOLDER, f"{base}-converted.zip")
+            # pages déjà compressées (PNG/JPEG) → stockées telles quelles, ajoutées dès qu'elles arrivent
+            with zipfile.ZipFile(output_path, "w", compression=zipfile.ZIP_STORED) as zf:
+                for _, path in self._render_batches(input_path, batches, folder, fmt, dpi, workers):
+                    zf.write(path, arcname=os.path.basename(path))
+                    os.remove(path)
+            return output_path
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+
+    @staticmethod
+    def _render_batches(input_path, batches, folder, fmt, dpi, workers):
+        """Génère (index, chemin) au fil de l'eau, dans l'ordre de fin des lots."""
+        if workers <= 1 or len(batches) <= 1:
+            for batch in batches:
+                yield from render_pdf_pages(input_path, batch, folder, fmt, dpi)
+            return
+
+        # pool partagé et borné (services/render_pool.py) ; lots annulés si le client abandonne
+        pool = render_pool.executor()
+        futures = [pool.submit(render_pdf_pages, input_path, batch, folder, fmt, dpi) for batch in batches]
+        try:
+            for future in as_completed(futures):
+                yield from future.result()
+        finally:
+            for future in futures:
+                future.cancel()
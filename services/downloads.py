@@ -0,0 +1,114 @@
+import os
+import re
+import shutil
+import threading
+from collections import OrderedDict
+
+from flask import current_app, request, send_file
+from werkzeug.utils import send_file as send_file_raw
+
+from config.base_config import BaseConfig
+from .cleaner import cleaner
+from .file_utils import OUTPUT_FOLDER, file_sha256
+
+DOWNLOAD_FOLDER = os.path.join(OUTPUT_FOLDER, "downloads")
+CONTENT_ID = re.compile(r"^[0-9a-f]{64}$")
+
+
+def _config(name):
+    try:
+        return current_app.config.get(name, getattr(BaseConfig, name))
+    except RuntimeError:
+        return getattr(BaseConfig, name)
+
+
+class DownloadStore:
+    """
+    Résultats servis par id de contenu (sha256 du fichier) et conservés
+    DOWNLOAD_TTL_SECONDS : une connexion coupée reprend par Range au lieu de reconvertir.
+    ETag fort = id de contenu ; If-None-Match → 304.
+    """
+
+    def __init__(self, folder=DOWNLOAD_FOLDER, max_ids=1024):
+        self.folder = folder
+        self.max_ids = max_ids
+        self._ids = OrderedDict()  # (chemin, inode, taille) → id : résultats en cache déjà hachés
+        self._lock = threading.Lock()
+
+    def path_for(self, content_id):
+        if not CONTENT_ID.match(content_id or ""):
+            return None
+        return os.path.join(self.folder, content_id)
+
+    def publish(self, path, keep_source=False):
+        """Range le fichier sous son sha256 (déplacé, ou lié si keep_source). Retourne l'id."""
+        content_id = self._content_id(path) if keep_source else file_sha256(path)
+        target = os.path.join(self.folder, content_id)
+        os.makedirs(self.folder, exist_ok=True)
+
+        if os.path.exists(target):
+            # même contenu déjà publié : seule la rétention est prolongée
+            if not keep_source:
+                os.remove(path)
+        elif keep_source:
+            try:
+                os.link(path, target)  # résultat en cache : lien physique, aucune copie
+            except OSError:
+                shutil.copyfile(path, target)
+        else:
+            os.replace(path, target)
+        os.utime(target)
+        # la rétention part de la dernière publication (suppression par services/cleaner.py)
+        cleaner.track(target, _config("DOWNLOAD_TTL_SECONDS"))
+        return content_id
+
+    def _content_id(self, path):
+        """
+        sha256 d'un fichier conservé (cache de résultats) : calculé une fois par version du fichier.
+        Pas de mtime dans la clé : le lien physique publié partage l'inode et os.utime() le modifie.
+        """
+        stat = os.stat(path)
+        key = (path, stat.st_ino, stat.st_size)
+        with self._lock:
+            content_id = self._ids.get(key)
+            if content_id is not None:
+                self._ids.move_to_end(key)
+                return content_id
+        content_id = file_sha256(path)
+        with self._lock:
+            self._ids[key] = content_id
+            while len(self._ids) > self.max_ids:
+                self._ids.popitem(last=False)
+        return content_id
+
+    def send(self, content_id, download_name):
+        """Réponse de téléchargement, ou None si le fichier a expiré."""
+        path = self.path_for(content_id)
+        if path is None or not os.path.isfile(path):
+            return None
+
+        offload = _config("DOWNLOAD_OFFLOAD")
+        if offload in ("x-sendfile", "x-accel-redirect"):
+            # le proxy lit le fichier et traite lui-même Range : seul le 304 est géré ici
+            response = send_file_raw(
+                os.path.abspath(path), request.environ, as_attachment=True,
+                download_name=download_name, etag=content_id, use_x_sendfile=True, conditional=False
+            )
+            if offload == "x-accel-redirect":
+                del response.headers["X-Sendfile"]
+                response.headers["X-Accel-Redirect"] = _config("DOWNLOAD_ACCEL_PREFIX") + content_id
+            response.make_conditional(request.environ)
+        else:
+            # corps servi par wsgi.file_wrapper (os.sendfile sous gunicorn), Range et 304 gérés
+            response = send_file(
+                os.path.abspath(path), as_attachment=True, download_name=download_name,
+                etag=content_id, conditional=True
+            )
+
+        response.cache_control.no_cache = None
+        response.cache_control.private = True
+        response.cache_control.max_age = _config("DOWNLOAD_TTL_SECONDS")
+        return response
+
+
+download_store = DownloadStore()
@@ -0,0 +1,108 @@
+import csv
+import io
+import json
+import zlib
+
+from flask import Response, current_app, stream_with_context
+
+from config.base_config import BaseConfig
+from models.db import db
+from .listings import LISTINGS, serialize
+
+# Colonnes CSV (en-tête, clé de la ligne) ; les six premières de "keys" = ancien export_keys_csv
+CSV_COLUMNS = {
+    "keys": [
+        ("ID", "id"), ("Email", "email"), ("API Key", "api_key"), ("Created At", "created_at"),
+        ("Daily Limit", "daily_limit"), ("Revoked", "revoked"), ("Today Usage", "today_usage"),
+        ("Total Usage", "total_usage"), ("Last Used At", "last_used_at"),
+    ],
+    "users": [
+        ("ID", "id"), ("Email", "email"), ("Admin", "is_admin"), ("Active", "is_active"),
+        ("Created At", "created_at"), ("Last Login At", "last_login_at"), ("Login Count", "login_count"),
+    ],
+    "logs": [
+        ("ID", "id"), ("User ID", "user_id"), ("Endpoint", "endpoint"), ("Method", "method"),
+        ("Status", "status_code"), ("Time", "time"), ("IP", "ip_address"),
+        ("Response Time (ms)", "response_time_ms"),
+    ],
+}
+
+FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+def iter_partitions(listing, filters, yield_per):
+    """
+    Une seule requête (jointure comprise : aucun chargement paresseux par ligne),
+    curseur côté serveur, lignes remises par lots de `yield_per` : mémoire constante.
+    """
+    statement = db.select(*listing.columns)
+    if listing.join is not None:
+        statement = statement.join(*listing.join)
+    statement = (
+        statement.where(*filters)
+        .order_by(*listing.ordering())
+        .execution_options(stream_results=True, yield_per=yield_per)
+    )
+    result = db.session.execute(statement)
+    try:
+        yield from result.partitions()
+    finally:
+        result.close()
+
+
+def csv_chunks(partitions, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([label for label, _ in columns])
+    for rows in partitions:
+        writer.writerows([row._mapping[key] for _, key in columns] for row in rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def ndjson_chunks(partitions):
+    for rows in partitions:
+        yield "".join(json.dumps(serialize(row), ensure_ascii=False) + "\n" for row in rows)
+
+
+def gzip_chunks(chunks, level=6):
+    """Compression gzip au fil de l'eau (un seul flux, en-tête gzip : wbits=31)."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_response(kind, args, fmt=None, filename=None):
+    """
+    Réponse streamée de l'export `kind` (keys, users, logs) filtré par `args`.
+    fmt : csv (défaut) ou ndjson ; ?gzip=1 → fichier .gz compressé à la volée.
+    """
+    listing, filters_for = LISTINGS[kind]
+    fmt = fmt or args.get("format", "csv")
+    if fmt not in FORMATS:
+        raise ValueError(f"Format d'export inconnu : {fmt}")
+    filters = filters_for(args)
+    yield_per = current_app.config.get("ADMIN_EXPORT_CHUNK", BaseConfig.ADMIN_EXPORT_CHUNK)
+    compressed = args.get("gzip") == "1"
+
+    def generate():
+        partitions = iter_partitions(listing, filters, yield_per)
+        chunks = csv_chunks(partitions, CSV_COLUMNS[kind]) if fmt == "csv" else ndjson_chunks(partitions)
+        encoded = (chunk.encode("utf-8") for chunk in chunks)
+        return gzip_chunks(encoded) if compressed else encoded
+
+    filename = filename or f"{kind}.{fmt}"
+    mimetype = FORMATS[fmt]
+    if compressed:
+        filename += ".gz"
+        mimetype = "application/gzip"
+
+    # stream_with_context : la session (et son curseur) reste ouverte pendant l'itération
+    return Response(stream_with_context(generate()), mimetype=mimetype,
+                    headers={"Content-Disposition": f"attachment;filename={filename}"})
@@ -1,46 +1,211 @@
-import os
-import uuid
-from werkzeug.utils import secure_filename
-
-UPLOAD_FOLDER = "static/uploads"
-OUTPUT_FOLDER = "static/converted"
-
-
-def ensure_dirs():
-    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-    os.makedirs(OUTPUT_FOLDER, exist_ok=True)
-
-
-def save_file(file):
-    """Sauvegarde un fichier uploadé et retourne son chemin."""
-    ensure_dirs()
-    filename = secure_filename(file.filename)
-    ext = os.path.splitext(filename)[1]
-    unique = uuid.uuid4().hex
-    filepath = os.path.join(UPLOAD_FOLDER, f"{unique}{ext}")
-
-    file.save(filepath)
-    return filepath
-
-
-def generate_output_path(input_path, new_ext=None):
-    """Crée un chemin de fichier de sortie propre."""
-    ensure_dirs()
-    base = os.path.splitext(os.path.basename(input_path))[0]
-    if new_ext:
-        return os.path.join(OUTPUT_FOLDER, f"{base}-converted{new_ext}")
-    return os.path.join(OUTPUT_FOLDER, f"{base}-converted")
-
-
-def cleanup_old_files(hours=24):
-    """Supprime les fichiers plus vieux que X heures."""
-    import time
-    now = time.time()
-
-    for folder in [UPLOAD_FOLDER, OUTPUT_FOLDER]:
-        for file in os.listdir(folder):
-            path = os.path.join(folder, file)
-            if os.path.isfile(path):
-                age = (now - os.path.getmtime(path)) / 3600
-                if age > hours:
-                    os.remove(path)
+import hashlib
+import os
+import uuid
+from flask import Request, current_app
+from werkzeug.exceptions import RequestEntityTooLarge, UnsupportedMediaType
+from werkzeug.utils import secure_filename
+from config.base_config import BaseConfig
+from .cleaner import cleaner
+
+UPLOAD_FOLDER = "static/uploads"
+OUTPUT_FOLDER = "static/converted"
+
+
+def ensure_dirs():
+    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+    os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+
+
+CHUNK_SIZE = 64 * 1024
+SNIFF_BYTES = 512
+
+# Signatures (magic bytes) reconnues au début du fichier
+MAGIC_SIGNATURES = [
+    (b"%PDF", "application/pdf"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF8", "image/gif"),
+    (b"BM", "image/bmp"),
+    (b"II*\x00", "image/tiff"),
+    (b"MM\x00*", "image/tiff"),
+    (b"PK\x03\x04", "application/zip"),
+    (b"\x7fELF", "application/x-executable"),
+]
+
+# Extensions dont le contenu doit correspondre (sinon fichier déguisé)
+EXPECTED_MIME = {
+    ".pdf": "application/pdf",
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".gif": "image/gif",
+    ".bmp": "image/bmp",
+    ".tiff": "image/tiff",
+    ".webp": "image/webp",
+    ".docx": "application/zip",
+}
+
+BLOCKED_MIME = ["application/x-dosexec", "application/x-executable"]
+
+
+def is_dos_executable(head):
+    """
+    Exécutable Windows/DOS : « MZ » suivi de la signature "PE\\0\\0" à l'offset e_lfanew (0x3C),
+    ou d'un en-tête binaire (MZ/NE/LE sans PE). Un texte qui commence par « MZ » n'a pas d'octet nul.
+    """
+    if not head.startswith(b"MZ"):
+        return False
+    offset = int.from_bytes(head[0x3C:0x40], "little") if len(head) >= 0x40 else 0
+    if offset and head[offset:offset + 4] == b"PE\0\0":
+        return True
+    return b"\x00" in head
+
+
+def sniff_mime(head):
+    """Devine le type MIME à partir des premiers octets du fichier."""
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if is_dos_executable(head):
+        return "application/x-dosexec"
+    for magic, mime in MAGIC_SIGNATURES:
+        if head.startswith(magic):
+            return mime
+    if b"\x00" not in head:
+        return "text/plain"
+    return "application/octet-stream"
+
+
+class UploadStream:
+    """
+    Flux d'écriture d'un upload directement à son emplacement final.
+    Calcule le sha256, compte les octets et vérifie le type au fil de l'eau :
+    un fichier trop gros ou refusé est supprimé sans lire la suite.
+    """
+
+    def __init__(self, filename, max_bytes=None):
+        ensure_dirs()
+        self.ext = os.path.splitext(secure_filename(filename or ""))[1].lower()
+        self.path = os.path.join(UPLOAD_FOLDER, f"{uuid.uuid4().hex}{self.ext}")
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.mime = None
+        self.kept = False
+        self._head = b""
+        self._hash = hashlib.sha256()
+        self._file = open(self.path, "w+b")
+
+    def write(self, data):
+        self.size += len(data)
+        if self.max_bytes and self.size > self.max_bytes:
+            self._discard()
+            raise RequestEntityTooLarge(f"Fichier trop volumineux (max {self.max_bytes // (1024 * 1024)} MB)")
+
+        if self.mime is None:
+            self._head += data[:SNIFF_BYTES - len(self._head)]
+            if len(self._head) >= SNIFF_BYTES:
+                self._check_type()
+
+        self._hash.update(data)
+        return self._file.write(data)
+
+    def seek(self, *args):
+        # fin de la partie multipart : petit fichier pas encore vérifié
+        if self.mime is None:
+            self._check_type()
+        return self._file.seek(*args)
+
+    def _check_type(self):
+        self.mime = sniff_mime(self._head)
+        expected = EXPECTED_MIME.get(self.ext)
+        if self.mime in BLOCKED_MIME or (expected and self.size and self.mime != expected):
+            self._discard()
+            raise UnsupportedMediaType(f"Type de fichier refusé ({self.mime})")
+
+    def _discard(self):
+        self._file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def keep(self):
+        """Conserve le fichier (sinon supprimé à la fin de la requête). Retourne (chemin, sha256)."""
+        self._file.flush()
+        self.kept = True
+        cleaner.track(self.path)
+        return self.path, self._hash.hexdigest()
+
+    def close(self):
+        if self._file.closed:
+            return
+        if self.kept:
+            self._file.close()
+        else:
+            self._discard()
+
+    def __getattr__(self, name):
+        if name == "_file":
+            raise AttributeError(name)
+        return getattr(self._file, name)
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class UploadRequest(Request):
+    """Requête Flask dont les fichiers uploadés sont écrits via UploadStream (pas de fichier temporaire)."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        max_bytes = current_app.config.get("MAX_CONTENT_LENGTH") or BaseConfig.MAX_CONTENT_LENGTH
+        if total_content_length and total_content_length > max_bytes:
+            raise RequestEntityTooLarge(f"Fichier trop volumineux (max {max_bytes // (1024 * 1024)} MB)")
+        return UploadStream(filename, max_bytes)
+
+
+def save_file(file):
+    """Sauvegarde un fichier uploadé et retourne son chemin."""
+    return save_file_with_hash(file)[0]
+
+
+def save_file_with_hash(file):
+    """
+    Sauvegarde un fichier uploadé et retourne (chemin, sha256).
+    Via UploadRequest le fichier est déjà à sa place : aucune copie.
+    """
+    if isinstance(file.stream, UploadStream):
+        return file.stream.keep()
+
+    # Fallback (FileStorage classique) : copie par blocs + mêmes vérifications
+    stream = UploadStream(file.filename, BaseConfig.MAX_CONTENT_LENGTH)
+    try:
+        while True:
+            chunk = file.stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            stream.write(chunk)
+        stream.seek(0)
+        return stream.keep()
+    finally:
+        stream.close()
+
+
+def file_sha256(path):
+    """sha256 d'un fichier déjà présent sur disque."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def generate_output_path(input_path, new_ext=None):
+    """Crée un chemin de fichier de sortie propre (inscrit auprès du cleaner)."""
+    ensure_dirs()
+    base = os.path.splitext(os.path.basename(input_path))[0]
+    if new_ext:
+        path = os.path.join(OUTPUT_FOLDER, f"{base}-converted{new_ext}")
+    else:
+        path = os.path.join(OUTPUT_FOLDER, f"{base}-converted")
+    cleaner.track(path)
+    return path
@@ -0,0 +1,187 @@
+import heapq
+import importlib
+import importlib.util
+import os
+import shutil
+from functools import lru_cache
+
+from .file_utils import generate_output_path
+
+# -----------------------------
+#   Formats connus
+# -----------------------------
+TEXT_SOURCES = ("pdf", "docx", "txt", "md", "html")
+TEXT_TARGETS = ("txt", "md", "html", "docx", "pdf")
+IMAGE_FORMATS = ("jpg", "jpeg", "png", "bmp", "webp", "tiff", "gif")
+RASTER_TARGETS = ("png", "jpg", "jpeg", "tiff")
+
+# Coût estimé (relatif) de la lecture du texte d'une source et de l'écriture d'une cible
+EXTRACT_COST = {"pdf": 10, "docx": 4, "html": 2, "txt": 1, "md": 1}
+RENDER_COST = {"txt": 1, "md": 1, "html": 2, "docx": 4, "pdf": 4}
+# Bibliothèques nécessaires pour lire / écrire chaque format texte
+EXTRACT_REQUIRES = {"pdf": "pdfplumber", "docx": "docx", "html": "html2text"}
+RENDER_REQUIRES = {"docx": "docx", "html": "markdown", "pdf": "fpdf"}
+
+
+class Edge:
+    """
+    Conversion élémentaire source → cible.
+    handler : "module:fonction" importé au premier usage (les bibliothèques lourdes
+    ne sont chargées que si l'arête sert) ; requires : modules nécessaires.
+    terminal : la sortie n'est pas réutilisable comme étape (ZIP de pages…).
+    """
+
+    __slots__ = ("source", "target", "cost", "handler", "requires", "terminal", "_func")
+
+    def __init__(self, source, target, cost, handler, requires=(), terminal=False):
+        self.source = source
+        self.target = target
+        self.cost = cost
+        self.handler = handler
+        self.requires = tuple(requires)
+        self.terminal = terminal
+        self._func = None
+
+    def available(self):
+        return all(_module_available(name) for name in self.requires)
+
+    def load(self):
+        """Importe le handler et les bibliothèques requises (préchargement)."""
+        for name in self.requires:
+            importlib.import_module(name)
+        if self._func is None:
+            module, name = self.handler.split(":")
+            self._func = getattr(importlib.import_module(module), name)
+        return self._func
+
+    def run(self, input_path, output_path, options):
+        return (self._func or self.load())(input_path, output_path, options)
+
+    def __repr__(self):
+        return f"<Edge {self.source}→{self.target} ({self.cost})>"
+
+
+_edges = {}
+
+
+@lru_cache(maxsize=None)
+def _module_available(name):
+    # find_spec ne fait que localiser le module : aucun import
+    return importlib.util.find_spec(name) is not None
+
+
+def register(source, target, cost, handler, requires=(), terminal=False):
+    _edges.setdefault(source, []).append(Edge(source, target, cost, handler, requires, terminal))
+    plan.cache_clear()
+
+
+def normalize(fmt):
+    return (fmt or "").lower().lstrip(".")
+
+
+def edges():
+    return [e for edges in _edges.values() for e in edges if e.available()]
+
+
+def sources():
+    return {source for source, edges in _edges.items() if any(e.available() for e in edges)}
+
+
+def targets():
+    return {e.target for edges in _edges.values() for e in edges if e.available()}
+
+
+@lru_cache(maxsize=None)
+def plan(source, target):
+    """Chemin le moins coûteux (Dijkstra) : tuple d'arêtes. ValueError si impossible."""
+    source, target = normalize(source), normalize(target)
+    queue = [(0, 0, source, ())]
+    best = {source: 0}
+    counter = 1
+    while queue:
+        cost, _, fmt, path = heapq.heappop(queue)
+        if fmt == target:
+            return path
+        if cost > best[fmt]:
+            continue
+        for edge in _edges.get(fmt, ()):
+            # arête terminale : uniquement comme dernière étape
+            if edge.terminal and edge.target != target or not edge.available():
+                continue
+            new_cost = cost + edge.cost
+            if new_cost < best.get(edge.target, float("inf")):
+                best[edge.target] = new_cost
+                heapq.heappush(queue, (new_cost, counter, edge.target, path + (edge,)))
+                counter += 1
+    raise ValueError(f"Conversion non supportée : {source} → {target}")
+
+
+def can_convert(source, target):
+    source, target = normalize(source), normalize(target)
+    if source == target:
+        return source in sources()
+    try:
+        plan(source, target)
+        return True
+    except ValueError:
+        return False
+
+
+def convert(input_path, target, options=None, output_path=None):
+    """
+    Exécute le plan source → cible. Les fichiers intermédiaires sont supprimés.
+    Retourne le chemin produit (qui peut différer de output_path : ZIP de pages…).
+    """
+    source, target = normalize(os.path.splitext(input_path)[1]), normalize(target)
+    output_path = output_path or generate_output_path(input_path, f".{target}")
+
+    if source == target:
+        shutil.copyfile(input_path, output_path)
+        return output_path
+
+    steps = plan(source, target)
+    current, intermediates = input_path, []
+    try:
+        for index, edge in enumerate(steps):
+            last = index == len(steps) - 1
+            step_output = output_path if last else generate_output_path(input_path, f"-{index}.{edge.target}")
+            current = edge.run(current, step_output, options or {})
+            if not last:
+                intermediates.append(current)
+    finally:
+        for path in intermediates:
+            if os.path.exists(path):
+                os.remove(path)
+    return current
+
+
+# -----------------------------
+#   Arêtes
+# -----------------------------
+def _register_defaults():
+    # Texte : un seul passage en flux (extraction → écriture) pour chaque couple
+    for source in TEXT_SOURCES:
+        for target in TEXT_TARGETS:
+            if source == target:
+                continue
+            requires = [name for name in (EXTRACT_REQUIRES.get(source), RENDER_REQUIRES.get(target)) if name]
+            register(source, target, EXTRACT_COST[source] + RENDER_COST[target],
+                     "services.text_formats:convert_text", requires)
+
+    # PDF → DOCX avec mise en page (pdf2docx) : préféré au texte brut s'il est installé
+    register("pdf", "docx", 12, "services.text_formats:pdf_to_docx_layout", ["pdf2docx"])
+
+    # Images
+    for source in IMAGE_FORMATS:
+        for target in IMAGE_FORMATS:
+            if source != target:
+                register(source, target, 2, "services.converter:image_to_image", ["PIL"])
+        # PDF sans couche texte : inutile comme étape intermédiaire (png → pdf → txt)
+        register(source, "pdf", 3, "services.converter:image_to_pdf", ["PIL"], terminal=True)
+
+    # PDF → images (ZIP de pages ou TIFF multi-pages)
+    for target in RASTER_TARGETS:
+        register("pdf", target, 8, "services.converter:pdf_to_images", ["pypdfium2"], terminal=True)
+
+
+_register_defaults()
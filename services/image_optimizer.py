@@ -0,0 +1,183 @@
+import io
+import os
+
+from PIL import Image, ImageOps, features
+
+# Formats de sortie : extension, format Pillow
+IMAGE_FORMATS = {"jpeg": ("jpg", "JPEG"), "webp": ("webp", "WEBP"), "png": ("png", "PNG")}
+
+# Au-delà de ce nombre de couleurs, l'image est traitée comme une photo
+FLAT_MAX_COLORS = 256
+# Côté de l'échantillon utilisé pour analyser le contenu
+SAMPLE_SIZE = 256
+MIN_QUALITY = 10
+# Réductions successives si la qualité minimale ne suffit pas pour la taille cible
+MAX_DOWNSCALE_STEPS = 4
+
+
+def has_alpha(img):
+    """Vraie transparence (pas seulement un canal alpha entièrement opaque)."""
+    if img.mode in ("RGBA", "LA"):
+        return img.getchannel("A").getextrema()[0] < 255
+    return img.mode == "P" and "transparency" in img.info
+
+
+def count_colors(img, limit=FLAT_MAX_COLORS):
+    """Nombre de couleurs d'un échantillon (None si plus de `limit`)."""
+    scale = min(1.0, SAMPLE_SIZE / max(img.size))
+    sample = img.resize((max(1, int(img.width * scale)), max(1, int(img.height * scale))),
+                        Image.NEAREST)  # NEAREST : aucune couleur intermédiaire
+    colors = sample.getcolors(maxcolors=limit)
+    return len(colors) if colors else None
+
+
+def choose_format(img, source_format=""):
+    """
+    Peu de couleurs (logo, capture, schéma) → PNG palette ;
+    photo avec transparence → WebP (sinon PNG quantifié) ; photo → JPEG.
+    """
+    if source_format == "jpeg":
+        return "jpeg"  # déjà une photo : les artefacts JPEG rendent l'analyse inutile
+    if count_colors(img) is not None:
+        return "png"
+    if has_alpha(img):
+        return "webp" if features.check("webp") else "png"
+    return "jpeg"
+
+
+def resizable(img):
+    """
+    Mode accepté par reduce() et par un resize() LANCZOS : palette → RGB(A), 1 bit → L,
+    16 bits → L (mis à l'échelle, convert() écrêterait à 255).
+    """
+    if img.mode == "P":
+        return img.convert("RGBA" if has_alpha(img) else "RGB")
+    if img.mode == "1":
+        return img.convert("L")
+    if img.mode.startswith("I;16"):
+        return img.convert("I").point(lambda value: value * (1 / 256)).convert("L")
+    return img
+
+
+def open_image(path, max_dimension=None):
+    """
+    Ouvre l'image en limitant le travail de décodage :
+    JPEG → draft() (réduction DCT 1/2, 1/4, 1/8 pendant le décodage),
+    puis reduce() (entier, rapide) avant le redimensionnement final.
+    Retourne (image, format source en minuscules) : reduce()/resize() effacent img.format.
+    """
+    img = Image.open(path)
+    source_format = (img.format or "").lower()
+    if max_dimension and img.format == "JPEG" and max(img.size) > max_dimension:
+        scale = max_dimension / max(img.size)
+        img.draft(img.mode, (round(img.width * scale), round(img.height * scale)))
+    ImageOps.exif_transpose(img, in_place=True)
+
+    if max_dimension and max(img.size) > max_dimension:
+        img = resizable(img)
+        factor = max(img.size) // max_dimension
+        if factor >= 2:
+            img = img.reduce(factor)
+        if max(img.size) > max_dimension:
+            scale = max_dimension / max(img.size)
+            size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+            img = img.resize(size, Image.LANCZOS)
+    return img, source_format
+
+
+def prepare(img, fmt):
+    """Mode compatible avec le format de sortie."""
+    alpha = has_alpha(img)
+    if fmt == "jpeg":
+        if alpha:
+            # aplatit sur fond blanc plutôt que de laisser du noir sous la transparence
+            background = Image.new("RGB", img.size, "white")
+            background.paste(img.convert("RGBA"), mask=img.convert("RGBA").getchannel("A"))
+            return background
+        return img if img.mode in ("RGB", "L") else img.convert("RGB")
+    if alpha:
+        return img if img.mode == "RGBA" else img.convert("RGBA")
+    return img if img.mode in ("RGB", "L", "P") else img.convert("RGB")
+
+
+def encode(img, fmt, quality):
+    """Encode en mémoire. Pour PNG, `quality` fixe le nombre de couleurs de la palette."""
+    buffer = io.BytesIO()
+    if fmt == "png":
+        if img.mode != "P":
+            colors = max(2, min(256, round(256 * quality / 100)))
+            img = img.quantize(colors=colors, method=Image.Quantize.FASTOCTREE)
+        img.save(buffer, "PNG", optimize=True)
+    elif fmt == "webp":
+        img.save(buffer, "WEBP", quality=quality, method=4)
+    else:
+        img.save(buffer, "JPEG", quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def search_quality(img, fmt, max_quality, target_size):
+    """Recherche dichotomique de la plus haute qualité dont le résultat tient dans target_size."""
+    low, high = MIN_QUALITY + 1, max_quality
+    best = None
+    while low <= high:
+        quality = (low + high) // 2
+        data = encode(img, fmt, quality)
+        if len(data) <= target_size:
+            best = (data, quality)
+            low = quality + 1
+        else:
+            high = quality - 1
+    return best
+
+
+def optimize_image(input_path, output_base, quality=70, target_size=None, max_dimension=None, image_format="auto"):
+    """
+    Compresse une image vers `output_base` + extension du format retenu.
+    quality : 1–100 (JPEG/WebP) ou part de la palette 256 couleurs (PNG).
+    target_size : taille visée en octets (qualité puis dimensions réduites si besoin).
+    Retourne {"output_path", "format", "quality", "width", "height", "original_size", "compressed_size", "ratio"}.
+    """
+    quality = max(MIN_QUALITY, min(100, int(quality)))
+    img, source_format = open_image(input_path, max_dimension)
+
+    fmt = image_format if image_format in IMAGE_FORMATS else choose_format(img, source_format)
+    if fmt == "webp" and not features.check("webp"):
+        fmt = "jpeg"
+    img = prepare(img, fmt)
+
+    data = encode(img, fmt, quality)
+    used_quality = quality
+    if target_size and len(data) > target_size:
+        for step in range(MAX_DOWNSCALE_STEPS + 1):
+            smallest = encode(img, fmt, MIN_QUALITY)
+            if len(smallest) <= target_size:
+                data, used_quality = search_quality(img, fmt, quality, target_size) or (smallest, MIN_QUALITY)
+                break
+            data, used_quality = smallest, MIN_QUALITY
+            if step == MAX_DOWNSCALE_STEPS:
+                break  # taille cible inatteignable : on garde le plus petit résultat
+            # même la qualité minimale est trop lourde → on réduit les dimensions
+            scale = max(0.25, min(0.9, (target_size / len(smallest)) ** 0.5))
+            img = img.resize((max(1, int(img.width * scale)), max(1, int(img.height * scale))), Image.LANCZOS)
+
+    original_size = os.path.getsize(input_path)
+    if len(data) >= original_size and source_format == fmt and not target_size and not max_dimension:
+        # déjà optimisée : on garde l'original plutôt qu'un fichier plus gros
+        with open(input_path, "rb") as f:
+            data = f.read()
+
+    extension = IMAGE_FORMATS[fmt][0]
+    output_path = f"{output_base}.{extension}"
+    with open(output_path, "wb") as f:
+        f.write(data)
+
+    return {
+        "output_path": output_path,
+        "format": fmt,
+        "quality": used_quality,
+        "width": img.width,
+        "height": img.height,
+        "original_size": original_size,
+        "compressed_size": len(data),
+        "ratio": round(len(data) / original_size, 4) if original_size else 1.0
+    }
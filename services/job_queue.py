@@ -0,0 +1,154 @@
+import json
+import os
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from models.db import db
+from models.job import ConversionJob
+from services.quota import quota
+from services.result_cache import get_result_cache
+from services.stage_metrics import stage_metrics
+
+# Pool de processus partagé par le worker web (créé au premier job)
+_executor = None
+_lock = threading.Lock()
+_slots = threading.Condition(_lock)
+_pending = 0
+_owners = {}  # user_id → places occupées
+
+
+def get_executor(max_workers):
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=max_workers)
+        return _executor
+
+
+def run_conversion(input_path, target_format, options):
+    """
+    Exécuté dans un processus du pool : conversion d'un fichier déjà sur disque.
+    Retourne (chemin de sortie, durées d'étapes) ; le parent ajoute les durées à /metrics.
+    """
+    from services.converter import FileConverter
+
+    with stage_metrics.recording() as observations:
+        output_path = FileConverter().convert_path(input_path, target_format, options)
+    return output_path, observations
+
+
+def acquire_slot(queue_max, owner=None, owner_max=None, timeout=0):
+    """
+    Réserve une place dans la file du worker (jobs asynchrones et lots ZIP, bornée à queue_max).
+    owner / owner_max : plafond par utilisateur, comme l'admission (la réponse 202 d'un job
+    libère la place d'admission, pas celle-ci). Attend au plus `timeout` secondes.
+    Retourne False si la file (ou la part de l'utilisateur) est pleine.
+    """
+    global _pending
+
+    def free():
+        if _pending >= queue_max:
+            return False
+        return owner is None or owner_max is None or _owners.get(owner, 0) < owner_max
+
+    with _slots:
+        if not _slots.wait_for(free, timeout):
+            return False
+        _pending += 1
+        if owner is not None:
+            _owners[owner] = _owners.get(owner, 0) + 1
+        return True
+
+
+def release_slot(owner=None):
+    global _pending
+    with _slots:
+        _pending -= 1
+        if owner is not None:
+            count = _owners.get(owner, 0) - 1
+            if count > 0:
+                _owners[owner] = count
+            else:
+                _owners.pop(owner, None)
+        _slots.notify_all()
+
+
+def _on_done(app, job_id, owner, future):
+    """Callback de fin : enregistre le résultat du job en base."""
+    release_slot(owner)
+
+    with app.app_context():
+        job = db.session.get(ConversionJob, job_id)
+        if job is None:
+            return
+        try:
+            output_path, observations = future.result()
+            stage_metrics.merge(observations)
+            if job.input_hash:
+                output_path = get_result_cache().put(
+                    job.input_hash, job.target_format, output_path, json.loads(job.options or "{}")
+                )
+            job.output_path = output_path
+            job.status = "done"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            print(f"[⚠] Job {job_id} en échec : {e}", flush=True)
+            # conversion non livrée → l'appel n'est pas décompté (comme en synchrone)
+            if job.key_id is not None:
+                try:
+                    quota.refund(job.user_id, job.key_id)
+                except Exception as refund_error:
+                    print(f"[⚠] Quota du job {job_id} non rendu : {refund_error}", flush=True)
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+        # durée totale du job (attente + conversion dans le pool)
+        stage_metrics.observe(
+            "job", (job.finished_at - job.created_at).total_seconds(),
+            os.path.splitext(job.input_path)[1], job.target_format
+        )
+
+
+def pending_jobs():
+    """Nombre de jobs soumis et non terminés dans ce worker."""
+    return _pending
+
+
+def submit_job(app, user_id, input_path, target_format, source_name=None,
+               input_hash=None, options=None, max_workers=2, queue_max=20, max_per_user=None,
+               key_id=None):
+    """
+    Crée un job en base et l'envoie au pool de processus.
+    key_id : clé API débitée pour ce job, rendue s'il échoue.
+    Retourne None si la file d'attente est pleine ou si l'utilisateur a déjà max_per_user jobs en cours.
+    """
+    if not acquire_slot(queue_max, user_id, max_per_user):
+        return None
+
+    job = ConversionJob(
+        id=uuid.uuid4().hex,
+        user_id=user_id,
+        key_id=key_id,
+        source_name=source_name,
+        input_hash=input_hash,
+        options=json.dumps(options or {}),
+        target_format=target_format,
+        input_path=input_path
+    )
+    db.session.add(job)
+    db.session.commit()
+
+    try:
+        future = get_executor(max_workers).submit(run_conversion, input_path, target_format, options or {})
+    except Exception as e:
+        release_slot(user_id)
+        job.status = "failed"
+        job.error = str(e)
+        db.session.commit()
+        raise
+
+    job_id = job.id
+    future.add_done_callback(lambda f: _on_done(app, job_id, user_id, f))
+    return job
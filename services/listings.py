@@ -0,0 +1,209 @@
+import base64
+import json
+from datetime import date, datetime
+
+from sqlalchemy import func, literal, tuple_
+from sqlalchemy.types import Date, DateTime, Integer, String
+
+from config.base_config import BaseConfig
+from models.db import db
+from models.user import APIKey, RequestLog, User
+
+
+# -----------------------------
+#   Curseurs (pagination par clé)
+# -----------------------------
+def encode_cursor(values):
+    """Valeurs de tri de la dernière ligne → jeton opaque (base64 url-safe)."""
+    raw = json.dumps([v.isoformat() if isinstance(v, (date, datetime)) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token, columns):
+    """Jeton → valeurs typées comme les colonnes de tri. ValueError si invalide."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Curseur invalide") from e
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise ValueError("Curseur invalide")
+    return [None if value is None else _cursor_value(column, value) for column, value in zip(columns, values)]
+
+
+def _cursor_value(column, value):
+    """Valeur du jeton au type de la colonne ; ValueError (jamais TypeError) si elle ne correspond pas."""
+    if isinstance(column.type, (DateTime, Date)):
+        if not isinstance(value, str):
+            raise ValueError("Curseur invalide")
+        parse = datetime.fromisoformat if isinstance(column.type, DateTime) else date.fromisoformat
+        try:
+            return parse(value)
+        except ValueError as e:
+            raise ValueError("Curseur invalide") from e
+    if isinstance(column.type, Integer) and (not isinstance(value, int) or isinstance(value, bool)):
+        raise ValueError("Curseur invalide")
+    if isinstance(column.type, String) and not isinstance(value, str):
+        raise ValueError("Curseur invalide")
+    return value
+
+
+def serialize(row):
+    return {
+        key: value.isoformat() if isinstance(value, (date, datetime)) else value
+        for key, value in row._mapping.items()
+    }
+
+
+def prefix_range(column, prefix):
+    """Préfixe en intervalle [prefix, prefix + U+FFFF) : utilise l'index (LIKE ne le fait pas sous SQLite)."""
+    return (column >= prefix) & (column < prefix + "\uffff")
+
+
+def email_prefix(email):
+    """Préfixe d'email insensible à la casse (index ix_users_email_lower)."""
+    return prefix_range(func.lower(User.email), email.lower())
+
+
+# -----------------------------
+#   Listes admin
+# -----------------------------
+class Listing:
+    """
+    Requête en colonnes (pas d'entités ORM) triée sur `order` (dernière colonne unique).
+    page() : une page après un curseur (exports complets : services/exports.py).
+    """
+
+    def __init__(self, columns, order, descending=False, join=None):
+        self.columns = columns
+        self.order = order
+        self.descending = descending
+        self.join = join
+
+    def query(self, filters):
+        query = db.session.query(*self.columns)
+        if self.join is not None:
+            query = query.join(*self.join)
+        return query.filter(*filters)
+
+    def ordering(self):
+        return [c.desc() if self.descending else c.asc() for c in self.order]
+
+    def _seek(self, query, cursor, limit):
+        if cursor:
+            values = decode_cursor(cursor, self.order)
+            key = tuple_(*self.order)
+            bound = tuple_(*(literal(v, c.type) for v, c in zip(values, self.order)))
+            query = query.filter(key < bound if self.descending else key > bound)
+        rows = query.order_by(*self.ordering()).limit(limit + 1).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor([rows[-1]._mapping[c.key] for c in self.order])
+        return rows, next_cursor
+
+    def page(self, filters, cursor=None, limit=BaseConfig.ADMIN_PAGE_SIZE):
+        """(lignes sérialisées, curseur suivant ou None)."""
+        limit = max(1, min(limit, BaseConfig.ADMIN_PAGE_MAX))
+        rows, next_cursor = self._seek(self.query(filters), cursor, limit)
+        return [serialize(r) for r in rows], next_cursor
+
+
+USERS = Listing(
+    columns=(User.id, User.email, User.is_admin, User.is_active, User.created_at,
+             User.last_login_at, User.login_count),
+    order=(User.id,)
+)
+
+KEYS = Listing(
+    columns=(APIKey.id, APIKey.user_id, User.email, APIKey.api_key, APIKey.created_at,
+             APIKey.daily_limit, APIKey.today_usage, APIKey.total_usage, APIKey.revoked,
+             APIKey.last_used_at),
+    order=(APIKey.created_at, APIKey.id),
+    descending=True,
+    join=(User, APIKey.user_id == User.id)
+)
+
+LOGS = Listing(
+    columns=(RequestLog.id, RequestLog.user_id, RequestLog.endpoint, RequestLog.method,
+             RequestLog.status_code, RequestLog.time, RequestLog.ip_address,
+             RequestLog.response_time_ms),
+    order=(RequestLog.id,),
+    descending=True
+)
+
+
+# -----------------------------
+#   Filtres (arguments GET)
+# -----------------------------
+def _flag(value):
+    if value in ("1", "true", "yes"):
+        return True
+    if value in ("0", "false", "no"):
+        return False
+    return None
+
+
+def _date(value):
+    """AAAA-MM-JJ ; ValueError si invalide (un filtre ignoré exporterait toute la table)."""
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Date invalide (AAAA-MM-JJ attendu) : {value}") from None
+
+
+def user_filters(args):
+    filters = []
+    email = args.get("email", "").strip()
+    if email:
+        filters.append(email_prefix(email))
+    role = args.get("role", "").strip()
+    if role in ("admin", "user"):
+        filters.append(User.is_admin == (role == "admin"))
+    active = _flag(args.get("active", ""))
+    if active is not None:
+        filters.append(User.is_active == active)
+    return filters
+
+
+def key_filters(args):
+    filters = []
+    email = args.get("email", "").strip()
+    if email:
+        filters.append(email_prefix(email))
+    status = args.get("status", "").strip()
+    if status in ("active", "revoked"):
+        filters.append(APIKey.revoked == (status == "revoked"))
+    user_id = args.get("user_id", type=int)
+    if user_id:
+        filters.append(APIKey.user_id == user_id)
+    return filters
+
+
+def log_filters(args):
+    filters = []
+    user_id = args.get("user_id", type=int)
+    if user_id:
+        filters.append(RequestLog.user_id == user_id)
+    endpoint = args.get("endpoint", "").strip()
+    if endpoint:
+        filters.append(prefix_range(RequestLog.endpoint, endpoint))
+    status = args.get("status", type=int)
+    if status:
+        filters.append(RequestLog.status_code == status)
+    # plage de dates (incluses) : index (date, endpoint)
+    date_from = _date(args.get("date_from"))
+    if date_from:
+        filters.append(RequestLog.date >= date_from)
+    date_to = _date(args.get("date_to"))
+    if date_to:
+        filters.append(RequestLog.date <= date_to)
+    return filters
+
+
+LISTINGS = {
+    "users": (USERS, user_filters),
+    "keys": (KEYS, key_filters),
+    "logs": (LOGS, log_filters),
+}
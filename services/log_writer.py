@@ -0,0 +1,127 @@
+import atexit
+import os
+import queue
+import threading
+import time
+
+from config.base_config import BaseConfig
+from models.db import db
+from models.user import RequestLog
+from services.request_stats import upsert_rollups
+
+
+class RequestLogWriter:
+    """
+    Journalisation « write-behind » des RequestLog.
+    Les requêtes déposent un dict dans une file bornée ; un thread de fond
+    insère par lots (executemany) dès que le lot est plein ou que l'intervalle expire.
+    Si la file est pleine, l'entrée est abandonnée (jamais de blocage de la requête).
+    """
+
+    def __init__(self):
+        self.app = None
+        self.max_size = BaseConfig.LOG_QUEUE_MAX
+        self.batch_size = BaseConfig.LOG_BATCH_SIZE
+        self.flush_interval = BaseConfig.LOG_FLUSH_INTERVAL
+        self.dropped = 0
+        self.written = 0
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.max_size = app.config.get("LOG_QUEUE_MAX", self.max_size)
+        self.batch_size = app.config.get("LOG_BATCH_SIZE", self.batch_size)
+        self.flush_interval = app.config.get("LOG_FLUSH_INTERVAL", self.flush_interval)
+        atexit.register(self.flush)
+
+    # -----------------------------
+    #   Côté requête
+    # -----------------------------
+    def push(self, record):
+        """Ajoute une entrée (dict de colonnes RequestLog) sans attendre la base."""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _ensure_started(self):
+        # après un fork (gunicorn), le thread du parent n'existe plus : on repart à zéro
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(maxsize=self.max_size)
+                self._thread = threading.Thread(target=self._run, name="request-log-writer", daemon=True)
+                self._pid = os.getpid()
+                self._thread.start()
+
+    # -----------------------------
+    #   Thread de fond
+    # -----------------------------
+    def _run(self):
+        while True:
+            batch, flushed = self._collect()
+            if batch:
+                self._write(batch)
+            if flushed is not None:
+                flushed.set()
+
+    def _collect(self):
+        """Attend un lot complet, la fin de l'intervalle ou une demande de flush."""
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if isinstance(item, threading.Event):
+                return batch, item
+            batch.append(item)
+        return batch, None
+
+    def _write(self, batch):
+        try:
+            with self.app.app_context():
+                with db.engine.begin() as conn:
+                    # executemany exige les mêmes colonnes pour toutes les lignes :
+                    # une entrée incomplète ne doit pas faire perdre le reste du lot
+                    groups = {}
+                    for record in batch:
+                        groups.setdefault(frozenset(record), []).append(record)
+                    for records in groups.values():
+                        conn.execute(RequestLog.__table__.insert(), records)
+                    # agrégats journaliers mis à jour dans la même transaction
+                    upsert_rollups(conn, batch)
+            self.written += len(batch)
+        except Exception as e:
+            self.dropped += len(batch)
+            print(f"[⚠] Écriture des logs impossible ({len(batch)} perdus) : {e}", flush=True)
+
+    def flush(self, timeout=5):
+        """Écrit tout ce qui est en attente et attend la fin (arrêt du process, tests)."""
+        if self._queue is None or self._pid != os.getpid() or not self._thread.is_alive():
+            return
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return
+        done.wait(timeout)
+
+    def stats(self):
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "dropped": self.dropped,
+            "written": self.written
+        }
+
+
+log_writer = RequestLogWriter()
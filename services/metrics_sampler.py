@@ -0,0 +1,132 @@
+import os
+import platform
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import psutil
+
+from config.config import Config
+
+
+class MetricsSampler:
+    """
+    Échantillonne les métriques système dans un thread de fond.
+    Les N derniers échantillons sont gardés dans un buffer circulaire :
+    /admin/metrics répond instantanément avec le dernier (ou une fenêtre).
+    """
+
+    def __init__(self, interval=Config.METRICS_REFRESH_INTERVAL, history=Config.METRICS_HISTORY_SIZE):
+        self.interval = interval
+        self.samples = deque(maxlen=history)
+        self.requests_total = 0
+        self.in_flight = 0
+        self._last_requests = 0
+        self._last_time = None
+        self._counter_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._process = None
+
+    def init_app(self, app):
+        self.interval = app.config.get("METRICS_REFRESH_INTERVAL", self.interval)
+        history = app.config.get("METRICS_HISTORY_SIZE", self.samples.maxlen)
+        self.samples = deque(maxlen=history)
+
+        @app.before_request
+        def count_request():
+            self.ensure_started()
+            with self._counter_lock:
+                self.requests_total += 1
+
+    # -----------------------------
+    #   Compteurs (côté requêtes)
+    # -----------------------------
+    @contextmanager
+    def track_conversion(self):
+        """Compte une conversion/compression en cours pendant le bloc."""
+        with self._counter_lock:
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            with self._counter_lock:
+                self.in_flight -= 1
+
+    # -----------------------------
+    #   Thread d'échantillonnage
+    # -----------------------------
+    def ensure_started(self):
+        # un thread par processus (gunicorn fork après l'import)
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._process = psutil.Process()
+                self.samples.clear()
+                psutil.cpu_percent(interval=None)  # amorce la mesure CPU non bloquante
+                self.sample()
+                threading.Thread(target=self._run, name="metrics-sampler", daemon=True).start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.sample()
+            except Exception as e:
+                print(f"[⚠] Échantillonnage des métriques impossible : {e}", flush=True)
+
+    def sample(self):
+        """Prend un échantillon (aucune attente : cpu_percent depuis le dernier appel)."""
+        from services.job_queue import pending_jobs
+
+        now = time.time()
+        with self._counter_lock:
+            requests_total = self.requests_total
+            in_flight = self.in_flight
+
+        elapsed = now - self._last_time if self._last_time else None
+        request_rate = (requests_total - self._last_requests) / elapsed if elapsed else 0.0
+        self._last_requests, self._last_time = requests_total, now
+
+        try:
+            open_fds = self._process.num_fds()
+        except AttributeError:  # Windows
+            open_fds = self._process.num_handles()
+
+        sample = {
+            "timestamp": now,
+            "system": {
+                "cpu_percent": psutil.cpu_percent(interval=None),
+                "memory_percent": psutil.virtual_memory().percent,
+                "disk_usage_percent": psutil.disk_usage('/').percent,
+                "platform": platform.system(),
+                "platform_version": platform.version()
+            },
+            "process": {
+                "pid": self._pid,
+                "rss_bytes": self._process.memory_info().rss,
+                "open_fds": open_fds
+            },
+            "requests": requests_total,
+            "request_rate": round(request_rate, 3),
+            "conversions_in_flight": in_flight,
+            "jobs_pending": pending_jobs(),
+            "uptime_seconds": int(now - psutil.boot_time())
+        }
+        self.samples.append(sample)
+        return sample
+
+    def latest(self):
+        self.ensure_started()
+        return self.samples[-1]
+
+    def window(self, count):
+        """Les `count` derniers échantillons (du plus ancien au plus récent)."""
+        self.ensure_started()
+        return list(self.samples)[-count:]
+
+
+metrics_sampler = MetricsSampler()
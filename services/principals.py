@@ -0,0 +1,184 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from flask import g
+from sqlalchemy.orm import make_transient_to_detached
+
+from config.base_config import BaseConfig
+from models.db import db
+from models.user import APIKey, User
+
+# Vue minimale d'une clé API : ce dont l'authentification et l'admission ont besoin
+KeyPrincipal = namedtuple("KeyPrincipal", "id user_id daily_limit revoked")
+
+_MISSING = object()
+
+
+class TTLCache:
+    """LRU borné à expiration courte (thread-safe). None est une valeur cachable (absence)."""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or item[0] <= now:
+                self.misses += 1
+                return _MISSING
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def discard_where(self, predicate):
+        with self._lock:
+            for key in [k for k, (_, v) in self._items.items() if predicate(v)]:
+                del self._items[key]
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+
+class PrincipalCache:
+    """
+    Utilisateurs et clés API en mémoire (par processus, PRINCIPAL_CACHE_TTL secondes) :
+    aucune requête SQL d'authentification sur un succès de cache.
+    Les actions admin qui modifient un compte ou une clé invalident l'entrée ici ;
+    dans les autres processus, l'entrée expire au bout du TTL.
+
+    current_user est une copie détachée de la session : ses colonnes sont lues sans SQL,
+    mais une modification doit passer par db.session.merge() (ou une requête explicite).
+    """
+
+    def __init__(self):
+        self.users = TTLCache(BaseConfig.PRINCIPAL_CACHE_SIZE, BaseConfig.PRINCIPAL_CACHE_TTL)
+        self.keys = TTLCache(BaseConfig.PRINCIPAL_CACHE_SIZE, BaseConfig.PRINCIPAL_CACHE_TTL)
+        self.user_keys = TTLCache(BaseConfig.PRINCIPAL_CACHE_SIZE, BaseConfig.PRINCIPAL_CACHE_TTL)
+
+    def init_app(self, app):
+        size = app.config.get("PRINCIPAL_CACHE_SIZE", BaseConfig.PRINCIPAL_CACHE_SIZE)
+        ttl = app.config.get("PRINCIPAL_CACHE_TTL", BaseConfig.PRINCIPAL_CACHE_TTL)
+        for cache in (self.users, self.keys, self.user_keys):
+            cache.max_size, cache.ttl = size, ttl
+            cache.clear()
+
+    # -----------------------------
+    #   Lecture
+    # -----------------------------
+    def user(self, user_id):
+        """Utilisateur (copie détachée) ou None."""
+        values = self.users.get(user_id)
+        if values is _MISSING:
+            values = self._load_user(user_id)
+            self.users.put(user_id, values)
+        if values is None:
+            return None
+        user = User(**values)
+        make_transient_to_detached(user)
+        return user
+
+    def api_key(self, value):
+        """KeyPrincipal de la clé `value` (révoquée ou non), ou None si inconnue."""
+        principal = self.keys.get(value)
+        if principal is _MISSING:
+            row = (
+                db.session.query(APIKey.id, APIKey.user_id, APIKey.daily_limit, APIKey.revoked)
+                .filter_by(api_key=value)
+                .first()
+            )
+            principal = KeyPrincipal(*row) if row else None
+            self.keys.put(value, principal)
+        return principal
+
+    def primary_key(self, user_id):
+        """Première clé active de l'utilisateur (poids d'admission), ou None."""
+        principal = self.user_keys.get(user_id)
+        if principal is _MISSING:
+            row = (
+                db.session.query(APIKey.id, APIKey.user_id, APIKey.daily_limit, APIKey.revoked)
+                .filter_by(user_id=user_id, revoked=False)
+                .order_by(APIKey.id)
+                .first()
+            )
+            principal = KeyPrincipal(*row) if row else None
+            self.user_keys.put(user_id, principal)
+        return principal
+
+    @staticmethod
+    def _load_user(user_id):
+        columns = User.__table__.columns
+        row = db.session.execute(db.select(*columns).where(User.id == user_id)).first()
+        if row is None:
+            return None
+        return {column.key: row[i] for i, column in enumerate(columns)}
+
+    # -----------------------------
+    #   Authentification
+    # -----------------------------
+    def load_from_request(self, req):
+        """Authentification par en-tête X-API-Key (API uniquement) : clé active d'un compte actif."""
+        if not req.path.startswith("/convertify/api/"):
+            return None
+        value = req.headers.get("X-API-Key")
+        if not value:
+            return None
+        principal = self.api_key(value)
+        if principal is None or principal.revoked:
+            return None
+        user = self.user(principal.user_id)
+        if user is None or not user.is_active:
+            return None
+        g.api_key = principal
+        return user
+
+    @staticmethod
+    def request_key():
+        """Clé utilisée pour authentifier la requête courante (None : session par cookie)."""
+        return g.get("api_key")
+
+    # -----------------------------
+    #   Invalidation
+    # -----------------------------
+    def invalidate_user(self, user_id):
+        """Compte modifié ou supprimé : l'utilisateur et toutes ses clés."""
+        self.users.pop(user_id)
+        self.user_keys.pop(user_id)
+        self.keys.discard_where(lambda p: p is not None and p.user_id == user_id)
+
+    def invalidate_key(self, value, user_id=None):
+        """Clé créée, révoquée ou modifiée (user_id : clé principale à recalculer)."""
+        self.keys.pop(value)
+        if user_id is not None:
+            self.user_keys.pop(user_id)
+
+    def stats(self):
+        return {
+            name: {"size": len(cache), "hits": cache.hits, "misses": cache.misses}
+            for name, cache in (("users", self.users), ("keys", self.keys), ("user_keys", self.user_keys))
+        }
+
+
+principals = PrincipalCache()
+
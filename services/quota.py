@@ -0,0 +1,255 @@
+import atexit
+import os
+import threading
+import time
+from datetime import date, datetime
+
+from sqlalchemy import case, select, update
+
+from config.base_config import BaseConfig
+from models.db import db
+from models.user import APIKey
+from .principals import principals
+from .quota_rollover import quota_rollover
+
+
+class QuotaExceeded(Exception):
+    """Quota journalier atteint (HTTP 429)."""
+
+
+class NoActiveKey(Exception):
+    """Aucune clé API active pour l'utilisateur (HTTP 403)."""
+
+
+def _consume_statement(user_id, amount, key_id=None):
+    """
+    UPDATE atomique : débite la clé `key_id` (clé présentée en X-API-Key), sinon la clé
+    active qui a le plus de marge, seulement si today_usage + amount <= daily_limit.
+    RETURNING → id de la clé.
+    """
+    if key_id is not None:
+        target = APIKey.id == key_id
+    else:
+        target = APIKey.id == (
+            select(APIKey.id)
+            .where(
+                APIKey.user_id == user_id,
+                APIKey.revoked.is_(False),
+                APIKey.today_usage + amount <= APIKey.daily_limit
+            )
+            .order_by((APIKey.daily_limit - APIKey.today_usage).desc())
+            .limit(1)
+            .scalar_subquery()
+        )
+    return (
+        update(APIKey)
+        .where(
+            target,
+            APIKey.user_id == user_id,
+            APIKey.revoked.is_(False),
+            APIKey.today_usage + amount <= APIKey.daily_limit
+        )
+        .values(
+            today_usage=APIKey.today_usage + amount,
+            total_usage=APIKey.total_usage + amount,
+            last_used_at=datetime.utcnow()
+        )
+        .returning(APIKey.id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def consume_db(user_id, amount=1, key_id=None):
+    """Débite `amount` appels en une requête (sur la clé key_id si donnée). Retourne l'id de la clé débitée."""
+    debited = db.session.execute(_consume_statement(user_id, amount, key_id)).scalar()
+    db.session.commit()
+    if debited is not None:
+        return debited
+
+    # Échec : distinguer « pas de clé » de « quota atteint » (requête seulement dans ce cas)
+    query = db.session.query(APIKey.id).filter_by(user_id=user_id, revoked=False)
+    if key_id is not None:
+        query = query.filter_by(id=key_id)
+    if query.first() is None:
+        raise NoActiveKey("Aucune clé API active trouvée")
+    raise QuotaExceeded("Quota journalier dépassé")
+
+
+def refund_db(key_id, amount=1):
+    """Rend des appels non consommés (conversion échouée, jetons inutilisés)."""
+    db.session.execute(
+        update(APIKey)
+        .where(APIKey.id == key_id)
+        .values(
+            today_usage=case((APIKey.today_usage > amount, APIKey.today_usage - amount), else_=0),
+            total_usage=case((APIKey.total_usage > amount, APIKey.total_usage - amount), else_=0)
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+
+class TokenBuckets:
+    """
+    Cache en mémoire devant la base : chaque utilisateur réserve un bloc de jetons
+    en un seul UPDATE atomique puis les consomme localement. Les jetons restants
+    sont rendus à la base après QUOTA_SYNC_INTERVAL secondes d'inactivité.
+    La base reste la référence : daily_limit n'est jamais dépassé.
+    Chaque bloc porte son jour d'usage : après minuit, un bloc de la veille (archivé avec
+    la veille par la bascule) n'est ni consommé ni rendu sur le compteur du nouveau jour.
+    """
+
+    def __init__(self, size=BaseConfig.QUOTA_BUCKET_SIZE, sync_interval=BaseConfig.QUOTA_SYNC_INTERVAL):
+        self.size = size
+        self.sync_interval = sync_interval
+        # (user_id, clé présentée ou None) → [key_id, jetons restants, dernier usage, jour d'usage]
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def consume(self, user_id, amount=1, key_id=None):
+        self.sync()
+        slot = (user_id, key_id)
+        with self._lock:
+            bucket = self._buckets.get(slot)
+            if bucket and bucket[3] == date.today() and bucket[1] >= amount:
+                bucket[1] -= amount
+                bucket[2] = time.monotonic()
+                return bucket[0]
+
+        # Réserve un bloc ; s'il ne reste pas assez de marge, débit exact
+        try:
+            debited = consume_db(user_id, amount + self.size, key_id)
+            tokens = self.size
+        except QuotaExceeded:
+            debited = consume_db(user_id, amount, key_id)
+            tokens = 0
+
+        with self._lock:
+            previous = self._buckets.pop(slot, None)
+            self._buckets[slot] = [debited, tokens, time.monotonic(), date.today()]
+        if previous:
+            self._return([previous])
+        return debited
+
+    def refund(self, user_id, key_id, amount=1):
+        with self._lock:
+            for slot in ((user_id, key_id), (user_id, None)):
+                bucket = self._buckets.get(slot)
+                if bucket and bucket[0] == key_id:
+                    if bucket[3] == date.today():
+                        bucket[1] += amount
+                    return  # jeton de la veille : déjà archivé, pas rendu au nouveau jour
+        refund_db(key_id, amount)
+
+    def invalidate(self, user_id):
+        """Rend immédiatement les jetons (clé révoquée, quota modifié…)."""
+        with self._lock:
+            slots = [slot for slot in self._buckets if slot[0] == user_id]
+            returned = [self._buckets.pop(slot) for slot in slots]
+        self._return(returned)
+
+    def sync(self, force=False):
+        now, today = time.monotonic(), date.today()
+        with self._lock:
+            stale = [
+                slot for slot, (_, _, last_used, day) in self._buckets.items()
+                if force or day != today or now - last_used >= self.sync_interval
+            ]
+            returned = [self._buckets.pop(slot) for slot in stale]
+        self._return(returned)
+
+    @staticmethod
+    def _return(buckets):
+        """Rend les jetons inutilisés du jour ; ceux d'un jour précédent sont abandonnés."""
+        today = date.today()
+        for key_id, tokens, _, day in buckets:
+            if tokens and day == today:
+                refund_db(key_id, tokens)
+
+
+class QuotaService:
+    """Point d'entrée unique : débit atomique en base, avec jetons en mémoire si activés."""
+
+    def __init__(self):
+        self.buckets = None
+        self.app = None
+        self.scheduler = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        if not app.config.get("QUOTA_BUCKET_ENABLED", BaseConfig.QUOTA_BUCKET_ENABLED):
+            return
+        self.buckets = TokenBuckets(
+            size=app.config.get("QUOTA_BUCKET_SIZE", BaseConfig.QUOTA_BUCKET_SIZE),
+            sync_interval=app.config.get("QUOTA_SYNC_INTERVAL", BaseConfig.QUOTA_SYNC_INTERVAL)
+        )
+        # blocs de la veille abandonnés avant la remise à zéro, quel que soit le déclencheur
+        # (comptés avec la veille : un autre processus a pu basculer entre-temps)
+        quota_rollover.before_run(lambda: self.buckets.sync(force=True))
+        atexit.register(self._sync_at_exit)
+        if not app.config.get("ENABLE_SCHEDULER", BaseConfig.ENABLE_SCHEDULER):
+            return
+
+        @app.before_request
+        def start_quota_sync():
+            self.ensure_started()
+
+    def ensure_started(self):
+        # jetons d'un utilisateur inactif rendus sans attendre son prochain débit
+        # (après un fork, le scheduler du parent n'existe plus)
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            from apscheduler.schedulers.background import BackgroundScheduler
+
+            self._pid = os.getpid()
+            self.scheduler = BackgroundScheduler(daemon=True)
+            self.scheduler.add_job(
+                self._periodic_sync, "interval", id="quota_sync",
+                seconds=self.buckets.sync_interval, max_instances=1, coalesce=True
+            )
+            self.scheduler.start()
+
+    def consume(self, user_id, amount=1):
+        """
+        Débite le quota ; lève NoActiveKey / QuotaExceeded. Retourne l'id de la clé.
+        Requête authentifiée par X-API-Key : c'est cette clé qui est débitée (comme pour l'admission).
+        """
+        if quota_rollover.is_due():
+            # premier débit d'un nouveau jour : compteurs de la veille archivés et remis à zéro
+            quota_rollover.trigger()
+        presented = principals.request_key()
+        key_id = presented.id if presented is not None else None
+        if self.buckets is not None:
+            return self.buckets.consume(user_id, amount, key_id)
+        return consume_db(user_id, amount, key_id)
+
+    def refund(self, user_id, key_id, amount=1):
+        if self.buckets is not None:
+            return self.buckets.refund(user_id, key_id, amount)
+        return refund_db(key_id, amount)
+
+    def invalidate(self, user_id):
+        if self.buckets is not None:
+            self.buckets.invalidate(user_id)
+
+    def _periodic_sync(self):
+        try:
+            with self.app.app_context():
+                self.buckets.sync()
+        except Exception as e:
+            print(f"[⚠] Synchronisation des quotas impossible : {e}", flush=True)
+
+    def _sync_at_exit(self):
+        try:
+            with self.app.app_context():
+                self.buckets.sync(force=True)
+        except Exception as e:
+            print(f"[⚠] Synchronisation des quotas impossible : {e}", flush=True)
+
+
+quota = QuotaService()
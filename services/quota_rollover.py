@@ -0,0 +1,153 @@
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func, insert, literal, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from config.base_config import BaseConfig
+from models.db import db
+from models.user import APIKey, APIKeyUsageDaily, QuotaRolloverState
+
+STATE_ID = 1
+# Échec de la bascule (base indisponible, table absente avant `init-db`) : nouvel essai après ce délai
+RETRY_SECONDS = 60
+
+
+class QuotaRollover:
+    """
+    Bascule journalière des quotas : today_usage de chaque clé est archivé dans
+    api_key_usage_daily puis remis à zéro, en requêtes ensemblistes (INSERT … SELECT, UPDATE).
+    Une seule exécution par jour, tous workers confondus : l'UPDATE conditionnel de la
+    ligne quota_rollover (usage_day < aujourd'hui) sert de verrou, dans la même transaction.
+    Processus arrêté à minuit : la bascule suivante archive l'usage sous le jour où il a
+    été compté (usage_day) ; les jours sans activité n'ont pas de ligne.
+    Déclenchée par un job planifié (minuit et démarrage) et au premier débit d'un nouveau jour,
+    toujours via trigger() : les callbacks before_run (jetons en mémoire rendus) passent avant.
+    Une erreur de base est journalisée et retentée après RETRY_SECONDS, sans jamais remonter
+    jusqu'au débit du quota.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.scheduler = None
+        self._day = None  # dernier jour courant vu par ce processus
+        self._retry_at = 0.0
+        self._before_run = []
+        self._pid = None
+        self._lock = threading.Lock()
+        self._run_lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        if not app.config.get("ENABLE_SCHEDULER", BaseConfig.ENABLE_SCHEDULER):
+            return
+
+        @app.before_request
+        def start_rollover():
+            self.ensure_started()
+
+    def ensure_started(self):
+        # après un fork (gunicorn), le scheduler du parent n'existe plus
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            from apscheduler.schedulers.background import BackgroundScheduler
+
+            self._pid = os.getpid()
+            self.scheduler = BackgroundScheduler(daemon=True)
+            # chaque nuit, plus un rattrapage immédiat au démarrage
+            self.scheduler.add_job(
+                self._scheduled_run, "cron", id="quota_rollover", hour=0, minute=0, second=5,
+                next_run_time=datetime.now(), max_instances=1, coalesce=True, misfire_grace_time=None
+            )
+            self.scheduler.start()
+
+    def _scheduled_run(self):
+        with self.app.app_context():
+            self.trigger()
+
+    def before_run(self, callback):
+        """callback() appelé juste avant chaque bascule de ce processus (ex. jetons réservés rendus)."""
+        self._before_run.append(callback)
+
+    def is_due(self):
+        """Test en mémoire (aucune requête) : le jour a-t-il changé depuis la dernière bascule vue ?"""
+        return self._day != date.today() and time.monotonic() >= self._retry_at
+
+    def trigger(self):
+        """Point d'entrée unique (job planifié, premier débit du jour). Ne lève jamais."""
+        with self._run_lock:
+            if not self.is_due():
+                return None  # déjà faite par un autre thread pendant l'attente du verrou
+            try:
+                for callback in self._before_run:
+                    callback()
+                return self.run()
+            except SQLAlchemyError as e:
+                db.session.rollback()
+                self._retry_at = time.monotonic() + RETRY_SECONDS
+                print(f"[⚠] Bascule des quotas impossible (nouvel essai dans {RETRY_SECONDS} s) : {e}",
+                      flush=True)
+                return None
+
+    def run(self, today=None):
+        """Bascule si nécessaire. Retourne le nombre de clés archivées (None : rien à faire ici)."""
+        today = today or date.today()
+        state = QuotaRolloverState.__table__
+        try:
+            archived, previous_day = self._rollover(state, today)
+        except IntegrityError:
+            return None  # ligne d'état créée au même moment par un autre worker
+        self._day = today
+        self._retry_at = 0.0
+        if previous_day is None:
+            return None
+        print(f"🗓️ Quotas basculés : {archived} clé(s) archivée(s) pour le {previous_day}", flush=True)
+        return archived
+
+    @staticmethod
+    def _rollover(state, today):
+        with db.engine.begin() as conn:
+            # verrou : seul l'UPDATE qui trouve usage_day < today bascule (les autres : 0 ligne)
+            previous_day = conn.execute(
+                update(state)
+                .where(state.c.id == STATE_ID, state.c.usage_day < today)
+                .values(previous_day=state.c.usage_day, usage_day=today, rolled_at=datetime.utcnow())
+                .returning(state.c.previous_day)
+            ).scalar()
+
+            if previous_day is None:
+                if conn.execute(select(state.c.id).where(state.c.id == STATE_ID)).first() is None:
+                    # première exécution : l'usage en cours est compté pour aujourd'hui
+                    conn.execute(insert(state).values(id=STATE_ID, usage_day=today))
+                return 0, None
+
+            archived = conn.execute(
+                insert(APIKeyUsageDaily.__table__).from_select(
+                    ["key_id", "user_id", "day", "count"],
+                    select(APIKey.id, APIKey.user_id, literal(previous_day, db.Date), APIKey.today_usage)
+                    .where(APIKey.today_usage > 0)
+                )
+            ).rowcount
+            conn.execute(update(APIKey.__table__).where(APIKey.today_usage != 0).values(today_usage=0))
+        return archived, previous_day
+
+
+quota_rollover = QuotaRollover()
+
+
+def usage_summary(user_id):
+    """Appels du jour (compteurs des clés) + historique (7 derniers jours, total), en agrégats SQL."""
+    today = db.session.query(func.coalesce(func.sum(APIKey.today_usage), 0)).filter(
+        APIKey.user_id == user_id
+    ).scalar()
+    week_start = date.today() - timedelta(days=6)
+    last_7_days, total = db.session.query(
+        func.coalesce(func.sum(APIKeyUsageDaily.count).filter(APIKeyUsageDaily.day >= week_start), 0),
+        func.coalesce(func.sum(APIKeyUsageDaily.count), 0)
+    ).filter(APIKeyUsageDaily.user_id == user_id).one()
+    return {"today": today, "last_7_days": last_7_days + today, "total": total + today}
@@ -0,0 +1,45 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from config.base_config import BaseConfig
+
+
+# -----------------------------
+#   Pool de rendu partagé
+# -----------------------------
+class RenderPool:
+    """
+    Pool de processus unique par worker web pour le travail CPU découpé en lots
+    (rastérisation PDF, extraction de texte, recompression d'images).
+    Taille bornée par RENDER_POOL_MAX_WORKERS, quel que soit le nombre de requêtes simultanées.
+    Dans un processus du pool de jobs (services/job_queue.py), le travail reste sur place :
+    pas de pool imbriqué.
+    """
+
+    def __init__(self):
+        self.max_workers = BaseConfig.RENDER_POOL_MAX_WORKERS
+        self._pool = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.max_workers = app.config.get("RENDER_POOL_MAX_WORKERS", BaseConfig.RENDER_POOL_MAX_WORKERS)
+
+    def workers(self, wanted=None):
+        """Nombre de processus utilisables : 1 (sur place) dans un processus enfant."""
+        if multiprocessing.parent_process() is not None:
+            return 1
+        return max(1, min(wanted or os.cpu_count() or 1, self.max_workers))
+
+    def executor(self):
+        with self._lock:
+            # pool hérité d'un fork (gunicorn --preload) : inutilisable, on en recrée un
+            if self._pool is None or self._pid != os.getpid():
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+                self._pid = os.getpid()
+            return self._pool
+
+
+render_pool = RenderPool()
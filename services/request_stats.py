@@ -0,0 +1,151 @@
+from collections import defaultdict
+from datetime import date
+
+from sqlalchemy import case, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models.db import db
+from models.user import RequestLog, RequestStatDaily
+
+KEY_COLUMNS = ["day", "endpoint", "user_id", "status_code"]
+
+
+# -----------------------------
+#   Écriture (log writer)
+# -----------------------------
+def aggregate(records):
+    """Regroupe des entrées RequestLog (dicts) par (jour, endpoint, user, statut)."""
+    groups = defaultdict(lambda: [0, 0.0, 0.0])
+    for r in records:
+        key = (r.get("date") or date.today(), r["endpoint"], r.get("user_id") or 0, r.get("status_code") or 0)
+        latency = r.get("response_time_ms") or 0.0
+        g = groups[key]
+        g[0] += 1
+        g[1] += latency
+        g[2] = max(g[2], latency)
+
+    return [
+        {
+            "day": day, "endpoint": endpoint, "user_id": user_id, "status_code": status,
+            "count": count, "latency_sum_ms": total, "latency_max_ms": peak
+        }
+        for (day, endpoint, user_id, status), (count, total, peak) in groups.items()
+    ]
+
+
+def _upsert(dialect):
+    """INSERT … ON CONFLICT DO UPDATE (SQLite et PostgreSQL) ; None pour les autres bases."""
+    table = RequestStatDaily.__table__
+    if dialect == "postgresql":
+        stmt = postgresql.insert(table)
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(table)
+    else:
+        return None
+
+    excluded = stmt.excluded
+    return stmt.on_conflict_do_update(
+        index_elements=KEY_COLUMNS,
+        set_={
+            "count": table.c.count + excluded.count,
+            "latency_sum_ms": table.c.latency_sum_ms + excluded.latency_sum_ms,
+            "latency_max_ms": case(
+                (excluded.latency_max_ms > table.c.latency_max_ms, excluded.latency_max_ms),
+                else_=table.c.latency_max_ms
+            )
+        }
+    )
+
+
+def _update_or_insert(conn, row):
+    """Repli générique (autres bases) : UPDATE de la ligne du jour, INSERT si elle n'existe pas."""
+    table = RequestStatDaily.__table__
+    update_stmt = (
+        update(table)
+        .where(*(table.c[column] == row[column] for column in KEY_COLUMNS))
+        .values(
+            count=table.c.count + row["count"],
+            latency_sum_ms=table.c.latency_sum_ms + row["latency_sum_ms"],
+            latency_max_ms=case(
+                (table.c.latency_max_ms < row["latency_max_ms"], row["latency_max_ms"]),
+                else_=table.c.latency_max_ms
+            )
+        )
+    )
+    if conn.execute(update_stmt).rowcount:
+        return
+    try:
+        # point de sauvegarde : une insertion concurrente n'annule pas tout le lot
+        with conn.begin_nested():
+            conn.execute(insert(table).values(**row))
+    except IntegrityError:
+        conn.execute(update_stmt)
+
+
+def upsert_rollups(conn, records):
+    """Ajoute un lot d'entrées aux agrégats journaliers (même transaction que l'insertion)."""
+    rows = aggregate(records)
+    if not rows:
+        return
+    stmt = _upsert(conn.dialect.name)
+    if stmt is not None:
+        conn.execute(stmt, rows)
+        return
+    for row in rows:
+        _update_or_insert(conn, row)
+
+
+def rebuild_rollups(conn):
+    """Reconstruit tous les agrégats depuis request_logs (base existante, une seule fois)."""
+    conn.execute(RequestStatDaily.__table__.delete())
+    conn.execute(
+        insert(RequestStatDaily.__table__).from_select(
+            KEY_COLUMNS + ["count", "latency_sum_ms", "latency_max_ms"],
+            select(
+                RequestLog.date,
+                RequestLog.endpoint,
+                func.coalesce(RequestLog.user_id, 0),
+                func.coalesce(RequestLog.status_code, 0),
+                func.count(RequestLog.id),
+                func.coalesce(func.sum(RequestLog.response_time_ms), 0),
+                func.coalesce(func.max(RequestLog.response_time_ms), 0)
+            )
+            .where(RequestLog.date.isnot(None))
+            .group_by(
+                RequestLog.date,
+                RequestLog.endpoint,
+                func.coalesce(RequestLog.user_id, 0),
+                func.coalesce(RequestLog.status_code, 0)
+            )
+        )
+    )
+
+
+# -----------------------------
+#   Lecture (dashboard)
+# -----------------------------
+def daily_counts(start, endpoint_prefix=None):
+    """{jour: nombre de requêtes} depuis `start`."""
+    query = (
+        db.session.query(RequestStatDaily.day, func.sum(RequestStatDaily.count))
+        .filter(RequestStatDaily.day >= start)
+    )
+    if endpoint_prefix:
+        query = query.filter(RequestStatDaily.endpoint.like(f"{endpoint_prefix}%"))
+    return dict(query.group_by(RequestStatDaily.day).all())
+
+
+def count_since(start, end=None):
+    query = db.session.query(func.coalesce(func.sum(RequestStatDaily.count), 0)).filter(RequestStatDaily.day >= start)
+    if end is not None:
+        query = query.filter(RequestStatDaily.day <= end)
+    return query.scalar()
+
+
+def top_endpoints(endpoint_prefix=None, limit=5):
+    total = func.sum(RequestStatDaily.count)
+    query = db.session.query(RequestStatDaily.endpoint, total)
+    if endpoint_prefix:
+        query = query.filter(RequestStatDaily.endpoint.like(f"{endpoint_prefix}%"))
+    return query.group_by(RequestStatDaily.endpoint).order_by(total.desc()).limit(limit).all()
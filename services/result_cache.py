@@ -0,0 +1,183 @@
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from config.base_config import BaseConfig
+from .file_utils import OUTPUT_FOLDER
+
+CACHE_FOLDER = os.path.join(OUTPUT_FOLDER, "cache")
+
+
+class ResultCache:
+    """
+    Cache des résultats de conversion adressé par contenu.
+    Clé = (sha256 du fichier source, format cible, options).
+    L'index SQLite est partagé entre les workers (un fichier sur disque).
+    """
+
+    def __init__(self, folder=CACHE_FOLDER, max_bytes=BaseConfig.CACHE_MAX_BYTES,
+                 max_age=BaseConfig.CACHE_MAX_AGE_SECONDS):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.index_path = os.path.join(folder, "index.db")
+        self._init_lock = threading.Lock()
+        self._ready = False
+
+    # -----------------------------
+    #   Index SQLite
+    # -----------------------------
+    @contextmanager
+    def _db(self):
+        """Connexion courte : commit à la sortie, puis fermeture."""
+        conn = self._connect()
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _connect(self):
+        if not self._ready:
+            with self._init_lock:
+                if not self._ready:
+                    os.makedirs(self.folder, exist_ok=True)
+                    conn = sqlite3.connect(self.index_path, timeout=10)
+                    with conn:
+                        conn.execute(
+                            "CREATE TABLE IF NOT EXISTS entries ("
+                            " key TEXT PRIMARY KEY, path TEXT NOT NULL, size INTEGER NOT NULL,"
+                            " created_at REAL NOT NULL, last_access REAL NOT NULL)"
+                        )
+                        conn.execute("CREATE INDEX IF NOT EXISTS ix_entries_access ON entries (last_access)")
+                        conn.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+                        conn.execute("INSERT OR IGNORE INTO stats VALUES ('hits', 0), ('misses', 0)")
+                    conn.close()
+                    self._ready = True
+        return sqlite3.connect(self.index_path, timeout=10)
+
+    @staticmethod
+    def make_key(digest, target_format, options=None):
+        raw = f"{digest}:{target_format.lower()}:{json.dumps(options or {}, sort_keys=True)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    # -----------------------------
+    #   Lecture / écriture
+    # -----------------------------
+    def get(self, digest, target_format, options=None):
+        """Retourne le chemin du résultat en cache, ou None."""
+        key = self.make_key(digest, target_format, options)
+        with self._db() as conn:
+            row = conn.execute("SELECT path FROM entries WHERE key = ?", (key,)).fetchone()
+            if row and os.path.isfile(row[0]):
+                conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+                conn.execute("UPDATE stats SET value = value + 1 WHERE name = 'hits'")
+                return row[0]
+            if row:
+                # fichier supprimé hors du cache → entrée orpheline
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            conn.execute("UPDATE stats SET value = value + 1 WHERE name = 'misses'")
+        return None
+
+    def put(self, digest, target_format, output_path, options=None, keep_source=False):
+        """
+        Déplace (ou copie si keep_source) le résultat dans le cache et retourne son nouveau chemin.
+        Les dossiers (ex: pages PDF) ne sont pas mis en cache.
+        """
+        if not os.path.isfile(output_path):
+            return output_path
+
+        key = self.make_key(digest, target_format, options)
+        ext = os.path.splitext(output_path)[1]
+        cached_path = os.path.join(self.folder, f"{key}{ext}")
+
+        os.makedirs(self.folder, exist_ok=True)
+        if keep_source:
+            shutil.copyfile(output_path, cached_path)
+        else:
+            os.replace(output_path, cached_path)
+        now = time.time()
+        with self._db() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                (key, cached_path, os.path.getsize(cached_path), now, now)
+            )
+        self.evict()
+        return cached_path
+
+    # -----------------------------
+    #   Éviction LRU (taille totale + âge)
+    # -----------------------------
+    def evict(self):
+        """Supprime les entrées trop vieilles puis les moins récemment utilisées."""
+        removed = []
+        with self._db() as conn:
+            expired = conn.execute(
+                "SELECT key, path, size FROM entries WHERE created_at < ?",
+                (time.time() - self.max_age,)
+            ).fetchall()
+            removed.extend(expired)
+
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            total -= sum(r[2] for r in expired)
+            if total > self.max_bytes:
+                expired_keys = {r[0] for r in expired}
+                for key, path, size in conn.execute(
+                    "SELECT key, path, size FROM entries ORDER BY last_access ASC"
+                ):
+                    if total <= self.max_bytes:
+                        break
+                    if key in expired_keys:
+                        continue
+                    removed.append((key, path, size))
+                    total -= size
+
+            conn.executemany("DELETE FROM entries WHERE key = ?", [(r[0],) for r in removed])
+
+        for _, path, _ in removed:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        return len(removed)
+
+    def stats(self):
+        with self._db() as conn:
+            counters = dict(conn.execute("SELECT name, value FROM stats").fetchall())
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {
+            "hits": counters.get("hits", 0),
+            "misses": counters.get("misses", 0),
+            "entries": entries,
+            "bytes": size
+        }
+
+
+def copy_from_cache(cached_path, output_path):
+    """Copie un résultat en cache vers un chemin de sortie attendu par l'appelant."""
+    shutil.copyfile(cached_path, output_path)
+    return output_path
+
+
+_cache = None
+
+
+def get_result_cache():
+    """Instance partagée, configurée depuis l'app Flask si disponible."""
+    global _cache
+    if _cache is None:
+        try:
+            from flask import current_app
+            config = current_app.config
+        except RuntimeError:
+            config = {}
+        _cache = ResultCache(
+            max_bytes=config.get("CACHE_MAX_BYTES", BaseConfig.CACHE_MAX_BYTES),
+            max_age=config.get("CACHE_MAX_AGE_SECONDS", BaseConfig.CACHE_MAX_AGE_SECONDS)
+        )
+    return _cache
@@ -0,0 +1,195 @@
+import json
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from config.base_config import BaseConfig
+
+# Bornes des buckets (secondes) : mémoire fixe quel que soit le trafic
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# Nombre max de séries (combinaisons de labels) ; au-delà → label "other"
+MAX_SERIES = 500
+
+# Labels issus de la requête (extension du fichier envoyé) : valeurs bornées, sinon "other"
+LABEL_VALUE = re.compile(r"[a-z0-9]{1,10}")
+
+
+def _label(value):
+    value = (value or "").lstrip(".").lower()
+    if not value:
+        return ""
+    return value if LABEL_VALUE.fullmatch(value) else "other"
+
+
+def _escape(value):
+    """Échappement des valeurs de labels (format texte Prometheus)."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    """Histogramme cumulatif à buckets fixes (format Prometheus)."""
+
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # dernier = +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+
+class StageMetrics:
+    """
+    Durées par étape (upload, extraction, rendu, compression, envoi…),
+    labellisées par extension d'entrée et format cible.
+    Partage entre workers gunicorn : chaque processus écrit ses histogrammes dans
+    STAGE_METRICS_DIR/<pid>.json et /metrics additionne tous les fichiers, quel que soit
+    le worker interrogé. Les processus du pool de jobs renvoient leurs durées avec le
+    résultat (recording / merge).
+    """
+
+    def __init__(self, max_series=MAX_SERIES):
+        self.max_series = max_series
+        self.directory = None
+        self._series = {}
+        self._recorded = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    def init_app(self, app):
+        self.directory = app.config.get("STAGE_METRICS_DIR", BaseConfig.STAGE_METRICS_DIR)
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def observe(self, stage, seconds, input_ext="", target=""):
+        if self._recorded is not None:
+            self._recorded.append((stage, seconds, input_ext, target))
+            return
+        labels = (stage, _label(input_ext), _label(target))
+        with self._lock:
+            histogram = self._series.get(labels)
+            if histogram is None:
+                if len(self._series) >= self.max_series:
+                    labels = (stage, "other", "other")
+                    histogram = self._series.setdefault(labels, Histogram())
+                else:
+                    histogram = self._series[labels] = Histogram()
+            histogram.observe(seconds)
+        self._flush()
+
+    @contextmanager
+    def timed(self, stage, input_ext="", target=""):
+        """with stage_metrics.timed("extract", ".pdf", "docx"): ..."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start, input_ext, target)
+
+    @contextmanager
+    def recording(self):
+        """
+        Processus du pool de jobs (un seul thread) : observations collectées dans une liste,
+        renvoyée au parent avec le résultat puis ajoutée par merge().
+        """
+        self._recorded = recorded = []
+        try:
+            yield recorded
+        finally:
+            self._recorded = None
+
+    def merge(self, observations):
+        for stage, seconds, input_ext, target in observations:
+            self.observe(stage, seconds, input_ext, target)
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+        self._flush()
+
+    def _snapshot(self):
+        with self._lock:
+            return [(labels, list(h.counts), h.total, h.count) for labels, h in self._series.items()]
+
+    def _flush(self):
+        """Histogrammes de ce processus écrits dans STAGE_METRICS_DIR/<pid>.json (remplacement atomique)."""
+        if not self.directory:
+            return
+        path = os.path.join(self.directory, f"{os.getpid()}.json")
+        with self._flush_lock:
+            try:
+                with open(path + ".tmp", "w") as f:
+                    json.dump(self._snapshot(), f)
+                os.replace(path + ".tmp", path)
+            except OSError as e:
+                print(f"[⚠] Métriques d'étapes non partagées : {e}", flush=True)
+
+    def _collect(self):
+        """Séries de tous les processus (ou de celui-ci sans STAGE_METRICS_DIR)."""
+        if not self.directory:
+            return self._snapshot()
+        merged = {}
+        try:
+            names = [name for name in os.listdir(self.directory) if name.endswith(".json")]
+        except OSError:
+            names = []
+        for name in names:
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    series = json.load(f)
+            except (OSError, ValueError):
+                continue  # worker arrêté pendant la lecture
+            for labels, counts, total, count in series:
+                current = merged.setdefault(tuple(labels), [[0] * len(counts), 0.0, 0])
+                current[0] = [a + b for a, b in zip(current[0], counts)]
+                current[1] += total
+                current[2] += count
+        return [(labels, counts, total, count) for labels, (counts, total, count) in merged.items()]
+
+    def render_prometheus(self, name="convertify_stage_duration_seconds"):
+        """Exposition texte Prometheus (version 0.0.4)."""
+        series = self._collect()
+
+        lines = [
+            f"# HELP {name} Durée des étapes de conversion/compression.",
+            f"# TYPE {name} histogram",
+        ]
+        for (stage, input_ext, target), counts, total, count in sorted(series):
+            base = f'stage="{_escape(stage)}",input_ext="{_escape(input_ext)}",target="{_escape(target)}"'
+            cumulative = 0
+            for bound, n in zip(BUCKETS, counts):
+                cumulative += n
+                lines.append(f'{name}_bucket{{{base},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{base},le="+Inf"}} {count}')
+            lines.append(f"{name}_sum{{{base}}} {total}")
+            lines.append(f"{name}_count{{{base}}} {count}")
+        return "\n".join(lines) + "\n"
+
+
+class TimedIterator:
+    """Enveloppe un itérable et cumule le temps passé à produire ses éléments."""
+
+    def __init__(self, iterable):
+        self._iterator = iter(iterable)
+        self.elapsed = 0.0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            return next(self._iterator)
+        finally:
+            self.elapsed += time.perf_counter() - start
+
+
+stage_metrics = StageMetrics()
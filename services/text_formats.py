@@ -0,0 +1,210 @@
+import os
+import time
+from collections import deque
+
+from .render_pool import render_pool
+from .stage_metrics import stage_metrics, TimedIterator
+
+# Les bibliothèques de lecture/écriture (pdfplumber, python-docx, markdown, html2text,
+# fpdf) sont importées dans les fonctions : chargées seulement si le format sert.
+
+# Extraction PDF parallèle à partir de ce nombre de pages
+PDF_PARALLEL_MIN_PAGES = 40
+PDF_PAGES_PER_TASK = 10
+
+
+def extract_pdf_pages(input_path, start, end):
+    """Exécuté dans un processus du pool : texte des pages [start, end)."""
+    import pdfplumber
+
+    texts = []
+    with pdfplumber.open(input_path) as pdf:
+        for page in pdf.pages[start:end]:
+            texts.append(page.extract_text() or "")
+            page.close()  # libère le cache de la page
+    return texts
+
+
+def markdown_blocks(lines):
+    """
+    Regroupe des lignes en blocs Markdown (séparés par une ligne vide, hors bloc ```)
+    pour convertir en HTML au fil de l'eau sans couper une liste ou un paragraphe.
+    """
+    block, in_fence = [], False
+    for line in lines:
+        if line.lstrip().startswith("```"):
+            in_fence = not in_fence
+        if not line.strip() and not in_fence and block:
+            yield "\n".join(block)
+            block = []
+        else:
+            block.append(line)
+    if block:
+        yield "\n".join(block)
+
+
+def iter_lines(chunks):
+    """Découpe un flux de morceaux de texte (pages, paragraphes…) en lignes."""
+    for chunk in chunks:
+        yield from chunk.splitlines() or [""]
+
+
+# -----------------------------
+#   Lecture (flux de texte)
+# -----------------------------
+def iter_pdf_text(input_path, max_workers=None):
+    """
+    Texte page par page (générateur) : la mémoire ne dépend pas du nombre de pages.
+    Gros documents : lots de pages répartis sur un pool de processus, rendus dans l'ordre.
+    """
+    import pdfplumber
+
+    try:
+        with pdfplumber.open(input_path) as pdf:
+            total = len(pdf.pages)
+    except Exception as e:
+        raise ValueError(f"Erreur lecture PDF : {e}")
+
+    workers = render_pool.workers(max_workers)
+    if total < PDF_PARALLEL_MIN_PAGES or workers <= 1:
+        with pdfplumber.open(input_path) as pdf:
+            for page in pdf.pages:
+                yield page.extract_text() or ""
+                page.close()
+        return
+
+    ranges = iter([(start, min(start + PDF_PAGES_PER_TASK, total))
+                   for start in range(0, total, PDF_PAGES_PER_TASK)])
+    # pool partagé et borné (services/render_pool.py)
+    pool = render_pool.executor()
+    # fenêtre glissante : au plus 2 lots par worker en mémoire
+    window = deque(pool.submit(extract_pdf_pages, input_path, *r)
+                   for _, r in zip(range(workers * 2), ranges))
+    try:
+        while window:
+            texts = window.popleft().result()
+            next_range = next(ranges, None)
+            if next_range:
+                window.append(pool.submit(extract_pdf_pages, input_path, *next_range))
+            yield from texts
+    finally:
+        # lecture abandonnée (erreur, client parti) : lots restants annulés
+        for future in window:
+            future.cancel()
+
+
+def iter_docx_text(input_path):
+    from docx import Document
+
+    try:
+        doc = Document(input_path)
+    except Exception as e:
+        raise ValueError(f"Erreur lecture DOCX : {e}")
+    return (p.text for p in doc.paragraphs)
+
+
+def iter_file_lines(input_path):
+    try:
+        with open(input_path, "r", encoding="utf-8") as f:
+            for line in f:
+                yield line.rstrip("\r\n")
+    except Exception as e:
+        raise ValueError(f"Erreur lecture TXT : {e}")
+
+
+def html_to_text(input_path):
+    import html2text
+
+    try:
+        with open(input_path, "r", encoding="utf-8") as f:
+            return html2text.html2text(f.read())
+    except Exception as e:
+        raise ValueError(f"Erreur lecture HTML : {e}")
+
+
+def iter_text(input_path, ext):
+    """Flux de morceaux de texte selon le format d'entrée."""
+    if ext == ".pdf":
+        return iter_pdf_text(input_path)
+    if ext == ".docx":
+        return iter_docx_text(input_path)
+    if ext in (".txt", ".md"):
+        return iter_file_lines(input_path)
+    if ext == ".html":
+        return iter([html_to_text(input_path)])
+    raise ValueError(f"Format d'entrée non supporté : {ext}")
+
+
+# -----------------------------
+#   Écriture
+# -----------------------------
+def text_to_pdf(text, output_path, font_size=12):
+    """text : chaîne ou flux de morceaux de texte."""
+    from .text_pdf import TextPdfWriter
+
+    lines = text.splitlines() if isinstance(text, str) else iter_lines(text)
+    with TextPdfWriter(output_path, font_size=font_size) as pdf:
+        pdf.write_lines(lines)
+
+
+def write_docx(chunks, output_path):
+    from docx import Document
+
+    doc = Document()
+    for chunk in chunks:
+        doc.add_paragraph(chunk)
+    doc.save(output_path)
+
+
+def write_text(chunks, output_path):
+    with open(output_path, "w", encoding="utf-8") as f:
+        for n, chunk in enumerate(chunks):
+            f.write(f"\n{chunk}" if n else chunk)
+
+
+def write_html(chunks, output_path):
+    import markdown
+
+    with open(output_path, "w", encoding="utf-8") as f:
+        for n, block in enumerate(markdown_blocks(iter_lines(chunks))):
+            f.write(f"\n{markdown.markdown(block)}" if n else markdown.markdown(block))
+
+
+WRITERS = {
+    "txt": write_text,
+    "md": write_text,
+    "html": write_html,
+    "docx": write_docx,
+    "pdf": text_to_pdf,
+}
+
+
+def convert_text(input_path, output_path, options=None):
+    """Arête texte → texte : extraction et écriture au fil de l'eau."""
+    ext = os.path.splitext(input_path)[1].lower()
+    output_format = os.path.splitext(output_path)[1].lower().lstrip(".")
+    writer = WRITERS.get(output_format)
+    if writer is None:
+        raise ValueError(f"Format de sortie non supporté: {output_format}")
+
+    chunks = TimedIterator(iter_text(input_path, ext))
+    start = time.perf_counter()
+    writer(chunks, output_path)
+
+    # extraction = temps passé dans le flux, rendu = le reste
+    total = time.perf_counter() - start
+    stage_metrics.observe("extract", chunks.elapsed, ext, output_format)
+    stage_metrics.observe("render", total - chunks.elapsed, ext, output_format)
+    return output_path
+
+
+def pdf_to_docx_layout(input_path, output_path, options=None):
+    """PDF → DOCX en conservant la mise en page (tableaux, images) via pdf2docx."""
+    from pdf2docx import Converter
+
+    converter = Converter(input_path)
+    try:
+        converter.convert(output_path)
+    finally:
+        converter.close()
+    return output_path
@@ -0,0 +1,273 @@
+import os
+import threading
+import zlib
+
+from fpdf.fonts import fpdf_charwidths
+from fpdf.ttfonts import TTFontFile
+
+from config.base_config import BaseConfig
+
+# A4 en points, marges de 10 mm (côtés, comme FPDF) et 15 mm (haut/bas)
+PAGE_WIDTH = 595.28
+PAGE_HEIGHT = 841.89
+MARGIN_X = 28.35
+MARGIN_Y = 42.52
+LINE_SPACING = 1.25
+
+# Polices Unicode courantes (Debian/Ubuntu, Alpine, macOS, Windows)
+FONT_CANDIDATES = [
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/TTF/DejaVuSans.ttf",
+    "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
+    "/usr/share/fonts/noto/NotoSans-Regular.ttf",
+    "/Library/Fonts/Arial Unicode.ttf",
+    "C:\\Windows\\Fonts\\arial.ttf",
+]
+
+_fonts = {}
+_fonts_lock = threading.Lock()
+
+
+def find_font(font_path=None):
+    """Chemin de la police TTF à embarquer, ou None (repli sur Helvetica)."""
+    configured = font_path or os.environ.get("PDF_FONT_PATH") or BaseConfig.PDF_FONT_PATH
+    for path in ([configured] if configured else []) + FONT_CANDIDATES:
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def load_font(path):
+    """Métriques TTF lues une seule fois par processus (l'analyse coûte ~100 ms)."""
+    with _fonts_lock:
+        font = _fonts.get(path)
+        if font is None:
+            ttf = TTFontFile()
+            ttf.getMetrics(path)
+            font = _fonts[path] = {
+                "name": "".join(c for c in ttf.fullName if c not in " ()"),
+                "widths": ttf.charWidths,
+                "desc": {
+                    "Ascent": int(round(ttf.ascent)),
+                    "Descent": int(round(ttf.descent)),
+                    "CapHeight": int(round(ttf.capHeight)),
+                    "Flags": (ttf.flags | 4) & ~32,
+                    "FontBBox": "[%d %d %d %d]" % tuple(int(round(v)) for v in ttf.bbox),
+                    "ItalicAngle": int(ttf.italicAngle),
+                    "StemV": int(round(ttf.stemV)),
+                    "MissingWidth": int(round(ttf.defaultWidth)),
+                },
+            }
+    return font
+
+
+class GlyphWidths(dict):
+    """Cache caractère → largeur en points, rempli à la première rencontre."""
+
+    def __init__(self, font, font_size):
+        super().__init__()
+        self.font = font
+        self.scale = font_size / 1000
+
+    def __missing__(self, char):
+        if self.font:
+            code, char_widths = ord(char), self.font["widths"]
+            units = char_widths[code] if code < len(char_widths) else 0
+            width = (units or self.font["desc"]["MissingWidth"]) * self.scale
+        else:
+            code = char.encode("cp1252", "replace")[0]
+            width = fpdf_charwidths["helvetica"].get(chr(code), 500) * self.scale
+        self[char] = width
+        return width
+
+
+def _escape(data):
+    return data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)").replace(b"\r", b"\\r")
+
+
+class TextPdfWriter:
+    """
+    Rendu texte → PDF en flux : les lignes sont coupées avec des largeurs de glyphes
+    en cache et chaque page pleine est compressée puis écrite aussitôt sur disque.
+    Police TTF Unicode embarquée (sous-ensemble) ; sinon Helvetica (cp1252).
+    """
+
+    def __init__(self, output_path, font_size=12, font_path=None):
+        self.font_size = font_size
+        self.leading = font_size * LINE_SPACING
+        self.max_width = PAGE_WIDTH - 2 * MARGIN_X
+        self.lines_per_page = int((PAGE_HEIGHT - 2 * MARGIN_Y) // self.leading)
+
+        path = find_font(font_path)
+        self.font_path = path
+        self.font = load_font(path) if path else None
+        self._used = set(map(chr, range(32, 127)))
+        self._widths = GlyphWidths(self.font, font_size)
+
+        self._file = open(output_path, "wb")
+        self._offsets = {}
+        self._next_id = 4  # 1 catalogue, 2 arbre des pages, 3 police
+        self._kids = []
+        self._page = []
+        self._file.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    # -----------------------------
+    #   Mesure et découpage
+    # -----------------------------
+    def text_width(self, text):
+        return sum(map(self._widths.__getitem__, text))
+
+    def wrap(self, line):
+        """Coupe une ligne aux espaces (ou au caractère pour un mot trop long)."""
+        if self.text_width(line) <= self.max_width:
+            return [line]
+
+        rows, current, current_width = [], None, 0.0
+        widths = self._widths
+        space = widths[" "]
+        for word in line.split(" "):
+            word_width = self.text_width(word)
+            if current is not None and current_width + space + word_width <= self.max_width:
+                current += " " + word
+                current_width += space + word_width
+                continue
+            if current is not None:
+                rows.append(current)
+            current, current_width = word, word_width
+            while current_width > self.max_width:
+                cut, cut_width = 0, 0.0
+                for c in current:
+                    if cut and cut_width + widths[c] > self.max_width:
+                        break
+                    cut_width += widths[c]
+                    cut += 1
+                rows.append(current[:cut])
+                current = current[cut:]
+                current_width = self.text_width(current)
+        rows.append(current)
+        return rows
+
+    # -----------------------------
+    #   Écriture
+    # -----------------------------
+    def _encode(self, text):
+        if self.font:
+            # CID = point de code Unicode (plan de base uniquement)
+            if text and max(text) > "\uffff":
+                text = "".join(c if c <= "\uffff" else "?" for c in text)
+            self._used.update(text)
+            return _escape(text.encode("utf-16-be"))
+        return _escape(text.encode("cp1252", "replace"))
+
+    def write_lines(self, lines):
+        for line in lines:
+            for row in self.wrap(line.expandtabs(4).rstrip("\r")):
+                self._page.append(self._encode(row))
+                if len(self._page) >= self.lines_per_page:
+                    self._flush_page()
+
+    def _new_id(self):
+        obj_id = self._next_id
+        self._next_id += 1
+        return obj_id
+
+    def _write_object(self, obj_id, body, stream=None):
+        self._offsets[obj_id] = self._file.tell()
+        self._file.write(b"%d 0 obj\n" % obj_id)
+        if stream is None:
+            self._file.write(body + b"\nendobj\n")
+        else:
+            self._file.write(body + b"\nstream\n" + stream + b"\nendstream\nendobj\n")
+
+    def _flush_page(self):
+        top = PAGE_HEIGHT - MARGIN_Y - self.font_size + self.leading
+        content = b"BT /F1 %d Tf %.2f TL %.2f %.2f Td\n" % (self.font_size, self.leading, MARGIN_X, top)
+        content += b"".join(b"(" + row + b") '\n" for row in self._page) + b"ET"
+        content = zlib.compress(content)
+
+        content_id, page_id = self._new_id(), self._new_id()
+        self._write_object(content_id, b"<</Length %d /Filter /FlateDecode>>" % len(content), content)
+        self._write_object(
+            page_id,
+            b"<</Type /Page /Parent 2 0 R /MediaBox [0 0 %.2f %.2f] "
+            b"/Resources <</Font <</F1 3 0 R>>>> /Contents %d 0 R>>" % (PAGE_WIDTH, PAGE_HEIGHT, content_id)
+        )
+        self._kids.append(page_id)
+        self._page = []
+
+    def _write_fonts(self):
+        if not self.font:
+            self._write_object(3, b"<</Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding>>")
+            return
+
+        ttf = TTFontFile()
+        used = set(map(ord, self._used))
+        subset = sorted(used | set(range(1, 57)))
+        font_file = ttf.makeSubset(self.font_path, subset)
+        font_stream = zlib.compress(font_file)
+
+        cid_map = bytearray(256 * 256 * 2)
+        for code, glyph in ttf.codeToGlyph.items():
+            if code <= 0xFFFF:
+                cid_map[code * 2] = glyph >> 8
+                cid_map[code * 2 + 1] = glyph & 0xFF
+        cid_map = zlib.compress(bytes(cid_map))
+
+        to_unicode = (
+            b"/CIDInit /ProcSet findresource begin\n12 dict begin\nbegincmap\n"
+            b"/CIDSystemInfo <</Registry (Adobe) /Ordering (UCS) /Supplement 0>> def\n"
+            b"/CMapName /Adobe-Identity-UCS def\n/CMapType 2 def\n"
+            b"1 begincodespacerange\n<0000> <FFFF>\nendcodespacerange\n"
+            b"1 beginbfrange\n<0000> <FFFF> <0000>\nendbfrange\n"
+            b"endcmap\nCMapName currentdict /CMap defineresource pop\nend\nend"
+        )
+        char_widths = self.font["widths"]
+        widths = " ".join(
+            "%d [%d]" % (code, char_widths[code])
+            for code in sorted(used)
+            if code < len(char_widths) and char_widths[code]
+        )
+
+        name = ("MPDFAA+" + self.font["name"]).encode("latin-1", "replace")
+        desc = " ".join("/%s %s" % item for item in self.font["desc"].items()).encode()
+        cid_font, to_unicode_id, descriptor, cid_map_id, font_file_id = (self._new_id() for _ in range(5))
+
+        self._write_object(3, b"<</Type /Font /Subtype /Type0 /BaseFont /%s /Encoding /Identity-H "
+                              b"/DescendantFonts [%d 0 R] /ToUnicode %d 0 R>>" % (name, cid_font, to_unicode_id))
+        self._write_object(cid_font, b"<</Type /Font /Subtype /CIDFontType2 /BaseFont /%s "
+                                     b"/CIDSystemInfo <</Registry (Adobe) /Ordering (UCS) /Supplement 0>> "
+                                     b"/FontDescriptor %d 0 R /DW %d /W [%s] /CIDToGIDMap %d 0 R>>"
+                           % (name, descriptor, self.font["desc"]["MissingWidth"], widths.encode(), cid_map_id))
+        self._write_object(to_unicode_id, b"<</Length %d>>" % len(to_unicode), to_unicode)
+        self._write_object(descriptor, b"<</Type /FontDescriptor /FontName /%s %s /FontFile2 %d 0 R>>"
+                           % (name, desc, font_file_id))
+        self._write_object(cid_map_id, b"<</Length %d /Filter /FlateDecode>>" % len(cid_map), cid_map)
+        self._write_object(font_file_id, b"<</Length %d /Filter /FlateDecode /Length1 %d>>"
+                           % (len(font_stream), len(font_file)), font_stream)
+
+    def close(self):
+        """Termine la dernière page, écrit police, arbre des pages et table xref."""
+        if self._page or not self._kids:
+            self._flush_page()
+        self._write_fonts()
+        kids = " ".join("%d 0 R" % k for k in self._kids).encode()
+        self._write_object(2, b"<</Type /Pages /Kids [%s] /Count %d>>" % (kids, len(self._kids)))
+        self._write_object(1, b"<</Type /Catalog /Pages 2 0 R>>")
+
+        xref = self._file.tell()
+        count = self._next_id
+        self._file.write(b"xref\n0 %d\n0000000000 65535 f \n" % count)
+        self._file.write(b"".join(b"%010d 00000 n \n" % self._offsets[i] for i in range(1, count)))
+        self._file.write(b"trailer\n<</Size %d /Root 1 0 R>>\nstartxref\n%d\n%%%%EOF\n" % (count, xref))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._file.close()
+
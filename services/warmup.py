@@ -0,0 +1,69 @@
+import os
+import tempfile
+import time
+
+from . import formats
+from .stage_metrics import stage_metrics
+
+# Petit document utilisé pour exercer chaque convertisseur une fois
+SAMPLE_TEXT = "# Convertify\n\nPréchargement des convertisseurs : éàü €.\n\n- liste\n- texte\n"
+
+
+def _step(timings, name, func, *args, **kwargs):
+    start = time.perf_counter()
+    try:
+        func(*args, **kwargs)
+    except Exception as e:
+        print(f"[⚠] Préchargement {name} impossible : {e}", flush=True)
+    timings[name] = time.perf_counter() - start
+
+
+def warm_up():
+    """
+    Importe les bibliothèques de conversion et les exerce une fois (polices, tables,
+    caches de module). Appelé dans le maître gunicorn (preload) avant le fork :
+    les workers partagent ces pages en copie sur écriture au lieu de tout recharger.
+    Ne démarre ni thread ni pool de processus. Retourne {étape: secondes}.
+    """
+    timings = {}
+    start = time.perf_counter()
+
+    def load_edges():
+        for edge in formats.edges():
+            edge.load()
+
+    _step(timings, "imports", load_edges)
+
+    with tempfile.TemporaryDirectory(prefix="convertify-warmup-") as folder:
+        md_path = os.path.join(folder, "sample.md")
+        with open(md_path, "w", encoding="utf-8") as f:
+            f.write(SAMPLE_TEXT)
+        pdf_path = os.path.join(folder, "sample.pdf")
+
+        def convert(source, target):
+            formats.convert(source, target, output_path=os.path.join(folder, f"out.{target}"))
+
+        _step(timings, "md→pdf", convert, md_path, "pdf")  # police TTF analysée une fois
+        if os.path.exists(os.path.join(folder, "out.pdf")):
+            os.replace(os.path.join(folder, "out.pdf"), pdf_path)
+            _step(timings, "pdf→txt", convert, pdf_path, "txt")
+        _step(timings, "md→html", convert, md_path, "html")
+        _step(timings, "md→docx", convert, md_path, "docx")
+
+        def compress_samples():
+            from PIL import Image
+            from .compressor import optimize_pdf
+            from .image_optimizer import optimize_image
+
+            png_path = os.path.join(folder, "sample.png")
+            Image.new("RGB", (64, 64), "white").save(png_path)
+            optimize_image(png_path, os.path.join(folder, "small"), image_format="jpeg")
+            if os.path.exists(pdf_path):
+                optimize_pdf(pdf_path, os.path.join(folder, "small.pdf"), max_workers=1)
+
+        _step(timings, "compress", compress_samples)
+
+    # les conversions de préchargement ne comptent pas dans les métriques
+    stage_metrics.reset()
+    timings["total"] = time.perf_counter() - start
+    return timings
@@ -0,0 +1,71 @@
+// keyset_table.js - tables admin chargées par pages (/admin/api/<liste>?after=<curseur>)
+function escapeHtml(value) {
+  return String(value ?? "").replace(/[&<>"']/g, c => ({
+    "&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#39;"
+  })[c]);
+}
+
+function formatDate(iso) {
+  return iso ? new Date(iso).toLocaleDateString("fr-FR") : "—";
+}
+
+// options : url, tbody, button (« Charger plus »), counter, renderRow(item), emptyRow, params
+function keysetTable({ url, tbody, button, counter, renderRow, emptyRow, params = {} }) {
+  let next = null;
+  let loaded = 0;
+  let controller = null; // requête en cours (annulée si les filtres changent)
+  let filters = params;
+
+  async function load(reset = false) {
+    if (controller) {
+      // page suivante déjà demandée : on attend ; nouveaux filtres : l'ancienne requête est annulée
+      if (!reset) return;
+      controller.abort();
+    }
+    const current = controller = new AbortController();
+    if (reset) {
+      next = null;
+      loaded = 0;
+      tbody.innerHTML = "";
+    }
+    const query = new URLSearchParams(Object.entries(filters).filter(([, v]) => v !== "" && v != null));
+    if (next) query.set("after", next);
+    try {
+      const res = await fetch(`${url}?${query}`, { signal: current.signal });
+      const data = await res.json();
+      if (current.signal.aborted) return;
+      if (!res.ok) throw new Error(data.error || res.status);
+      tbody.insertAdjacentHTML("beforeend", data.items.map(renderRow).join(""));
+      loaded += data.items.length;
+      next = data.next;
+      if (!loaded && emptyRow) tbody.innerHTML = emptyRow;
+    } catch (err) {
+      if (err.name !== "AbortError") console.error("Chargement impossible :", err);
+    } finally {
+      // une requête annulée ne touche plus à l'état : celle qui l'a remplacée s'en charge
+      if (controller === current) {
+        controller = null;
+        if (counter) counter.textContent = next ? `${loaded}+` : loaded;
+        if (button) button.classList.toggle("d-none", !next);
+      }
+    }
+  }
+
+  if (button) {
+    button.addEventListener("click", () => load());
+    // page suivante chargée automatiquement quand le bouton devient visible
+    if ("IntersectionObserver" in window) {
+      new IntersectionObserver(entries => {
+        if (entries[0].isIntersecting && next) load();
+      }).observe(button);
+    }
+  }
+
+  load(true);
+  return {
+    reload(newFilters = filters) {
+      filters = newFilters;
+      return load(true);
+    }
+  };
+}
@@ -0,0 +1,61 @@
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Dossiers relatifs (static/uploads, static/converted, instance/…) : répertoire de travail jetable
+WORKDIR = tempfile.mkdtemp(prefix="convertify-tests-")
+os.chdir(WORKDIR)
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(WORKDIR, 'test.db')}"
+os.environ["INIT_DB_ON_STARTUP"] = "1"
+
+import uuid  # noqa: E402
+
+import pytest  # noqa: E402
+
+from config.base_config import BaseConfig  # noqa: E402
+
+# pas de tâches de fond (nettoyage, synchronisation des quotas) pendant les tests
+BaseConfig.ENABLE_SCHEDULER = False
+
+
+@pytest.fixture(scope="session")
+def app():
+    from app import app as flask_app
+
+    flask_app.config.update(TESTING=True)
+    return flask_app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def api_key(app):
+    """Compte neuf avec une clé API active (daily_limit 5) ; retourne la clé."""
+    from models.db import db
+    from models.user import APIKey, User
+
+    with app.app_context():
+        user = User(email=f"{uuid.uuid4().hex}@example.com", password_hash="x")
+        db.session.add(user)
+        db.session.flush()
+        key = APIKey(user_id=user.id, api_key=uuid.uuid4().hex, daily_limit=5)
+        db.session.add(key)
+        db.session.commit()
+        db.session.refresh(key)
+        db.session.expunge(key)
+        return key
+
+
+def key_usage(app, key_id):
+    from models.db import db
+    from models.user import APIKey
+
+    with app.app_context():
+        return db.session.get(APIKey, key_id).today_usage
@@ -0,0 +1,28 @@
+import os
+
+import services.archive as archive
+from services.archive import CodecChoices
+
+
+def test_auto_choice_is_reused_per_content_type(monkeypatch):
+    trials = []
+
+    def choose_codec(sample, rate=70):
+        trials.append(rate)
+        return "bz2", {}
+
+    monkeypatch.setattr(archive, "choose_codec", choose_codec)
+    choices = CodecChoices()
+    sample = b"date,amount\n2024-01-01,12.5\n" * 1000
+
+    assert choices.choose(sample, ".csv", 70) == "bz2"
+    assert choices.choose(sample, ".csv", 70) == "bz2"
+    assert trials == [70]
+    choices.choose(sample, ".log", 70)
+    assert trials == [70, 70]
+
+
+def test_incompressible_content_is_stored_without_trial(monkeypatch):
+    monkeypatch.setattr(archive, "choose_codec", lambda sample, rate=70: ("bz2", {}))
+
+    assert CodecChoices().choose(os.urandom(64 * 1024), ".csv", 70) == "store"
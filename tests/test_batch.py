@@ -0,0 +1,29 @@
+import io
+import zipfile
+
+import services.batch as batch
+
+
+class EvictedCache:
+    """Cache dont l'entrée disparaît entre get() et la lecture du fichier."""
+
+    def get(self, digest, target_format, options):
+        return f"/nonexistent/{digest}.pdf"
+
+
+def test_cache_eviction_is_reported_and_refunded(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch, "get_result_cache", lambda: EvictedCache())
+    source = tmp_path / "a.txt"
+    source.write_text("bonjour")
+    refunded = []
+
+    stream = batch.stream_batch_zip(
+        [("a.txt", str(source), "abc")], "pdf", {}, lambda name, path: name,
+        on_undelivered=refunded.append
+    )
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(stream)))
+
+    assert archive.namelist() == ["errors.txt"]
+    errors = archive.read("errors.txt").decode()
+    assert errors.startswith("a.txt : ") and "/nonexistent" not in errors
+    assert refunded == [1]
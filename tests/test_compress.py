@@ -0,0 +1,64 @@
+import gzip
+import io
+
+from PIL import Image
+
+from conftest import key_usage
+
+
+def test_failed_compression_refunds_quota(app, client, api_key):
+    response = client.post(
+        "/convertify/api/compress",
+        data={"file": (io.BytesIO(b"%PDF-1.4\nnot really a pdf\n"), "broken.pdf")},
+        headers={"X-API-Key": api_key.api_key},
+    )
+
+    assert response.status_code == 422
+    assert "static/" not in response.get_json()["error"]
+    assert key_usage(app, api_key.id) == 0
+
+
+def test_compression_debits_quota(app, client, api_key):
+    response = client.post(
+        "/convertify/api/compress",
+        data={"file": (io.BytesIO(b"hello world\n" * 100), "notes.txt")},
+        headers={"X-API-Key": api_key.api_key},
+    )
+
+    assert response.status_code == 200
+    assert int(response.headers["X-Compressed-Size"]) < int(response.headers["X-Original-Size"])
+    assert key_usage(app, api_key.id) == 1
+
+
+def test_palette_image_with_max_dimension(app, client, api_key):
+    image = Image.new("RGB", (1200, 800), "white").quantize(colors=16)
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG")
+    buffer.seek(0)
+
+    response = client.post(
+        "/convertify/api/compress",
+        data={"file": (buffer, "logo.png"), "max_dimension": "300"},
+        headers={"X-API-Key": api_key.api_key},
+    )
+
+    assert response.status_code == 200
+    with Image.open(io.BytesIO(response.get_data())) as result:
+        assert max(result.size) == 300
+
+
+def test_gzip_output_keeps_original_name(app, client, api_key):
+    content = b"date,amount\n2024-01-01,12.5\n" * 500
+    response = client.post(
+        "/convertify/api/compress",
+        data={"file": (io.BytesIO(content), "rapport.csv"), "codec": "deflate"},
+        headers={"X-API-Key": api_key.api_key},
+    )
+
+    assert response.status_code == 200
+    assert 'filename=rapport-compressed.csv.gz' in response.headers["Content-Disposition"]
+    data = response.get_data()
+    assert gzip.decompress(data) == content
+    # en-tête gzip : drapeau FNAME puis nom d'origine terminé par un octet nul
+    assert data[3] & 0x08
+    assert data[10:data.index(b"\0", 10)] == b"rapport.csv"
@@ -0,0 +1,56 @@
+import io
+
+from conftest import key_usage
+from services.downloads import download_store
+
+
+def compress(client, api_key, content=b"hello world\n" * 100):
+    return client.post(
+        "/convertify/api/compress",
+        data={"file": (io.BytesIO(content), "notes.txt")},
+        headers={"X-API-Key": api_key.api_key},
+    )
+
+
+def test_download_supports_range_and_if_none_match(client, api_key):
+    first = compress(client, api_key)
+    url, etag, body = first.headers["X-Download-URL"], first.headers["ETag"], first.get_data()
+    headers = {"X-API-Key": api_key.api_key}
+
+    partial = client.get(url, headers={**headers, "Range": "bytes=0-9"})
+    assert partial.status_code == 206
+    assert partial.get_data() == body[:10]
+    assert partial.headers["Content-Range"] == f"bytes 0-9/{len(body)}"
+
+    cached = client.get(url, headers={**headers, "If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.get_data() == b""
+
+
+def test_download_is_limited_to_its_owner(client, api_key):
+    url = compress(client, api_key).headers["X-Download-URL"]
+
+    assert client.get(url).status_code == 404
+
+
+def test_result_expired_before_sending_is_refunded(app, client, api_key, monkeypatch):
+    monkeypatch.setattr(download_store, "send", lambda content_id, name: None)
+
+    response = compress(client, api_key)
+
+    assert response.status_code == 410
+    assert "error" in response.get_json()
+    assert key_usage(app, api_key.id) == 0
+
+
+def test_converted_result_expired_before_sending_is_refunded(app, client, api_key, monkeypatch):
+    monkeypatch.setattr(download_store, "send", lambda content_id, name: None)
+
+    response = client.post(
+        "/convertify/api/convert",
+        data={"file": (io.BytesIO(b"bonjour\n" * 20), "notes.txt"), "format": "pdf"},
+        headers={"X-API-Key": api_key.api_key},
+    )
+
+    assert response.status_code == 410
+    assert key_usage(app, api_key.id) == 0
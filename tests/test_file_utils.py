@@ -0,0 +1,21 @@
+from services.file_utils import sniff_mime
+
+
+def pe_header():
+    head = bytearray(512)
+    head[:2] = b"MZ"
+    head[0x3C:0x40] = (0x80).to_bytes(4, "little")
+    head[0x80:0x84] = b"PE\0\0"
+    return bytes(head)
+
+
+def test_windows_executable_is_blocked():
+    assert sniff_mime(pe_header()) == "application/x-dosexec"
+
+
+def test_binary_mz_without_pe_header_is_blocked():
+    assert sniff_mime(b"MZ\x90\x00\x03\x00") == "application/x-dosexec"
+
+
+def test_text_starting_with_mz_is_text():
+    assert sniff_mime(b"MZ,Mozambique,33000000\nZA,South Africa,60000000\n") == "text/plain"
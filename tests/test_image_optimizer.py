@@ -0,0 +1,15 @@
+import pytest
+from PIL import Image
+
+from services.image_optimizer import open_image
+
+
+@pytest.mark.parametrize("mode", ["P", "1", "I;16"])
+def test_max_dimension_accepts_modes_reduce_cannot_handle(tmp_path, mode):
+    path = tmp_path / "image.png"
+    Image.new(mode, (900, 300)).save(path)
+
+    img, source_format = open_image(str(path), max_dimension=200)
+
+    assert max(img.size) == 200
+    assert source_format == "png"
@@ -0,0 +1,49 @@
+import base64
+import json
+from datetime import datetime
+
+import pytest
+
+from models.user import APIKey
+from services.listings import KEYS, decode_cursor, encode_cursor
+
+ORDER = (APIKey.created_at, APIKey.id)
+
+
+def token(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+
+def test_cursor_round_trip():
+    values = [datetime(2024, 5, 1, 12, 30), 42]
+
+    assert decode_cursor(encode_cursor(values), ORDER) == values
+
+
+@pytest.mark.parametrize("cursor", [
+    "%%%",                              # pas du base64
+    token({"a": 1}),                    # pas une liste
+    token([1]),                         # mauvais nombre de valeurs
+    token([12345, 1]),                  # date non textuelle (TypeError auparavant)
+    token([["2024-01-01"], 1]),
+    token(["pas une date", 1]),
+    token(["2024-01-01T00:00:00", "7"]),  # id non entier
+    token(["2024-01-01T00:00:00", True]),
+])
+def test_bad_cursor_is_a_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, ORDER)
+
+
+def test_listing_rejects_bad_cursor(app):
+    with app.app_context(), pytest.raises(ValueError):
+        KEYS.page([], token([12345, 1]))
+
+
+def test_admin_api_answers_400_on_bad_cursor(client):
+    client.post("/login", data={"email": "admin@example.com", "password": "admin123"})
+
+    response = client.get("/admin/api/keys", query_string={"after": token([12345, 1])})
+
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Curseur invalide"}
@@ -0,0 +1,56 @@
+import uuid
+from concurrent.futures import Future
+
+import pytest
+
+from conftest import key_usage
+from models.db import db
+from models.job import ConversionJob
+from services import job_queue
+from services.quota import QuotaExceeded, consume_db, refund_db
+
+
+def test_debit_stops_at_daily_limit(app, api_key):
+    with app.app_context():
+        for _ in range(5):
+            assert consume_db(api_key.user_id) == api_key.id
+        with pytest.raises(QuotaExceeded):
+            consume_db(api_key.user_id)
+    assert key_usage(app, api_key.id) == 5
+
+
+def test_debit_is_all_or_nothing(app, api_key):
+    with app.app_context():
+        consume_db(api_key.user_id, amount=3)
+        with pytest.raises(QuotaExceeded):
+            consume_db(api_key.user_id, amount=3)
+    assert key_usage(app, api_key.id) == 3
+
+
+def test_refund_never_goes_below_zero(app, api_key):
+    with app.app_context():
+        consume_db(api_key.user_id, amount=2)
+        refund_db(api_key.id)
+        assert key_usage(app, api_key.id) == 1
+        refund_db(api_key.id, amount=5)
+    assert key_usage(app, api_key.id) == 0
+
+
+def test_failed_job_refunds_its_key(app, api_key):
+    with app.app_context():
+        consume_db(api_key.user_id)
+        job = ConversionJob(id=uuid.uuid4().hex, user_id=api_key.user_id, key_id=api_key.id,
+                            target_format="pdf", input_path="missing.txt")
+        db.session.add(job)
+        db.session.commit()
+        job_id = job.id
+
+    assert job_queue.acquire_slot(queue_max=1, owner=api_key.user_id)
+    future = Future()
+    future.set_exception(ValueError("conversion impossible"))
+    job_queue._on_done(app, job_id, api_key.user_id, future)
+
+    with app.app_context():
+        assert db.session.get(ConversionJob, job_id).status == "failed"
+    assert key_usage(app, api_key.id) == 0
+    assert job_queue.pending_jobs() == 0
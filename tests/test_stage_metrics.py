@@ -0,0 +1,28 @@
+import json
+
+from services.stage_metrics import BUCKETS, StageMetrics
+
+
+def test_other_workers_histograms_are_added(tmp_path):
+    metrics = StageMetrics()
+    metrics.directory = str(tmp_path)
+    metrics.observe("convert", 0.2, ".pdf", "docx")
+    # histogramme écrit par un autre worker gunicorn
+    counts = [0] * (len(BUCKETS) + 1)
+    counts[BUCKETS.index(0.5)] = 2
+    (tmp_path / "99999.json").write_text(json.dumps([[["convert", "pdf", "docx"], counts, 0.8, 2]]))
+
+    text = metrics.render_prometheus()
+
+    assert 'convertify_stage_duration_seconds_count{stage="convert",input_ext="pdf",target="docx"} 3' in text
+
+
+def test_pool_observations_are_returned_then_merged():
+    child, parent = StageMetrics(), StageMetrics()
+    with child.recording() as observations:
+        child.observe("extract", 0.01, ".pdf", "txt")
+    assert child.render_prometheus().count("_count{") == 0
+
+    parent.merge(observations)
+
+    assert '_count{stage="extract",input_ext="pdf",target="txt"} 1' in parent.render_prometheus()